@@ -0,0 +1,174 @@
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+
+from backend.utils.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidAccessToken(Exception):
+    pass
+
+
+@lru_cache(maxsize=4)
+def get_signing_key(secret: str) -> bytes:
+    return hashlib.sha256(b"backend.users.access_tokens" + secret.encode()).digest()
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def get_ttl_us() -> int:
+    return int(settings.ACCESS_TOKEN_TTL.total_seconds() * 1_000_000)
+
+
+def sign(payload: str) -> str:
+    digest = hmac.new(get_signing_key(settings.SECRET_KEY), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_access_token(user) -> tuple[str, datetime]:
+    """
+    Returns a signed access token for `user` along with its expiry date.
+
+    The token is "<user id>.<uuid hex>.<expiry timestamp in microseconds>.<HMAC-SHA256 of the rest>".
+    """
+    expires = now_us() + get_ttl_us()
+    payload = f"{user.pk}.{user.uuid.hex}.{expires}"
+    return f"{payload}.{sign(payload)}", datetime.fromtimestamp(expires / 1_000_000, timezone.utc)
+
+
+def verify_access_token(token: str) -> tuple[int, str, int]:
+    """
+    Returns the user id, uuid hex and expiry timestamp (in microseconds) from `token`.
+
+    Only checks the signature, expiry and the in-process revocation list, so it never does any I/O
+    (except for the very first call in a process, which has to load the revocation list).
+    """
+    try:
+        payload, signature = token.rsplit(".", 1)
+        user_id, user_uuid, expires = payload.split(".")
+        user_id, expires = int(user_id), int(expires)
+    except ValueError:
+        raise InvalidAccessToken(_("Malformed token."))
+
+    # As bytes, compare_digest() rejects strings with non-ASCII characters rather than comparing them.
+    if not hmac.compare_digest(signature.encode(), sign(payload).encode()):
+        raise InvalidAccessToken(_("Invalid signature."))
+
+    if expires <= now_us():
+        raise InvalidAccessToken(_("Token has expired."))
+
+    if revocations.is_revoked(user_id, expires - get_ttl_us()):
+        raise InvalidAccessToken(_("Token has been revoked."))
+
+    return user_id, user_uuid, expires
+
+
+class RevocationList:
+    """
+    Users whose access tokens issued up to a point in time are no longer valid.
+
+    Shared between processes through the cache (a Redis hash when available), and mirrored
+    in every process, which reloads its copy in the background every `sync_interval` seconds.
+    Entries older than ACCESS_TOKEN_TTL are dropped, as every token they could match has
+    expired, which keeps the list small.
+    """
+
+    cache_alias = "default"
+    cache_key = "access_token_revocations"
+    sync_interval = 5
+
+    def __init__(self):
+        self.revoked = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._syncing = False
+
+    def is_revoked(self, user_id: int, issued_at: int) -> bool:
+        if self.loaded_at is None:
+            self.sync()
+        elif time.monotonic() - self.loaded_at > self.sync_interval:
+            self.sync_in_background()
+
+        revoked_at = self.revoked.get(user_id)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def revoke(self, *user_ids: int) -> None:
+        now = now_us()
+        revoked = dict.fromkeys(user_ids, now)
+        self.revoked = {**self.revoked, **revoked}
+
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            cache = caches[self.cache_alias]
+            cache.set(self.cache_key, {**cache.get(self.cache_key, {}), **revoked}, timeout=None)
+            return
+
+        try:
+            client.hset(self.cache_key, mapping=revoked)
+        except RedisError:
+            logger.error("Could not share the revocation of access tokens of users %s.", user_ids, exc_info=True)
+
+    def sync(self) -> None:
+        cutoff = now_us() - get_ttl_us()
+        client = get_redis_client(self.cache_alias)
+        try:
+            if client is None:
+                revoked = caches[self.cache_alias].get(self.cache_key, {})
+            else:
+                revoked = {int(key): int(value) for key, value in client.hgetall(self.cache_key).items()}
+                expired = [key for key, value in revoked.items() if value < cutoff]
+                if expired:
+                    client.hdel(self.cache_key, *expired)
+        except RedisError:
+            logger.warning("Could not load the access token revocation list.", exc_info=True)
+            return
+        finally:
+            self.loaded_at = time.monotonic()
+
+        # Merged rather than replaced, so revocations made here while loading are kept.
+        merged = {key: value for key, value in self.revoked.items() if value >= cutoff}
+        for key, value in revoked.items():
+            if value >= cutoff and value > merged.get(key, 0):
+                merged[key] = value
+        self.revoked = merged
+
+    def sync_in_background(self) -> None:
+        with self._lock:
+            if self._syncing:
+                return
+            self._syncing = True
+
+        def run():
+            try:
+                self.sync()
+            finally:
+                self._syncing = False
+
+        threading.Thread(target=run, name="access-token-revocations", daemon=True).start()
+
+
+revocations = RevocationList()
+
+
+def revoke_access_tokens(*user_ids: int) -> None:
+    """
+    Invalidates every access token issued to the users so far.
+
+    Called when users are deactivated, deleted or change their password, see backend.users.models.
+    Other processes pick revocations up within RevocationList.sync_interval.
+    """
+    revocations.revoke(*user_ids)
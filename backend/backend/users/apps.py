@@ -5,3 +5,7 @@ from django.utils.translation import gettext_lazy as _
 class UsersConfig(AppConfig):
     name = "backend.users"
     verbose_name = _("Users")
+
+    def ready(self):
+        # Connects the signal receivers keeping the user cache fresh.
+        from . import cache  # noqa F401
@@ -0,0 +1,148 @@
+import uuid
+from typing import Mapping, Optional
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from backend.utils.idempotency import idempotent_requests
+
+from .cache import user_cache
+from .views import ObtainAuthTokenView, UserViewSet, issue_tokens
+
+User = get_user_model()
+
+
+def make_request(request, parser_classes=None) -> Request:
+    return Request(
+        request,
+        parsers=[parser() for parser in parser_classes or api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+
+
+def json_response(data, status: int = status.HTTP_200_OK, headers: Optional[Mapping[str, str]] = None) -> JsonResponse:
+    # Compact and not ASCII-escaped, like DRF's JSONRenderer.
+    response = JsonResponse(
+        data, status=status, safe=False, json_dumps_params={"separators": (",", ":"), "ensure_ascii": False}
+    )
+    for name, value in (headers or {}).items():
+        if name != "Content-Type":
+            response[name] = value
+    return response
+
+
+def error_response(request: Request, exc: exceptions.APIException) -> JsonResponse:
+    """
+    Renders `exc` the way APIView.handle_exception() and DRF's exception handler do.
+    """
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+        if header:
+            exc.auth_header = header
+        else:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if getattr(exc, "auth_header", None):
+        response["WWW-Authenticate"] = exc.auth_header
+    if getattr(exc, "wait", None):
+        response["Retry-After"] = "%d" % exc.wait
+    return response
+
+
+def update_user(request: Request, lookup: uuid.UUID, partial: bool) -> dict:
+    """
+    UserViewSet.update() in one synchronous call: authentication, lookup, permissions, validation and save.
+    """
+    # Authenticates before looking the user up, like APIView.initial() does.
+    request.user
+    with transaction.atomic():
+        instance = User.objects.filter(uuid=lookup).first()
+        if instance is None:
+            raise exceptions.NotFound
+        for permission in UserViewSet.permission_classes:
+            if not permission().has_object_permission(request, None, instance):
+                if request.successful_authenticator is None:
+                    raise exceptions.NotAuthenticated
+                raise exceptions.PermissionDenied
+
+        serializer = UserViewSet.serializer_class(
+            instance, data=request.data, partial=partial, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+    return serializer.data
+
+
+@transaction.non_atomic_requests
+async def user_detail(request, uuid: uuid.UUID):
+    """
+    Async variant of the retrieve and update actions of UserViewSet, see settings.ASYNC_VIEWS.
+
+    Reads come from the user cache through its async API. Writes run the synchronous ORM
+    and DRF code in a thread, as Django 4.0 has no async ORM. Requests are not atomic, but the write is.
+    """
+    drf_request = make_request(request)
+    try:
+        if request.method in ("GET", "HEAD"):
+            if "HTTP_AUTHORIZATION" in request.META:
+                # Like DRF, invalid credentials are rejected even though reads need none.
+                await sync_to_async(lambda: drf_request.user)()
+            user = await user_cache.aget(uuid=uuid)
+            if user is None:
+                raise exceptions.NotFound
+            return json_response(UserViewSet.serializer_class(user).data)
+
+        if request.method in ("PUT", "PATCH"):
+            partial = request.method == "PATCH"
+            response = await sync_to_async(idempotent_requests.execute)(
+                drf_request, lambda: Response(update_user(drf_request, uuid, partial))
+            )
+            # Carries the headers of replayed responses.
+            return json_response(response.data, status=response.status_code, headers=response.headers)
+    except exceptions.APIException as exc:
+        return error_response(drf_request, exc)
+
+    return HttpResponseNotAllowed(["GET", "HEAD", "PUT", "PATCH"])
+
+
+def obtain_tokens(request: Request) -> dict:
+    """
+    ObtainAuthTokenView.post() in one synchronous call: throttles, password check and token issuance.
+    """
+    view = ObtainAuthTokenView()
+    waits = [throttle.wait() for throttle in view.get_throttles() if not throttle.allow_request(request, view)]
+    if waits:
+        raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    serializer = view.serializer_class(data=request.data, context={"request": request, "view": view})
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        return issue_tokens(serializer.validated_data["user"])
+
+
+@transaction.non_atomic_requests
+async def obtain_auth_token(request):
+    """
+    Async variant of ObtainAuthTokenView, see settings.ASYNC_VIEWS.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    drf_request = make_request(request, ObtainAuthTokenView.parser_classes)
+    try:
+        return json_response(await sync_to_async(obtain_tokens)(drf_request))
+    except exceptions.APIException as exc:
+        return error_response(drf_request, exc)
+
+
+# Token authenticated API views, CSRF is checked by SessionAuthentication (like APIView.as_view() does).
+user_detail.csrf_exempt = True
+obtain_auth_token.csrf_exempt = True
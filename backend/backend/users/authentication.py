@@ -0,0 +1,86 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+
+from .access_tokens import InvalidAccessToken, verify_access_token
+from .cache import user_cache
+from .models import Token
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication rejecting expired tokens and pushing back the expiry of used ones.
+    Users are looked up in the user cache.
+    """
+
+    model = Token
+
+    def authenticate_credentials(self, key):
+        # Unlike TokenAuthentication, the user comes from the user cache rather than a join.
+        try:
+            token = self.model.objects.get(key=key)
+        except self.model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        user = user_cache.get(pk=token.user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        token.user = user
+
+        if token.is_expired():
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+
+        token.refresh()
+        return user, token
+
+
+class SignedAccessTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates short-lived signed access tokens, passed as "Authorization: Bearer <token>".
+
+    The token is verified without touching the database or the cache, and its user is looked
+    up in the user cache, so deleted and deactivated users are rejected. Tokens of users who
+    were deactivated, deleted or changed their password are also revoked, see
+    backend.users.access_tokens.revoke_access_tokens().
+
+    While Redis is unavailable, revocations made by other processes are not seen. Deactivated
+    and deleted users are still rejected once their entry in the local user cache expires
+    (settings.USER_CACHE_LOCAL_TTL); tokens issued before a password change keep working
+    until they expire.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid token header."))
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_("Invalid token header."))
+
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        try:
+            user_id, user_uuid, expires = verify_access_token(token)
+        except InvalidAccessToken as e:
+            raise exceptions.AuthenticationFailed(e.args[0])
+
+        user = user_cache.get(pk=user_id)
+        if user is None or not user.is_active or user.uuid.hex != user_uuid:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return user, token
+
+    def authenticate_header(self, request):
+        return self.keyword
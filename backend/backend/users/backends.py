@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
+
+User = get_user_model()
+
+
+def filter_by_login(queryset, login: str):
+    """
+    Filters users whose username or email matches `login` case-insensitively.
+
+    Compares LOWER() of the columns, so that both are single probes of the
+    functional indexes in User.Meta.indexes.
+    """
+    login = login.lower()
+    queryset = queryset.alias(username_lower=Lower("username"), email_lower=Lower("email"))
+    return queryset.filter(Q(username_lower=login) | Q(email_lower=login))
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Authenticates by username or email, ignoring case.
+
+    Several users may match, e.g. when they share an email; the exact username
+    comes first, then usernames differing in case only, then emails. A login that
+    is exactly someone's username only ever checks that user's password, and at
+    most `max_candidates` passwords are checked otherwise.
+    """
+
+    max_candidates = 3
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        # Ordered before slicing, so the best matches are never cut off.
+        rank = Case(
+            When(username=username, then=Value(0)),
+            When(username_lower=username.lower(), then=Value(1)),
+            default=Value(2),
+        )
+        queryset = filter_by_login(User._default_manager.all(), username).order_by(rank, "pk")
+        candidates = list(queryset[: self.max_candidates])
+        if not candidates:
+            # Hash the password anyway, so that missing users can't be told apart by timing (see ModelBackend).
+            User().set_password(password)
+            return None
+
+        for user in candidates:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+            if user.username == username:
+                return None
+        return None
@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import math
+from typing import Iterable
+from uuid import UUID
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from redis.exceptions import RedisError
+
+from backend.utils.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Sets the bits of every key that exists, so adding never creates a partial filter.
+# KEYS - filters to add to, ARGV - bit offsets
+ADD_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call("EXISTS", key) == 1 then
+        for _, offset in ipairs(ARGV) do
+            redis.call("SETBIT", key, offset, 1)
+        end
+    end
+end
+"""
+
+
+class BloomFilter:
+    """
+    Bloom filter sized for `capacity` items at `error_rate` false positives, stored as a Redis bitmap.
+
+    Falls back to an in-process bitmap when the cache is not backed by Redis. Until it has been
+    built with rebuild(), the filter answers "maybe" for everything, so it never hides an item.
+    """
+
+    cache_alias = "default"
+
+    def __init__(self, key: str, capacity: int, error_rate: float):
+        self.key = key
+        self.building_key = f"{key}:building"
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.local = None
+        self._add_script = None
+
+    def offsets(self, item: bytes) -> list[int]:
+        # Double hashing, see https://doi.org/10.1002/rsa.20208
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def might_contain(self, item: bytes) -> bool:
+        offsets = self.offsets(item)
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            return self.local is None or all(self.local[offset >> 3] & (1 << (offset & 7)) for offset in offsets)
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            pipeline.exists(self.key)
+            for offset in offsets:
+                pipeline.getbit(self.key, offset)
+            exists, *bits = pipeline.execute()
+        except RedisError:
+            logger.warning("Bloom filter %s is unavailable.", self.key, exc_info=True)
+            return True
+
+        return not exists or all(bits)
+
+    def add(self, *items: bytes) -> None:
+        offsets = [offset for item in items for offset in self.offsets(item)]
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            if self.local is not None:
+                for offset in offsets:
+                    self.local[offset >> 3] |= 1 << (offset & 7)
+            return
+
+        try:
+            if self._add_script is None:
+                self._add_script = client.register_script(ADD_SCRIPT)
+            self._add_script(keys=[self.key, self.building_key], args=offsets)
+        except RedisError:
+            # The filter now misses an item, so it must not be trusted any more.
+            logger.error("Could not add to bloom filter %s, dropping it.", self.key, exc_info=True)
+            self.drop()
+
+    def rebuild(self, items: Iterable[bytes], batch_size: int = 10000) -> int:
+        """
+        Replaces the filter with one holding `items`, returns how many there were.
+
+        Items added while rebuilding make it into the new filter too.
+        """
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            local = bytearray(math.ceil(self.size / 8))
+            count = 0
+            for count, item in enumerate(items, 1):
+                for offset in self.offsets(item):
+                    local[offset >> 3] |= 1 << (offset & 7)
+            self.local = local
+            return count
+
+        client.delete(self.building_key)
+        # Created full size up front, so add() sees it exists from now on.
+        client.setbit(self.building_key, self.size - 1, 0)
+
+        count = 0
+        pipeline = client.pipeline(transaction=False)
+        for count, item in enumerate(items, 1):
+            for offset in self.offsets(item):
+                pipeline.setbit(self.building_key, offset, 1)
+            if count % batch_size == 0:
+                pipeline.execute()
+        pipeline.execute()
+
+        client.rename(self.building_key, self.key)
+        return count
+
+    def drop(self) -> None:
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            self.local = None
+        else:
+            client.delete(self.key)
+
+
+user_uuid_filter = BloomFilter(
+    "users:uuid:bloom", settings.USER_BLOOM_FILTER_CAPACITY, settings.USER_BLOOM_FILTER_ERROR_RATE
+)
+
+
+def might_exist(uuid: UUID) -> bool:
+    """
+    Returns False if no user has `uuid` for sure.
+    """
+    return user_uuid_filter.might_contain(uuid.bytes)
+
+
+def rebuild_user_uuid_filter() -> int:
+    """
+    Rebuilds the filter from the uuid column, returns the number of users.
+    """
+    uuids = User.objects.values_list("uuid", flat=True).iterator(chunk_size=10000)
+    return user_uuid_filter.rebuild(user_uuid.bytes for user_uuid in uuids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def add_user_uuid_to_filter(sender, instance=None, created=False, **kwargs):
+    if created:
+        user_uuid_filter.add(instance.uuid.bytes)
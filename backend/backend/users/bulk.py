@@ -0,0 +1,307 @@
+import io
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX,
+    identify_hasher,
+    make_password,
+)
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from backend.utils.jobs import Report
+
+from .access_tokens import revoke_access_tokens
+from .bloom import user_uuid_filter
+from .cache import user_cache
+from .models import Token, get_token_expiry
+
+User = get_user_model()
+
+# Columns accepted from imported rows, besides password and password_hash.
+IMPORTED_FIELDS = ("username", "email", "first_name", "last_name", "uuid", "date_joined")
+
+
+class PasswordHasherPool:
+    """
+    Hashes passwords across worker processes, as slow hashing is the point of the password hashers.
+
+    Workers are spawned rather than forked, so none of them inherits (and on exit closes)
+    a database connection of the parent. With a single worker, hashes in this process.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+
+    def __enter__(self) -> "PasswordHasherPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def hash(self, passwords: list[Optional[str]]) -> list[str]:
+        if self.workers <= 1 or len(passwords) <= 1:
+            return [make_password(password) for password in passwords]
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+            )
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._executor.map(make_password, passwords, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def clean_row(row: dict, now) -> tuple[User, Optional[str]]:
+    """
+    Returns an unsaved user built from `row` along with the plain text password to hash, if any.
+
+    The password is taken either in plain text from "password", or already hashed
+    (in Django's format) from "password_hash". The username and email are normalized
+    like User.objects.create_user() does. Raises ValidationError for invalid rows.
+    """
+    if isinstance(row, ValidationError):
+        # Rows the reader could not parse.
+        raise row
+    if not isinstance(row, dict):
+        raise ValidationError("Rows must be objects.")
+
+    values, errors = {}, {}
+    for name in IMPORTED_FIELDS:
+        field = User._meta.get_field(name)
+        value = row.get(name)
+        if value in (None, "") and name == "uuid":
+            values[name] = uuid.uuid4()
+        elif value in (None, "") and name == "date_joined":
+            values[name] = now
+        else:
+            try:
+                values[name] = field.clean("" if value is None else value, None)
+            except ValidationError as error:
+                errors[name] = error.messages
+
+    if "date_joined" in values and timezone.is_naive(values["date_joined"]):
+        values["date_joined"] = timezone.make_aware(values["date_joined"])
+    if "username" in values:
+        values["username"] = User.normalize_username(values["username"])
+    if "email" in values:
+        values["email"] = User.objects.normalize_email(values["email"])
+
+    password, password_hash = row.get("password") or None, row.get("password_hash") or None
+    if password is not None and password_hash is not None:
+        errors["password"] = ["Give either password or password_hash, not both."]
+    elif password_hash is not None:
+        try:
+            if not str(password_hash).startswith(UNUSABLE_PASSWORD_PREFIX):
+                identify_hasher(str(password_hash))
+        except ValueError:
+            errors["password_hash"] = ["Unknown password hash format."]
+    elif password is None:
+        # No password at all, like User.objects.create_user() without one.
+        password_hash = make_password(None)
+
+    if errors:
+        raise ValidationError(errors)
+
+    return User(password=password_hash and str(password_hash), **values), password and str(password)
+
+
+def clean_rows(rows: Iterable[tuple[int, dict]]) -> tuple[list[tuple[User, Optional[str]]], list[tuple[int, str]]]:
+    """
+    Validates a chunk of (line number, row) pairs.
+
+    Returns the valid users with their plain text passwords, and the line numbers and
+    messages of the invalid rows. Usernames and uuids are checked for uniqueness against
+    the rest of the chunk and, with one query per chunk, against the database.
+    """
+    now = timezone.now()
+    cleaned, errors = [], []
+    for line, row in rows:
+        try:
+            cleaned.append((line, *clean_row(row, now)))
+        except ValidationError as error:
+            messages = error.message_dict.items() if hasattr(error, "error_dict") else [("row", error.messages)]
+            errors.append((line, "; ".join(f"{name}: {' '.join(texts)}" for name, texts in messages)))
+
+    existing = User.objects.filter(username__in=[user.username for _, user, _ in cleaned])
+    taken = {"username": set(existing.values_list("username", flat=True))}
+    existing = User.objects.filter(uuid__in=[user.uuid for _, user, _ in cleaned])
+    taken["uuid"] = set(existing.values_list("uuid", flat=True))
+
+    valid = []
+    for line, user, password in cleaned:
+        duplicate = next((name for name in taken if getattr(user, name) in taken[name]), None)
+        if duplicate is not None:
+            errors.append((line, f"{duplicate}: A user with that {duplicate} already exists."))
+            continue
+        for name in taken:
+            taken[name].add(getattr(user, name))
+        valid.append((user, password))
+
+    return valid, sorted(errors)
+
+
+def create_users(users: list[User], tokens: bool = True, batch_size: int = 1000) -> None:
+    """
+    Inserts unsaved `users`, along with their auth tokens, in one transaction.
+
+    Uses COPY on PostgreSQL and bulk_create() elsewhere. Neither calls save() or sends
+    signals; the bloom filter of user uuids is updated once the transaction commits.
+    """
+    using = router.db_for_write(User)
+    with transaction.atomic(using=using):
+        if connections[using].vendor == "postgresql":
+            copy_users(users, tokens, using)
+        else:
+            bulk_create_users(users, tokens, using, batch_size)
+        transaction.on_commit(lambda: user_uuid_filter.add(*(user.uuid.bytes for user in users)), using=using)
+
+
+def make_tokens(user_ids: list[int]) -> list[Token]:
+    now = timezone.now()
+    expires_at = get_token_expiry()
+    return [
+        Token(key=Token.generate_key(), user_id=user_id, created=now, expires_at=expires_at) for user_id in user_ids
+    ]
+
+
+def copy_users(users: list[User], tokens: bool, using: str) -> None:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        # COPY does not return the ids it generates, so they are taken from the sequence up front.
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [User._meta.db_table, User._meta.pk.column, len(users)],
+        )
+        for user, (pk,) in zip(users, cursor.fetchall()):
+            user.pk = pk
+
+        copy(cursor, User, users)
+        if tokens:
+            copy(cursor, Token, make_tokens([user.pk for user in users]))
+
+
+def copy(cursor, model, objs: list) -> None:
+    """
+    Loads `objs` into the table of `model` with COPY ... FROM STDIN, in its text format.
+    """
+    connection = cursor.db
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    for obj in objs:
+        values = []
+        for field in fields:
+            value = getattr(obj, field.attname)
+            # Preparing plain values (and, on PostgreSQL, uuids and aware datetimes) is a no-op
+            # which would take most of the time here.
+            if value is not None and type(value) not in (str, int, bool, uuid.UUID) and not is_aware(value):
+                value = field.get_db_prep_save(value, connection)
+            values.append(to_copy_text(value))
+        buffer.write("\t".join(values))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    cursor.copy_expert(f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN", buffer)
+
+
+def is_aware(value) -> bool:
+    return type(value) is datetime and value.tzinfo is not None
+
+
+# Backslash escapes of COPY's text format.
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def to_copy_text(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(COPY_ESCAPES)
+
+
+def bulk_create_users(users: list[User], tokens: bool, using: str, batch_size: int) -> None:
+    joined = [user.date_joined for user in users]
+    User.objects.using(using).bulk_create(users, batch_size=batch_size)
+    # bulk_create() lets auto_now_add overwrite the imported join dates.
+    for user, date_joined in zip(users, joined):
+        user.date_joined = date_joined
+    User.objects.using(using).bulk_update(users, ["date_joined"], batch_size=batch_size)
+
+    if any(user.pk is None for user in users):
+        # Databases which can't return the ids of inserted rows.
+        ids = dict(User.objects.using(using).filter(uuid__in=[user.uuid for user in users]).values_list("uuid", "pk"))
+        for user in users:
+            user.pk = ids[user.uuid]
+
+    if tokens:
+        Token.objects.using(using).bulk_create(make_tokens([user.pk for user in users]), batch_size=batch_size)
+
+
+def iter_pk_chunks(queryset, chunk_size: int) -> Iterator[list[int]]:
+    """
+    Yields the primary keys of `queryset` in ascending chunks, seeking rather than offsetting.
+    """
+    queryset = queryset.order_by("pk").values_list("pk", flat=True)
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def deactivate_users(queryset, report: Report, chunk_size: int = 1000) -> None:
+    """
+    Deactivates the users of `queryset`, one transaction per chunk, without loading their instances.
+
+    As update() sends no signals, evicts them from the user cache and revokes their access tokens itself.
+    """
+    done, total = 0, queryset.count()
+    report(done, total)
+    for pks in iter_pk_chunks(queryset, chunk_size):
+        with transaction.atomic():
+            users = list(User.objects.filter(pk__in=pks, is_active=True).values_list("pk", "uuid"))
+            User.objects.filter(pk__in=[pk for pk, _ in users]).update(is_active=False)
+            transaction.on_commit(lambda users=users: invalidate_users(users))
+        done += len(pks)
+        report(done, total)
+
+
+def reset_auth_tokens(queryset, report: Report, chunk_size: int = 1000) -> None:
+    """
+    Replaces the auth tokens of the users of `queryset` and revokes their access tokens, a chunk at a time.
+
+    With settings.AUTH_TOKEN_LAZY the tokens are only deleted, new ones are issued on the next login.
+    """
+    done, total = 0, queryset.count()
+    report(done, total)
+    for pks in iter_pk_chunks(queryset, chunk_size):
+        with transaction.atomic():
+            Token.objects.filter(user_id__in=pks).delete()
+            if not settings.AUTH_TOKEN_LAZY:
+                Token.objects.bulk_create(make_tokens(pks))
+            transaction.on_commit(lambda pks=pks: revoke_access_tokens(*pks))
+        done += len(pks)
+        report(done, total)
+
+
+def invalidate_users(users: list[tuple[int, uuid.UUID]]) -> None:
+    user_cache.invalidate_many(users)
+    revoke_access_tokens(*(pk for pk, _ in users))
@@ -0,0 +1,367 @@
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from uuid import UUID
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from redis.exceptions import RedisError
+
+from backend.utils.redis import acquire_lock, get_redis_client, release_lock
+
+from .bloom import might_exist
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Cached in place of users that do not exist.
+MISSING = "missing"
+
+
+class LRUCache:
+    """
+    Thread safe, size bounded in-memory cache with a per entry time to live.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Caches users by primary key and by uuid in two tiers: a bounded LRU cache in every
+    process, backed by the shared Django cache.
+
+    Saving or deleting a user evicts them from the shared cache and, through Redis pub/sub,
+    from the local cache of every process. Concurrent misses are coalesced, see get_shared().
+    The local time to live only bounds staleness when an invalidation message is lost.
+    Password hashes are never cached; the instances returned load them from the database when accessed.
+
+    Users that do not exist are cached too, for USER_CACHE_NEGATIVE_TTL, and uuids the bloom
+    filter of user uuids has never seen are not looked up in the database at all.
+    """
+
+    cache_alias = "default"
+    channel = "users:cache:invalidate"
+    fields = [field for field in User._meta.concrete_fields if field.attname != "password"]
+    # Seconds a refresh lock is held at most, and how long to wait for another process's refresh.
+    lock_timeout = 5
+    lock_wait = 1
+    lock_poll_interval = 0.02
+    # Higher values make early refreshes more likely.
+    early_refresh_beta = 1.0
+
+    def __init__(self):
+        self.local = LRUCache(settings.USER_CACHE_LOCAL_SIZE, settings.USER_CACHE_LOCAL_TTL)
+        self.hits = {"local": 0, "shared": 0, "stale": 0, "negative": 0, "miss": 0}
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def get(self, pk: Optional[int] = None, uuid: Optional[UUID] = None) -> Optional[User]:
+        """
+        Returns the user with the given primary key or uuid, or None if there is none.
+        """
+        self.ensure_listener()
+        key = self.make_key(pk, uuid)
+
+        values = self.local.get(key)
+        if values == MISSING:
+            self.hits["negative"] += 1
+            return None
+        if values is not None:
+            self.hits["local"] += 1
+            return self.to_user(values)
+
+        values = self.coalesce(key, lambda: self.get_shared(key, pk, uuid))
+        return self.to_user(values) if values is not None else None
+
+    async def aget(self, pk: Optional[int] = None, uuid: Optional[UUID] = None) -> Optional[User]:
+        """
+        Async variant of get().
+
+        Local hits and fresh shared ones are served with the async cache API; refreshes,
+        which may wait on locks and the database, run get_shared() through sync_to_async().
+        """
+        self.ensure_listener()
+        key = self.make_key(pk, uuid)
+
+        values = self.local.get(key)
+        if values == MISSING:
+            self.hits["negative"] += 1
+            return None
+        if values is not None:
+            self.hits["local"] += 1
+            return self.to_user(values)
+
+        entry = await self.shared.aget(key)
+        if entry == MISSING:
+            self.hits["negative"] += 1
+            self.local.set(key, MISSING, settings.USER_CACHE_NEGATIVE_TTL)
+            return None
+        if entry is not None and not self.should_refresh(*entry[1:]):
+            self.hits["shared"] += 1
+            self.local.set(key, entry[0])
+            return self.to_user(entry[0])
+
+        values = await sync_to_async(self.coalesce)(key, lambda: self.get_shared(key, pk, uuid))
+        return self.to_user(values) if values is not None else None
+
+    def get_shared(self, key: str, pk: Optional[int], uuid: Optional[UUID]) -> Optional[tuple]:
+        """
+        Returns the cached values of a user from the shared tier, refreshing them from the database if needed.
+
+        Entries are kept for USER_CACHE_STALE_TTL past their expiry. Only the process holding
+        the refresh lock reloads a stale entry, the others keep serving the stale one meanwhile.
+        Entries are also refreshed early with a probability growing as they near expiry
+        (https://doi.org/10.14778/2757807.2757813), so hot users are rarely seen stale at all.
+        """
+        entry = self.shared.get(key)
+        if entry == MISSING:
+            self.hits["negative"] += 1
+            self.local.set(key, MISSING, settings.USER_CACHE_NEGATIVE_TTL)
+            return None
+
+        if entry is not None:
+            values, fresh_until, delta = entry
+            if not self.should_refresh(fresh_until, delta):
+                self.hits["shared"] += 1
+                self.local.set(key, values)
+                return values
+        elif uuid is not None and not might_exist(uuid):
+            self.hits["negative"] += 1
+            self.set_missing(key)
+            return None
+
+        try:
+            token = self.acquire(key)
+        except RedisError:
+            # Nobody can take the lock, so nobody would fill the cache for us to wait on.
+            return self.refresh(pk, uuid)
+
+        if token is None:
+            if entry is not None:
+                self.hits["stale"] += 1
+                return entry[0]
+
+            # Someone else is loading the user, wait for them rather than piling onto the database.
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(self.lock_poll_interval)
+                entry = self.shared.get(key)
+                if entry == MISSING:
+                    return None
+                if entry is not None:
+                    self.hits["shared"] += 1
+                    self.local.set(key, entry[0])
+                    return entry[0]
+            return self.refresh(pk, uuid)
+
+        try:
+            return self.refresh(pk, uuid)
+        finally:
+            self.release(key, token)
+
+    def refresh(self, pk: Optional[int], uuid: Optional[UUID]) -> Optional[tuple]:
+        self.hits["miss"] += 1
+        start = time.monotonic()
+        user = self.load(pk, uuid)
+        if user is None:
+            self.set_missing(self.make_key(pk, uuid))
+            return None
+
+        return self.set(user, delta=time.monotonic() - start)
+
+    def load(self, pk: Optional[int], uuid: Optional[UUID]) -> Optional[User]:
+        queryset = User.objects.filter(**({"pk": pk} if pk is not None else {"uuid": uuid}))
+        # Both are unique; first() would order by pk, adding a sort to the uuid lookup.
+        return next(iter(queryset.only(*(field.attname for field in self.fields)).order_by()[:1]), None)
+
+    def set(self, user: User, delta: float = 0) -> tuple:
+        """
+        Caches `user`; `delta` is how long it took to load, used for early refreshes.
+        """
+        values = tuple(getattr(user, field.attname) for field in self.fields)
+        keys = [self.make_key(pk=user.pk), self.make_key(uuid=user.uuid)]
+        for key in keys:
+            self.local.set(key, values)
+
+        entry = (values, time.time() + settings.USER_CACHE_TTL, delta)
+        self.shared.set_many(dict.fromkeys(keys, entry), settings.USER_CACHE_TTL + settings.USER_CACHE_STALE_TTL)
+        return values
+
+    def set_missing(self, key: str) -> None:
+        # Creating the user evicts this, like any other save.
+        self.local.set(key, MISSING, settings.USER_CACHE_NEGATIVE_TTL)
+        self.shared.set(key, MISSING, settings.USER_CACHE_NEGATIVE_TTL)
+
+    def should_refresh(self, fresh_until: float, delta: float) -> bool:
+        return time.time() - delta * self.early_refresh_beta * math.log(random.random()) >= fresh_until
+
+    def acquire(self, key: str) -> Optional[str]:
+        """
+        Returns the token of the refresh lock of `key`, or None when another process holds it.
+
+        Raises RedisError when Redis is unavailable, see backend.utils.redis.acquire_lock().
+        """
+        return acquire_lock(f"{key}:lock", self.lock_timeout, self.cache_alias)
+
+    def release(self, key: str, token: str) -> None:
+        release_lock(f"{key}:lock", token, self.cache_alias)
+
+    def coalesce(self, key: str, load: Callable[[], Optional[tuple]]) -> Optional[tuple]:
+        """
+        Calls `load` once for all threads of this process asking for `key` at the same time.
+        """
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {"done": threading.Event(), "values": None}
+
+        if not leader:
+            if flight["done"].wait(self.lock_timeout):
+                return flight["values"]
+            return load()
+
+        try:
+            flight["values"] = load()
+            return flight["values"]
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight["done"].set()
+
+    def invalidate(self, user: User) -> None:
+        self.invalidate_many([(user.pk, user.uuid)])
+
+    def invalidate_many(self, users: list[tuple[int, UUID]]) -> None:
+        """
+        Evicts the users with the given (primary key, uuid) pairs, without needing their instances.
+        """
+        keys = [key for pk, user_uuid in users for key in (self.make_key(pk=pk), self.make_key(uuid=user_uuid))]
+        self.local.delete(*keys)
+        self.shared.delete_many(keys)
+
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            return
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for pk, user_uuid in users:
+                pipeline.publish(self.channel, f"{pk}:{user_uuid}")
+            pipeline.execute()
+        except RedisError:
+            logger.warning("Could not publish the invalidation of %s users.", len(users), exc_info=True)
+
+    def hit_ratios(self) -> dict[str, float]:
+        """
+        Returns the share of lookups in this process served by every tier.
+        """
+        total = sum(self.hits.values())
+        return {tier: count / total if total else 0.0 for tier, count in self.hits.items()}
+
+    @staticmethod
+    def make_key(pk: Optional[int] = None, uuid: Optional[UUID] = None) -> str:
+        if pk is not None:
+            return f"users:pk:{pk}"
+        return f"users:uuid:{uuid}"
+
+    def to_user(self, values: tuple) -> User:
+        # A new instance every time, so requests never share (and mutate) one.
+        return User.from_db(router.db_for_read(User), [field.attname for field in self.fields], values)
+
+    def ensure_listener(self) -> None:
+        if self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            # Anything inherited from the parent process may have missed invalidations.
+            self.local.clear()
+            client = get_redis_client(self.cache_alias)
+            if client is not None:
+                self._listener = threading.Thread(
+                    target=self.listen, args=(client,), name="user-cache-invalidation", daemon=True
+                )
+                self._listener.start()
+
+    def listen(self, client) -> None:
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Invalidations published while we were not subscribed are lost.
+                self.local.clear()
+                for message in pubsub.listen():
+                    pk, user_uuid = message["data"].decode().split(":", 1)
+                    self.local.delete(self.make_key(pk=int(pk)), self.make_key(uuid=user_uuid))
+            except RedisError:
+                logger.warning("User cache invalidation listener lost its connection.", exc_info=True)
+                time.sleep(1)
+
+
+user_cache = UserCache()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance=None, **kwargs):
+    user_cache.invalidate(instance)
+    if transaction.get_connection().in_atomic_block:
+        # Once more after commit, as other processes may have cached the old row in the meantime.
+        transaction.on_commit(lambda: user_cache.invalidate(instance))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from backend.utils.index_advisor import IndexAdvisor
+
+
+def format_size(size) -> str:
+    if size is None:
+        return "size n/a"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_writes(writes) -> str:
+    return "writes n/a" if writes is None else f"{writes} entries written"
+
+
+class Command(BaseCommand):
+    help = (
+        "Flags redundant, unused and missing indexes of the tables of the installed apps, "
+        "with their size and write overhead. Reads pg_stat_user_indexes and pg_stat_statements on PostgreSQL; "
+        "on SQLite, pass a workload of SQL statements to tell used indexes from unused ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--workload", help="File of SQL statements separated by semicolons, e.g. from the slow query log."
+        )
+        parser.add_argument(
+            "--min-calls", type=int, default=1, help="Calls a predicate needs before it is worth an index."
+        )
+
+    def handle(self, *args, database, workload, min_calls, **options):
+        statements = []
+        if workload:
+            with open(workload, encoding="utf-8") as file:
+                statements = [statement.strip() for statement in file.read().split(";") if statement.strip()]
+
+        advisor = IndexAdvisor(database, statements)
+        reset = advisor.stats_reset()
+        self.stdout.write(f"{len(advisor.indexes)} indexes on {len(advisor.tables)} tables.")
+        if reset:
+            self.stdout.write(f"Usage counted since {reset}.")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Redundant indexes:"))
+        for index, other in advisor.redundant():
+            self.stdout.write(
+                f"  {index['table']}.{index['name']} is covered by {other['name']} "
+                f"({format_size(index['size'])}, {format_writes(index['writes'])})"
+            )
+        for field in advisor.redundant_declarations():
+            self.stdout.write(f"  {field} declares db_index=True, its unique=True already creates an index")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Unused indexes:"))
+        if advisor.indexes and all(index["scans"] is None for index in advisor.indexes):
+            self.stdout.write("  No usage statistics, pass --workload.")
+        for index in advisor.unused():
+            self.stdout.write(
+                f"  {index['table']}.{index['name']} was never scanned "
+                f"({format_size(index['size'])}, {format_writes(index['writes'])})"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Missing indexes:"))
+        for entry in advisor.missing(min_calls):
+            time = "" if entry["time"] is None else f", {entry['time']:.0f} ms in total"
+            estimate = f"{format_size(entry['size'])}, {format_writes(entry['writes'])}"
+            self.stdout.write(
+                f"  {entry['table']} ({entry['key']}) is filtered on by {entry['statements']} statements, "
+                f"{entry['calls']} calls{time} (new index: {estimate})"
+            )
+
+        for note in advisor.notes:
+            self.stderr.write(note)
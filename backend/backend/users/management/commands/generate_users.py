@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.db.models import Max
+from django.utils import timezone
+
+from backend.users.models import Token
+from backend.users.synthetic import generate_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic users with realistic names, emails and join dates, along with their auth tokens, "
+        "to reproduce production-scale query plans locally. Every user gets the same password, hashed once. "
+        "Chunks are built and inserted (with COPY on PostgreSQL) by parallel processes, each in its own "
+        "transaction; the same --seed, --start and --chunk-size always give the same users. "
+        "Never run it in production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int, help="Number of users to generate.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--start", type=int, help="Number of the first user, in usernames. By default, follows the highest id."
+        )
+        parser.add_argument("--password", default="password", help="Password of every generated user.")
+        parser.add_argument("--days", type=int, default=5 * 365, help="Days the join dates span, up to now.")
+        parser.add_argument("--chunk-size", type=int, default=20000, help="Users built and inserted at once.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Processes building and inserting chunks."
+        )
+        parser.add_argument(
+            "--skip-tokens",
+            action="store_true",
+            help="Do not create auth tokens, implied by settings.AUTH_TOKEN_LAZY.",
+        )
+
+    def handle(self, *args, count, seed, start, password, days, chunk_size, workers, skip_tokens, **options):
+        try:
+            import faker  # noqa: F401
+        except ImportError:
+            raise CommandError("Generating users needs Faker, from requirements/local.txt.")
+
+        if start is None:
+            start = (User.objects.aggregate(Max("pk"))["pk__max"] or 0) + 1
+        tokens = not (skip_tokens or settings.AUTH_TOKEN_LAZY)
+        # Hashing a password takes as long as inserting thousands of users, so they all share one hash.
+        chunk_args = (seed, make_password(password), timezone.now(), days, tokens)
+        chunks = [(chunk, min(chunk_size, start + count - chunk)) for chunk in range(start, start + count, chunk_size)]
+        self.stdout.write(f"Generating users {start} to {start + count - 1} with seed {seed}.")
+
+        started = time.monotonic()
+        if workers <= 1:
+            generated = self.track((generate_users(chunk, size, *chunk_args) for chunk, size in chunks), started)
+        else:
+            # Spawned, like the workers of backend.users.bulk.PasswordHasherPool, with connections of their own.
+            with ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+            ) as executor:
+                futures = [executor.submit(generate_users, chunk, size, *chunk_args) for chunk, size in chunks]
+                generated = self.track((future.result() for future in as_completed(futures)), started)
+
+        using = router.db_for_write(User)
+        if connections[using].vendor == "postgresql":
+            # Fresh statistics, so query plans reflect the new rows right away.
+            with connections[using].cursor() as cursor:
+                for model in (User, Token):
+                    cursor.execute(f"ANALYZE {connections[using].ops.quote_name(model._meta.db_table)}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {generated} users in {elapsed:.1f}s ({generated / elapsed if elapsed else 0:.0f} rows/s)."
+            )
+        )
+
+    def track(self, results: Iterator[int], started: float) -> int:
+        # Reports progress as chunks are done, returns the number of users generated.
+        generated = 0
+        for count in results:
+            generated += count
+            rate = generated / (time.monotonic() - started)
+            self.stdout.write(f"Generated {generated} users so far, {rate:.0f} rows/s.", ending="\r")
+        return generated
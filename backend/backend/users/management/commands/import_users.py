@@ -0,0 +1,96 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Iterator, TextIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.users.bulk import PasswordHasherPool, clean_rows, create_users
+
+
+def read_csv(file: TextIO) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(file: TextIO) -> Iterator[tuple[int, dict]]:
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError as error:
+            # Reported by clean_row() along with the other invalid rows.
+            yield line, ValidationError(f"Invalid JSON: {error}.")
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users from a CSV or JSON lines file with the columns username, email, first_name, last_name "
+        "and optionally uuid, date_joined and either password or password_hash (in Django's format). "
+        "Invalid rows are reported and skipped; every chunk is inserted in its own transaction, "
+        "with COPY on PostgreSQL. Signals are not sent and password validators are not run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='File to import, "-" for standard input.')
+        parser.add_argument("--format", choices=READERS, help="Input format, by default taken from the file name.")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Rows validated and inserted at once.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Processes hashing plain text passwords."
+        )
+        parser.add_argument(
+            "--skip-tokens",
+            action="store_true",
+            help="Do not create auth tokens, implied by settings.AUTH_TOKEN_LAZY.",
+        )
+
+    def handle(self, *args, path, format, chunk_size, workers, skip_tokens, **options):
+        if format is None:
+            format = os.path.splitext(path)[1].lstrip(".").lower()
+            if format not in READERS:
+                raise CommandError("Could not tell the format from the file name, pass --format.")
+
+        file = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        rows = READERS[format](file)
+        imported = skipped = 0
+        start = time.monotonic()
+
+        try:
+            with PasswordHasherPool(workers) as hasher:
+                while chunk := list(itertools.islice(rows, chunk_size)):
+                    valid, errors = clean_rows(chunk)
+                    for line, message in errors:
+                        self.stderr.write(f"Line {line}: {message}")
+                    skipped += len(errors)
+
+                    to_hash = [(user, password) for user, password in valid if password is not None]
+                    for (user, _), password_hash in zip(to_hash, hasher.hash([password for _, password in to_hash])):
+                        user.password = password_hash
+
+                    users = [user for user, _ in valid]
+                    if users:
+                        create_users(users, tokens=not (skip_tokens or settings.AUTH_TOKEN_LAZY))
+                    imported += len(users)
+                    rate = imported / (time.monotonic() - start)
+                    self.stdout.write(f"Imported {imported} users so far, {rate:.0f} rows/s.", ending="\r")
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} users in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f} rows/s), "
+                f"skipped {skipped} invalid rows."
+            )
+        )
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.users.models import Token
+
+
+class Command(BaseCommand):
+    help = "Deletes expired auth tokens in small batches, each in its own short transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Tokens deleted per transaction.")
+        parser.add_argument("--sleep", type=float, default=0.1, help="Seconds to pause between batches.")
+
+    def handle(self, *args, batch_size, sleep, **options):
+        # Tokens expiring while the command runs are left for the next run,
+        # so the loop always ends.
+        now = timezone.now()
+        expired = Token.objects.filter(expires_at__lte=now).order_by("expires_at")
+        deleted = 0
+
+        while True:
+            # Uses the expires_at index; deleting by primary key keeps the locked rows to the batch itself.
+            keys = list(expired.values_list("pk", flat=True)[:batch_size])
+            if not keys:
+                break
+
+            deleted += Token.objects.filter(pk__in=keys).delete()[0]
+            self.stdout.write(f"Deleted {deleted} expired tokens so far.", ending="\r")
+            if sleep and len(keys) == batch_size:
+                time.sleep(sleep)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens."))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.users.bloom import rebuild_user_uuid_filter, user_uuid_filter
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the bloom filter used to reject lookups of user uuids that do not exist."
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        count = rebuild_user_uuid_filter()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Added {count} uuids to a {user_uuid_filter.size // 8 // 1024} KiB filter "
+                f"({user_uuid_filter.hash_count} hashes) in {time.monotonic() - start:.1f}s."
+            )
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.4 on 2026-10-19 13:25
+
+import backend.users.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_authtoken_tokens(apps, schema_editor):
+    """Carry over the tokens of rest_framework.authtoken, which is no longer installed."""
+    connection = schema_editor.connection
+    if "authtoken_token" not in connection.introspection.table_names():
+        return
+
+    Token = apps.get_model("users", "Token")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {Token._meta.db_table} (key, user_id, created, expires_at) "
+            "SELECT key, user_id, created, %s FROM authtoken_token",
+            [timezone.now() + settings.AUTH_TOKEN_TTL],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_remove_user_name_user_first_name_user_last_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Token',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='Key')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created')),
+                ('expires_at', models.DateTimeField(db_index=True, default=backend.users.models.get_token_expiry, verbose_name='Expires at')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='auth_token', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Token',
+                'verbose_name_plural': 'Tokens',
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(copy_authtoken_tokens, migrations.RunPython.noop),
+        # Nothing deletes from it anymore, and its foreign key would keep users who had a token from being deleted.
+        migrations.RunSQL("DROP TABLE IF EXISTS authtoken_token", migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.0.4 on 2026-10-19 13:41
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, so the users table stays writable meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('users', '0003_token'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['date_joined', 'id'], name='users_user_joined_id_idx'),
+        ),
+        # Django 4.0 wraps OpClass() expressions in one parenthesis too many, hence the raw SQL.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX CONCURRENTLY "users_user_lower_username_idx" '
+                    'ON "users_user" ((LOWER("username"::text)) text_pattern_ops)',
+                    'DROP INDEX CONCURRENTLY "users_user_lower_username_idx"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='user',
+                    index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('username'), name='text_pattern_ops'), name='users_user_lower_username_idx'),
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='users_user_lower_email_idx'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='date_joined',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Join date'),
+        ),
+    ]
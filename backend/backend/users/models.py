@@ -2,11 +2,16 @@ import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.models import Token as BaseToken
+
+from .access_tokens import revoke_access_tokens
 
 
 class User(AbstractUser):
@@ -14,16 +19,102 @@ class User(AbstractUser):
     Custom user model.
     """
 
-    # Join date.
-    date_joined = models.DateTimeField(_("Join date"), auto_now_add=True, db_index=True)
+    # Join date, indexed together with the id, see Meta.indexes.
+    date_joined = models.DateTimeField(_("Join date"), auto_now_add=True)
     # UUID.
     uuid = models.UUIDField(_("UUID"), default=uuid.uuid4, editable=False, unique=True, db_index=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Newest first ordering of the admin changelist, with the id breaking ties.
+            models.Index(fields=("date_joined", "id"), name="users_user_joined_id_idx"),
+            # Case-insensitive logins and admin searches, see backend.users.backends. The pattern opclass
+            # serves the prefix searches of the admin as well as equality.
+            models.Index(OpClass(Lower("username"), name="text_pattern_ops"), name="users_user_lower_username_idx"),
+            models.Index(Lower("email"), name="users_user_lower_email_idx"),
+        ]
+
     def __str__(self):
         return self.username
 
 
+def get_token_expiry():
+    return timezone.now() + settings.AUTH_TOKEN_TTL
+
+
+class Token(BaseToken):
+    """
+    Auth token which expires when it has not been used for settings.AUTH_TOKEN_TTL.
+
+    Replaces rest_framework.authtoken, which is left out of INSTALLED_APPS
+    so that its Token model is abstract.
+    """
+
+    # Expiry date, pushed back on use.
+    expires_at = models.DateTimeField(_("Expires at"), default=get_token_expiry, db_index=True)
+
+    def is_expired(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+    def refresh(self) -> bool:
+        """
+        Pushes the expiry date back, at most once per settings.AUTH_TOKEN_REFRESH_INTERVAL.
+
+        Returns whether the token was written to.
+        """
+        now = timezone.now()
+        if self.expires_at - settings.AUTH_TOKEN_TTL + settings.AUTH_TOKEN_REFRESH_INTERVAL > now:
+            return False
+
+        self.expires_at = now + settings.AUTH_TOKEN_TTL
+        Token.objects.filter(pk=self.pk).update(expires_at=self.expires_at)
+        return True
+
+    def rotate(self) -> None:
+        """
+        Replaces the key, which invalidates the old one, and restarts the expiry.
+
+        When the token was rotated by a concurrent login or purged in the meantime, this takes
+        the user's current token instead, issuing one if needed.
+        """
+        old_key, self.key = self.key, self.generate_key()
+        self.expires_at = get_token_expiry()
+        if Token.objects.filter(pk=old_key).update(key=self.key, expires_at=self.expires_at):
+            return
+
+        token = get_or_issue_token(self.user)
+        self.key, self.created, self.expires_at = token.key, token.created, token.expires_at
+
+
+def get_or_issue_token(user: User) -> Token:
+    """
+    Returns the auth token of `user`, issuing one if it has none yet.
+
+    Concurrent calls for the same user all return the same token: the insert does nothing
+    on conflict with the unique user_id, and the token is read back afterwards.
+    """
+    try:
+        return Token.objects.get(user=user)
+    except Token.DoesNotExist:
+        pass
+
+    Token.objects.bulk_create([Token(key=Token.generate_key(), user=user)], ignore_conflicts=True)
+    return Token.objects.get(user=user)
+
+
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
-    if created:
+    if created and not settings.AUTH_TOKEN_LAZY:
         Token.objects.create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_access_tokens_of_inactive_user(sender, instance=None, created=False, **kwargs):
+    # set_password() keeps the raw password in `_password` until the save completes.
+    if not created and (not instance.is_active or instance._password is not None):
+        revoke_access_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_access_tokens_of_deleted_user(sender, instance=None, **kwargs):
+    revoke_access_tokens(instance.pk)
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from .models import get_or_issue_token
+
 User = get_user_model()
 
 
@@ -18,12 +21,34 @@ class UserSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("username", "date_joined", "uuid",)
 
+    def update(self, instance, validated_data):
+        # Writes only the columns which changed, and nothing at all when none did,
+        # rather than every column of the row like ModelSerializer.update().
+        changed = [field for field, value in validated_data.items() if getattr(instance, field) != value]
+        if not changed:
+            return instance
+
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        instance.save(update_fields=changed)
+        return instance
+
 
 class CreateUserSerializer(serializers.ModelSerializer):
+    issue_auth_token = serializers.BooleanField(
+        write_only=True,
+        default=False,
+        help_text="Return an auth token right away, otherwise it is issued on the first login "
+        "when auth tokens are issued lazily.",
+    )
+
     def create(self, validated_data):
+        issue_auth_token = validated_data.pop("issue_auth_token")
         # call create_user on user object. Without this
         # the password will be stored in plain text.
         user = User.objects.create_user(**validated_data)
+        if settings.AUTH_TOKEN_LAZY and issue_auth_token:
+            user.auth_token = get_or_issue_token(user)
         return user
 
     class Meta:
@@ -38,6 +63,7 @@ class CreateUserSerializer(serializers.ModelSerializer):
             "date_joined",
             "uuid",
             "auth_token",
+            "issue_auth_token",
         )
         read_only_fields = ("auth_token", "date_joined", "uuid",)
         extra_kwargs = {
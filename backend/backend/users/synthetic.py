@@ -0,0 +1,79 @@
+import random
+import re
+import uuid
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+
+from .bulk import create_users
+
+User = get_user_model()
+
+# Share of users who are active and who have logged in at least once.
+ACTIVE_RATIO = 0.97
+LOGGED_IN_RATIO = 0.7
+EMAIL_DOMAINS = {"gmail.com": 0.55, "yahoo.com": 0.15, "hotmail.com": 0.12, "outlook.com": 0.08, "example.com": 0.1}
+
+
+class Names:
+    """
+    First and last names with their frequency in the US population, from Faker's en_US person provider.
+
+    Sampling by frequency reproduces the skew of real data (many more Smiths than Zamoras), which
+    the planner's estimates for name and email lookups depend on.
+    """
+
+    def __init__(self):
+        # Faker comes with factory-boy, in requirements/local.txt.
+        from faker.providers.person.en_US import Provider
+
+        first_names = {**Provider.first_names_female, **Provider.first_names_male}
+        self.first, self.first_weights = list(first_names), list(accumulate(first_names.values()))
+        self.last, self.last_weights = list(Provider.last_names), list(accumulate(Provider.last_names.values()))
+        self.domains, self.domain_weights = list(EMAIL_DOMAINS), list(accumulate(EMAIL_DOMAINS.values()))
+
+
+def build_users(start: int, count: int, seed: int, password_hash: str, until: datetime, days: int) -> list[User]:
+    """
+    Returns `count` unsaved synthetic users, numbered from `start`, all with the same `password_hash`.
+
+    Every chunk draws from its own generator seeded with `seed` and `start`, so the same users
+    come out whichever way chunks are split across processes. Join dates span the `days` before
+    `until`, more of them recent, like a growing user base.
+    """
+    names = Names()
+    rng = random.Random(f"{seed}:{start}")
+    first_names = rng.choices(names.first, cum_weights=names.first_weights, k=count)
+    last_names = rng.choices(names.last, cum_weights=names.last_weights, k=count)
+    domains = rng.choices(names.domains, cum_weights=names.domain_weights, k=count)
+
+    users = []
+    span = timedelta(days=days).total_seconds()
+    for index, first_name, last_name, domain in zip(range(start, start + count), first_names, last_names, domains):
+        local_part = re.sub(r"[^a-z.]", "", f"{first_name}.{last_name}".lower())
+        date_joined = until - timedelta(seconds=span * rng.random() ** 2)
+        logged_in = rng.random() < LOGGED_IN_RATIO
+        users.append(
+            User(
+                username=f"{local_part}{index}",
+                email=f"{local_part}{index}@{domain}",
+                first_name=first_name,
+                last_name=last_name,
+                password=password_hash,
+                uuid=uuid.UUID(int=rng.getrandbits(128), version=4),
+                date_joined=date_joined,
+                last_login=date_joined + (until - date_joined) * rng.random() if logged_in else None,
+                is_active=rng.random() < ACTIVE_RATIO,
+            )
+        )
+    return users
+
+
+def generate_users(start: int, count: int, seed: int, password_hash: str, until: datetime, days: int, tokens: bool):
+    """
+    Builds and inserts a chunk of synthetic users, see build_users(). Returns the number inserted.
+    """
+    users = build_users(start, count, seed, password_hash, until, days)
+    create_users(users, tokens=tokens)
+    return len(users)
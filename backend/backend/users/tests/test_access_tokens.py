@@ -0,0 +1,204 @@
+from datetime import timedelta
+from typing import Callable
+
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+from redis import Redis
+from rest_framework import exceptions
+from rest_framework.test import APIClient
+
+from backend.users.access_tokens import (
+    InvalidAccessToken,
+    get_ttl_us,
+    issue_access_token,
+    now_us,
+    revocations,
+    revoke_access_tokens,
+    verify_access_token,
+)
+from backend.users.authentication import SignedAccessTokenAuthentication
+from backend.users.cache import user_cache
+from backend.users.models import Token, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_revocations() -> None:
+    revocations.revoked, revocations.loaded_at = {}, None
+
+
+def test_api_auth_token_issues_access_token(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+):
+    user = make_user(password="p@ssw0rd")
+    response = api_client.post(path="/api-token-auth/", data={"username": user.username, "password": "p@ssw0rd"})
+    assert response.status_code == 200
+
+    access_token = response.json().get("access_token")
+    url = reverse("user-detail", kwargs={"uuid": user.uuid})
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+
+    response = api_client.patch(path=url, data={"first_name": "new_first_name"})
+    assert response.status_code == 200
+    assert response.json().get("first_name") == "new_first_name"
+
+
+def test_authentication_without_queries(
+    make_user: Callable[..., User],
+    rf: RequestFactory,
+    django_assert_num_queries,
+):
+    user = make_user()
+    access_token, _ = issue_access_token(user)
+    revocations.sync()
+    user_cache.get(pk=user.pk)
+    request = rf.get("/", HTTP_AUTHORIZATION=f"Bearer {access_token}")
+
+    with django_assert_num_queries(0):
+        authenticated, _ = SignedAccessTokenAuthentication().authenticate(request)
+        assert authenticated == user
+        assert authenticated.uuid == user.uuid
+        assert authenticated.username == user.username
+
+
+def test_tampered_access_token(
+    make_user: Callable[..., User],
+):
+    access_token, _ = issue_access_token(make_user())
+    user_id, rest = access_token.split(".", 1)
+
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(f"{int(user_id) + 1}.{rest}")
+
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token("invalid")
+
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(f"{access_token.rsplit('.', 1)[0]}.é")
+
+
+def test_non_ascii_access_token(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+):
+    user = make_user()
+    api_client.credentials(HTTP_AUTHORIZATION="Bearer 1.2.3.zażółć".encode().decode("latin-1"))
+
+    response = api_client.get(reverse("user-detail", kwargs={"uuid": user.uuid}))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Invalid signature."
+
+
+def test_expired_access_token(
+    make_user: Callable[..., User],
+    settings,
+):
+    settings.ACCESS_TOKEN_TTL = timedelta(seconds=-1)
+    access_token, _ = issue_access_token(make_user())
+
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(access_token)
+
+
+def test_revoked_access_token(
+    make_user: Callable[..., User],
+):
+    user = make_user()
+    access_token, _ = issue_access_token(user)
+    assert verify_access_token(access_token)[0] == user.pk
+
+    revoke_access_tokens(user.pk)
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(access_token)
+
+    access_token, _ = issue_access_token(user)
+    assert verify_access_token(access_token)[0] == user.pk
+
+
+def test_access_tokens_revoked_on_deactivation(
+    make_user: Callable[..., User],
+):
+    user = make_user()
+    access_token, _ = issue_access_token(user)
+
+    user.is_active = False
+    user.save()
+
+    # Another process picks the revocation up from the cache.
+    revocations.revoked = {}
+    revocations.sync()
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(access_token)
+
+
+@pytest.mark.parametrize("change", ["password", "delete"])
+def test_access_tokens_revoked_on_password_change_and_deletion(
+    make_user: Callable[..., User],
+    change: str,
+):
+    user = make_user()
+    access_token, _ = issue_access_token(user)
+
+    if change == "password":
+        user.set_password("n3w-p@ssw0rd")
+        user.save()
+    else:
+        user.delete()
+
+    revocations.revoked = {}
+    revocations.sync()
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(access_token)
+
+
+def test_revocations_shared_in_redis(
+    make_user: Callable[..., User],
+    redis_cache: Redis,
+):
+    user = make_user()
+    access_token, _ = issue_access_token(user)
+    redis_cache.hset(revocations.cache_key, "0", now_us() - get_ttl_us() - 1)
+
+    revoke_access_tokens(user.pk)
+    assert set(redis_cache.hkeys(revocations.cache_key)) == {b"0", str(user.pk).encode()}
+
+    # Another process loads them, dropping those older than any token still valid.
+    revocations.revoked = {}
+    revocations.sync()
+    assert list(revocations.revoked) == [user.pk]
+    assert redis_cache.hkeys(revocations.cache_key) == [str(user.pk).encode()]
+    with pytest.raises(InvalidAccessToken):
+        verify_access_token(access_token)
+
+
+@pytest.mark.parametrize("change", ["deactivate", "delete"])
+def test_access_token_of_user_gone_while_redis_is_down(
+    make_user: Callable[..., User],
+    rf: RequestFactory,
+    redis_cache: Redis,
+    monkeypatch,
+    change: str,
+):
+    user = make_user()
+    access_token, _ = issue_access_token(user)
+    request = rf.get("/", HTTP_AUTHORIZATION=f"Bearer {access_token}")
+    assert SignedAccessTokenAuthentication().authenticate(request)[0] == user
+
+    # Changed by another process, whose revocation never reaches this one.
+    monkeypatch.setattr(redis_cache.connection_pool.connection_kwargs["server"], "connected", False)
+    if change == "deactivate":
+        User.objects.filter(pk=user.pk).update(is_active=False)
+    else:
+        for queryset in (Token.objects.filter(user=user), User.objects.filter(pk=user.pk)):
+            queryset._raw_delete(queryset.db)
+    revocations.revoked = {}
+    revocations.sync()
+    assert verify_access_token(access_token)[0] == user.pk
+
+    # The local user cache entry expires.
+    user_cache.local.clear()
+    with pytest.raises(exceptions.AuthenticationFailed):
+        SignedAccessTokenAuthentication().authenticate(request)
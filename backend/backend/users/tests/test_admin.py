@@ -0,0 +1,99 @@
+import re
+import time
+from typing import Callable
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from backend.users.bulk import deactivate_users, reset_auth_tokens
+from backend.users.cache import user_cache
+from backend.users.models import Token, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users(make_user: Callable[..., User]) -> list[User]:
+    return [
+        make_user(username="alice", email="alice@example.com"),
+        make_user(username="alicia", email="alicia@example.com"),
+        make_user(username="bob", email="bob@example.com"),
+    ]
+
+
+def search(admin_client: Client, term: str) -> list[str]:
+    response = admin_client.get(reverse("admin:users_user_changelist"), {"q": term})
+    assert response.status_code == 200
+    return sorted(user.username for user in response.context["cl"].result_list)
+
+
+def test_changelist_does_not_load_passwords(admin_client: Client, users: list[User]):
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(reverse("admin:users_user_changelist"))
+    assert response.status_code == 200
+
+    users_queries = [query["sql"] for query in context.captured_queries if 'FROM "users_user"' in query["sql"]]
+    listing = [sql for sql in users_queries if "ORDER BY" in sql]
+    assert listing and all('"users_user"."password"' not in sql for sql in listing)
+    assert [user.username for user in response.context["cl"].result_list][:3] == ["bob", "alicia", "alice"]
+
+
+def test_changelist_search(admin_client: Client, users: list[User]):
+    assert search(admin_client, "ali") == ["alice", "alicia"]
+    assert search(admin_client, "ALICE") == ["alice"]
+    assert search(admin_client, "Bob@Example.com") == ["bob"]
+    assert search(admin_client, "example") == []
+    assert search(admin_client, str(users[1].uuid)) == ["alicia"]
+
+
+def test_deactivate_users(make_user: Callable[..., User], django_capture_on_commit_callbacks, monkeypatch):
+    users = [make_user() for _ in range(5)]
+    revoked = []
+    monkeypatch.setattr("backend.users.bulk.revoke_access_tokens", lambda *pks: revoked.extend(pks))
+    assert user_cache.get(pk=users[0].pk).is_active
+
+    progress = []
+    with django_capture_on_commit_callbacks(execute=True):
+        selected = User.objects.filter(pk__in=[user.pk for user in users[:3]])
+        deactivate_users(selected, lambda done, total: progress.append((done, total)), chunk_size=2)
+
+    assert progress == [(0, 3), (2, 3), (3, 3)]
+    assert sorted(User.objects.filter(is_active=False).values_list("pk", flat=True)) == [user.pk for user in users[:3]]
+    assert sorted(revoked) == [user.pk for user in users[:3]]
+    assert not user_cache.get(pk=users[0].pk).is_active
+
+
+def test_reset_auth_tokens(make_user: Callable[..., User], django_capture_on_commit_callbacks, monkeypatch):
+    users = [make_user() for _ in range(3)]
+    keys = dict(Token.objects.values_list("user_id", "key"))
+    revoked = []
+    monkeypatch.setattr("backend.users.bulk.revoke_access_tokens", lambda *pks: revoked.extend(pks))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reset_auth_tokens(User.objects.filter(pk__in=[user.pk for user in users[:2]]), lambda *args: None)
+
+    new_keys = dict(Token.objects.values_list("user_id", "key"))
+    assert new_keys.keys() == keys.keys()
+    assert [new_keys[user.pk] != keys[user.pk] for user in users] == [True, True, False]
+    assert sorted(revoked) == [user.pk for user in users[:2]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_action_runs_in_background(admin_client: Client, make_user: Callable[..., User]):
+    users = [make_user() for _ in range(3)]
+    response = admin_client.post(
+        reverse("admin:users_user_changelist"),
+        {"action": "deactivate_selected", "_selected_action": [user.pk for user in users]},
+        follow=True,
+    )
+    assert response.status_code == 200
+    url = re.search(r'href="([^"]+/jobs/[0-9a-f]+/)"', response.content.decode()).group(1)
+
+    deadline = time.monotonic() + 5
+    while (job := admin_client.get(url).json())["status"] == "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job == {"name": "deactivate_users", "status": "done", "done": 3, "total": 3}
+    assert not User.objects.filter(pk__in=[user.pk for user in users], is_active=True).exists()
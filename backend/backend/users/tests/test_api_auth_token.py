@@ -1,9 +1,11 @@
 from typing import Callable
 
 import pytest
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 
-from backend.users.models import User
+from backend.users.models import Token, User
 
 pytestmark = pytest.mark.django_db
 
@@ -25,3 +27,44 @@ def test_api_auth_token_with_invalid_data(
 ):
     response = api_client.post(path='/api-token-auth/', data={"username": "invalid", "password": "invalid"})
     assert response.status_code == 400
+
+
+def test_api_auth_token_rotates_expired_token(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+):
+    user = make_user(password="p@ssw0rd")
+    Token.objects.filter(user=user).update(expires_at=timezone.now())
+    old_key = user.auth_token.key
+
+    response = api_client.post(path='/api-token-auth/', data={"username": user.username, "password": "p@ssw0rd"})
+    assert response.status_code == 200
+    assert response.json().get("token") != old_key
+
+
+def test_api_with_expired_token(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+):
+    user = make_user()
+    Token.objects.filter(user=user).update(expires_at=timezone.now())
+    url = reverse("user-detail", kwargs={"uuid": user.uuid})
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {user.auth_token}")
+
+    response = api_client.patch(path=url, data={"first_name": "new_first_name"})
+    assert response.status_code == 403
+
+
+def test_api_auth_token_issues_lazy_token(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+    settings,
+):
+    settings.AUTH_TOKEN_LAZY = True
+    user = make_user(password="p@ssw0rd")
+    assert not Token.objects.filter(user=user).exists()
+
+    data = {"username": user.username, "password": "p@ssw0rd"}
+    token = api_client.post(path='/api-token-auth/', data=data).json()["token"]
+    assert Token.objects.get(user=user).key == token
+    assert api_client.post(path='/api-token-auth/', data=data).json()["token"] == token
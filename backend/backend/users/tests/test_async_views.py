@@ -0,0 +1,159 @@
+import collections
+import importlib
+import json
+from typing import Callable
+from uuid import UUID
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, AsyncRequestFactory
+from django.urls import clear_url_caches, resolve
+
+import config.urls
+from backend.users.async_views import obtain_auth_token, user_detail
+from backend.users.models import User
+from backend.users.serializers import UserSerializer
+from backend.users.throttling import SlidingWindowRateThrottle
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.ASYNC_VIEWS = True
+    importlib.reload(config.urls)
+    clear_url_caches()
+    yield
+    settings.ASYNC_VIEWS = False
+    importlib.reload(config.urls)
+    clear_url_caches()
+
+
+def call(view, method: str, path: str, data=None, **kwargs):
+    factory = AsyncRequestFactory()
+    if data is None:
+        request = getattr(factory, method)(path, **kwargs)
+    else:
+        request = getattr(factory, method)(path, data=json.dumps(data), content_type="application/json", **kwargs)
+    return async_to_sync(view)(request, **({"uuid": UUID(path.split("/")[-2])} if view is user_detail else {}))
+
+
+def test_user_detail_retrieve(
+    make_user: Callable[..., User],
+    django_assert_num_queries,
+):
+    user = make_user()
+    path = f"/api/v1/users/{user.uuid}/"
+
+    response = call(user_detail, "get", path)
+    assert response.status_code == 200
+    assert json.loads(response.content) == json.loads(json.dumps(UserSerializer(user).data))
+
+    with django_assert_num_queries(0):
+        assert call(user_detail, "get", path).status_code == 200
+
+
+def test_user_detail_retrieve_not_found():
+    response = call(user_detail, "get", "/api/v1/users/6a1c2b9e-0f56-4f7e-9d49-3c1f5f6a2b10/")
+    assert response.status_code == 404
+    assert json.loads(response.content) == {"detail": "Not found."}
+
+
+def test_async_urls(async_views):
+    assert resolve("/api/v1/users/6a1c2b9e-0f56-4f7e-9d49-3c1f5f6a2b10/").func is user_detail
+    assert resolve("/api/v1/users/export/").url_name == "user-export"
+    assert resolve("/api/v1/users/invalid/").func is not user_detail
+
+
+def test_user_detail_update(
+    make_user: Callable[..., User],
+):
+    user = make_user(first_name="old_first_name")
+    path = f"/api/v1/users/{user.uuid}/"
+
+    token = f"Token {user.auth_token}"
+
+    response = call(user_detail, "patch", path, {"first_name": "new_first_name"}, authorization=token)
+    assert response.status_code == 200
+    assert json.loads(response.content)["first_name"] == "new_first_name"
+    assert User.objects.get(pk=user.pk).first_name == "new_first_name"
+
+    response = call(user_detail, "patch", path, {"email": "invalid"}, authorization=token)
+    assert response.status_code == 400
+    assert "email" in json.loads(response.content)
+
+
+def test_user_detail_update_with_idempotency_key(
+    make_user: Callable[..., User],
+    django_capture_on_commit_callbacks,
+):
+    user = make_user()
+    path = f"/api/v1/users/{user.uuid}/"
+    headers = {"authorization": f"Token {user.auth_token}", "idempotency_key": "update-1"}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = call(user_detail, "patch", path, {"first_name": "first"}, **headers)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response
+
+    User.objects.filter(pk=user.pk).update(first_name="changed")
+    response = call(user_detail, "patch", path, {"first_name": "first"}, **headers)
+    assert response["Idempotent-Replayed"] == "true"
+    assert json.loads(response.content)["first_name"] == "first"
+    assert User.objects.get(pk=user.pk).first_name == "changed"
+
+
+def test_user_detail_update_forbidden(
+    make_user: Callable[..., User],
+):
+    user, other = make_user(), make_user()
+    path = f"/api/v1/users/{user.uuid}/"
+
+    assert call(user_detail, "patch", path, {"first_name": "x"}).status_code == 403
+    assert call(user_detail, "patch", path, {"first_name": "x"}, authorization="Token invalid").status_code == 403
+    response = call(user_detail, "put", path, {"first_name": "x"}, authorization=f"Token {other.auth_token}")
+    assert response.status_code == 403
+    assert call(user_detail, "delete", path).status_code == 405
+
+
+def test_obtain_auth_token(
+    make_user: Callable[..., User],
+    monkeypatch,
+):
+    monkeypatch.setattr(SlidingWindowRateThrottle, "THROTTLE_RATES", {"login": "100/min", "login_username": "2/min"})
+    monkeypatch.setattr(SlidingWindowRateThrottle, "_leases", collections.OrderedDict())
+    user = make_user(password="p@ssw0rd")
+
+    response = call(obtain_auth_token, "post", "/api-token-auth/", {"username": user.username, "password": "p@ssw0rd"})
+    assert response.status_code == 200
+    assert json.loads(response.content)["token"] == user.auth_token.key
+
+    response = call(obtain_auth_token, "post", "/api-token-auth/", {"username": user.username, "password": "invalid"})
+    assert response.status_code == 400
+
+    response = call(obtain_auth_token, "post", "/api-token-auth/", {"username": user.username, "password": "p@ssw0rd"})
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_served_over_asgi(
+    make_user: Callable[..., User],
+    async_views,
+):
+    user = make_user()
+    client = AsyncClient()
+
+    response = async_to_sync(client.get)(f"/api/v1/users/{user.uuid}/")
+    assert response.status_code == 200
+    assert response.json()["uuid"] == str(user.uuid)
+    assert len(response["X-Request-ID"]) == 32
+
+    response = async_to_sync(client.patch)(
+        f"/api/v1/users/{user.uuid}/",
+        data={"first_name": "new_first_name"},
+        content_type="application/json",
+        authorization=f"Token {user.auth_token}",
+    )
+    assert response.status_code == 200
+    assert User.objects.get(pk=user.pk).first_name == "new_first_name"
@@ -0,0 +1,70 @@
+from typing import Callable
+
+import pytest
+from django.contrib.auth import authenticate
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from backend.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize("login", ["alice", "ALICE", "alice@example.com", "Alice@Example.COM"])
+def test_authenticate_by_username_or_email(make_user: Callable[..., User], login: str):
+    user = make_user(username="Alice", email="alice@example.com", password="p@ssw0rd")
+
+    assert authenticate(username=login, password="p@ssw0rd") == user
+    assert authenticate(username=login, password="invalid") is None
+
+
+def test_authenticate_prefers_exact_username(make_user: Callable[..., User]):
+    make_user(username="alice", email="a@example.com", password="p@ssw0rd")
+    user = make_user(username="Alice", email="b@example.com", password="p@ssw0rd")
+
+    assert authenticate(username="Alice", password="p@ssw0rd") == user
+
+
+def test_authenticate_shared_email(make_user: Callable[..., User]):
+    make_user(username="alice", email="shared@example.com", password="p@ssw0rd")
+    user = make_user(username="bob", email="shared@example.com", password="s3cret!!")
+
+    assert authenticate(username="shared@example.com", password="s3cret!!") == user
+
+
+def test_authenticate_exact_username_among_many_matches(make_user: Callable[..., User], monkeypatch):
+    for i in range(5):
+        make_user(username=f"user{i}", email="shared@example.com", password="p@ssw0rd")
+    user = make_user(username="shared@example.com", password="s3cret!!")
+
+    assert authenticate(username="shared@example.com", password="s3cret!!") == user
+
+    checked = []
+    check_password = User.check_password
+    monkeypatch.setattr(User, "check_password", lambda self, raw: checked.append(self) or check_password(self, raw))
+    assert authenticate(username="shared@example.com", password="p@ssw0rd") is None
+    assert checked == [user]
+
+
+def test_authenticate_inactive_user(make_user: Callable[..., User]):
+    make_user(username="alice", password="p@ssw0rd", is_active=False)
+
+    assert authenticate(username="alice", password="p@ssw0rd") is None
+
+
+def test_authenticate_is_one_query():
+    with CaptureQueriesContext(connection) as context:
+        assert authenticate(username="Nobody", password="p@ssw0rd") is None
+
+    assert len(context.captured_queries) == 1
+    sql = context.captured_queries[0]["sql"]
+    assert 'LOWER("users_user"."username")' in sql and 'LOWER("users_user"."email")' in sql
+
+
+def test_api_auth_token_with_email(make_user: Callable[..., User], api_client: APIClient):
+    user = make_user(email="alice@example.com", password="p@ssw0rd")
+
+    response = api_client.post(path='/api-token-auth/', data={"username": "ALICE@example.com", "password": "p@ssw0rd"})
+    assert response.status_code == 200
+    assert response.json()["token"] == user.auth_token.key
@@ -0,0 +1,125 @@
+import uuid
+from typing import Callable
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from redis import Redis
+from rest_framework.test import APIClient
+
+from backend.users.bloom import BloomFilter, rebuild_user_uuid_filter
+from backend.users.cache import MISSING, UserCache
+from backend.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user_uuid_filter(monkeypatch) -> BloomFilter:
+    user_uuid_filter = BloomFilter("test:bloom", capacity=1000, error_rate=0.01)
+    monkeypatch.setattr("backend.users.bloom.user_uuid_filter", user_uuid_filter)
+    return user_uuid_filter
+
+
+@pytest.fixture
+def user_cache(monkeypatch) -> UserCache:
+    user_cache = UserCache()
+    monkeypatch.setattr("backend.users.cache.user_cache", user_cache)
+    monkeypatch.setattr("backend.users.views.user_cache", user_cache)
+    return user_cache
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter("test:bloom", capacity=1000, error_rate=0.01)
+    items = [uuid.uuid4().bytes for _ in range(1000)]
+    assert bloom_filter.rebuild(items) == 1000
+
+    assert all(bloom_filter.might_contain(item) for item in items)
+    false_positives = sum(bloom_filter.might_contain(uuid.uuid4().bytes) for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_bloom_filter_not_built_contains_everything():
+    bloom_filter = BloomFilter("test:bloom", capacity=1000, error_rate=0.01)
+    assert bloom_filter.might_contain(uuid.uuid4().bytes)
+
+
+def test_bloom_filter_in_redis(redis_cache: Redis):
+    bloom_filter = BloomFilter("test:bloom", capacity=1000, error_rate=0.01)
+    items = [uuid.uuid4().bytes for _ in range(1000)]
+
+    # Adding to a filter which was never built creates no partial one.
+    bloom_filter.add(items[0])
+    assert not redis_cache.exists("test:bloom")
+    assert bloom_filter.might_contain(uuid.uuid4().bytes)
+
+    assert bloom_filter.rebuild(items[:500], batch_size=100) == 500
+    assert redis_cache.strlen("test:bloom") == -(-bloom_filter.size // 8)
+    assert not redis_cache.exists("test:bloom:building")
+
+    # Items added while a rebuild is running go to both filters.
+    redis_cache.setbit("test:bloom:building", bloom_filter.size - 1, 0)
+    bloom_filter.add(*items[500:])
+    assert all(bloom_filter.might_contain(item) for item in items)
+    redis_cache.rename("test:bloom:building", "test:bloom")
+
+    assert all(bloom_filter.might_contain(item) for item in items[500:])
+    false_positives = sum(bloom_filter.might_contain(uuid.uuid4().bytes) for _ in range(2000))
+    assert false_positives < 60
+
+
+def test_created_users_added_to_filter(make_user: Callable[..., User], user_uuid_filter: BloomFilter):
+    rebuild_user_uuid_filter()
+    user = make_user()
+    assert user_uuid_filter.might_contain(user.uuid.bytes)
+
+
+def test_rebuild_command(make_user: Callable[..., User], user_uuid_filter: BloomFilter, capsys):
+    users = [make_user() for _ in range(3)]
+
+    call_command("rebuild_user_bloom_filter")
+    assert "Added 3 uuids" in capsys.readouterr().out
+    assert all(user_uuid_filter.might_contain(user.uuid.bytes) for user in users)
+
+
+def test_unknown_uuid_not_looked_up(
+    make_user: Callable[..., User],
+    user_uuid_filter: BloomFilter,
+    user_cache: UserCache,
+    api_client: APIClient,
+):
+    api_client.force_authenticate(make_user())
+    rebuild_user_uuid_filter()
+    url = reverse("user-detail", kwargs={"uuid": uuid.uuid4()})
+
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(path=url)
+    assert response.status_code == 404
+    # Only the savepoints of ATOMIC_REQUESTS, which a real transaction does not send before its first query.
+    assert all("SAVEPOINT" in query["sql"] for query in context.captured_queries)
+    assert user_cache.hits["negative"] == 1
+
+
+def test_missing_user_cached(user_cache: UserCache, django_assert_num_queries):
+    missing = uuid.uuid4()
+
+    with django_assert_num_queries(1):
+        assert user_cache.get(uuid=missing) is None
+    with django_assert_num_queries(0):
+        assert user_cache.get(uuid=missing) is None
+
+    user_cache.local.clear()
+    with django_assert_num_queries(0):
+        assert user_cache.get(uuid=missing) is None
+    assert user_cache.hits["negative"] == 2
+
+
+def test_missing_user_forgotten_once_created(make_user: Callable[..., User], user_cache: UserCache):
+    missing = uuid.uuid4()
+    assert user_cache.get(uuid=missing) is None
+    assert user_cache.local.get(user_cache.make_key(uuid=missing)) == MISSING
+
+    user = make_user(uuid=missing)
+    assert user_cache.get(uuid=missing) == user
@@ -0,0 +1,253 @@
+import threading
+import time
+from typing import Callable
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from redis import Redis
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+
+from backend.users.cache import LRUCache, UserCache
+from backend.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user_cache(monkeypatch) -> UserCache:
+    user_cache = UserCache()
+    monkeypatch.setattr("backend.users.cache.user_cache", user_cache)
+    monkeypatch.setattr("backend.users.views.user_cache", user_cache)
+    monkeypatch.setattr("backend.users.authentication.user_cache", user_cache)
+    return user_cache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_size=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_user_cache_tiers(
+    make_user: Callable[..., User],
+    user_cache: UserCache,
+    django_assert_num_queries,
+):
+    user = make_user()
+
+    with django_assert_num_queries(1):
+        assert user_cache.get(uuid=user.uuid) == user
+    with django_assert_num_queries(0):
+        assert user_cache.get(uuid=user.uuid).username == user.username
+        assert user_cache.get(pk=user.pk).uuid == user.uuid
+
+    user_cache.local.clear()
+    with django_assert_num_queries(0):
+        assert user_cache.get(pk=user.pk) == user
+
+    assert user_cache.hits == {"local": 2, "shared": 1, "stale": 0, "negative": 0, "miss": 1}
+    assert user_cache.hit_ratios()["local"] == 0.5
+
+
+def test_user_cache_invalidated_on_save(
+    make_user: Callable[..., User],
+    user_cache: UserCache,
+):
+    user = make_user(first_name="old")
+    user_cache.get(uuid=user.uuid)
+
+    user.first_name = "new"
+    user.save()
+    assert user_cache.get(uuid=user.uuid).first_name == "new"
+    assert user_cache.hits["miss"] == 2
+
+
+def test_user_cache_invalidated_through_pubsub(
+    make_user: Callable[..., User],
+    redis_cache: Redis,
+):
+    def wait_until(condition: Callable[[], bool]) -> None:
+        deadline = time.monotonic() + 5
+        while not condition():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    first, second = make_user(), make_user()
+    process, other_process = UserCache(), UserCache()
+    process.ensure_listener()
+
+    def subscribed() -> bool:
+        # Once the listener clears the local cache, or handles the invalidation, it is subscribed.
+        process.local.set(process.make_key(pk=0), ())
+        other_process.invalidate_many([(0, None)])
+        time.sleep(0.01)
+        return process.local.get(process.make_key(pk=0)) is None
+
+    wait_until(subscribed)
+
+    process.get(pk=first.pk)
+    process.get(pk=second.pk)
+    other_process.invalidate(first)
+    wait_until(lambda: process.local.get(process.make_key(uuid=first.uuid)) is None)
+    assert process.local.get(process.make_key(pk=first.pk)) is None
+    assert process.local.get(process.make_key(pk=second.pk)) is not None
+
+
+def test_user_cache_never_stores_password(
+    make_user: Callable[..., User],
+    user_cache: UserCache,
+):
+    user = make_user(password="p@ssw0rd")
+    user_cache.get(uuid=user.uuid)
+
+    cached = user_cache.get(uuid=user.uuid)
+    assert "password" in cached.get_deferred_fields()
+    assert cached.check_password("p@ssw0rd") is True
+
+
+def test_detail_view_served_from_cache(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+    user_cache: UserCache,
+):
+    user = make_user()
+    url = reverse("user-detail", kwargs={"uuid": user.uuid})
+
+    for _ in range(3):
+        response = api_client.get(path=url)
+        assert response.status_code == 200
+        assert response.json().get("username") == user.username
+
+    assert user_cache.hits == {"local": 2, "shared": 0, "stale": 0, "negative": 0, "miss": 1}
+
+
+def thundering_herd(user_caches: list[UserCache], user: User, threads: int = 10, query_time: float = 0.05) -> int:
+    """
+    Looks `user` up from `threads` threads per cache, all at once, with every query taking `query_time`.
+
+    Every cache stands in for a worker process. Returns the number of queries that hit the database.
+    """
+    queries = []
+    barrier = threading.Barrier(len(user_caches) * threads)
+    errors = []
+
+    def slow_query(execute, sql, params, many, context):
+        queries.append(sql)
+        time.sleep(query_time)
+        return execute(sql, params, many, context)
+
+    def request(user_cache: UserCache):
+        try:
+            with connection.execute_wrapper(slow_query):
+                barrier.wait()
+                assert user_cache.get(uuid=user.uuid) == user
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [
+        threading.Thread(target=request, args=(user_cache,)) for user_cache in user_caches for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    return len(queries)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thundering_herd_on_cold_cache(
+    make_user: Callable[..., User],
+):
+    user = make_user()
+    assert thundering_herd([UserCache() for _ in range(4)], user) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thundering_herd_on_expired_entry(
+    make_user: Callable[..., User],
+):
+    user = make_user()
+    user_caches = [UserCache() for _ in range(4)]
+    entry_key = UserCache.make_key(uuid=user.uuid)
+    user_caches[0].get(uuid=user.uuid)
+    values, fresh_until, delta = user_caches[0].shared.get(entry_key)
+    user_caches[0].shared.set(entry_key, (values, time.time() - 1, delta))
+    user_caches[0].local.clear()
+
+    assert thundering_herd(user_caches, user) == 1
+    assert sum(user_cache.hits["stale"] for user_cache in user_caches) > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thundering_herd_without_protection(
+    make_user: Callable[..., User],
+    monkeypatch,
+):
+    monkeypatch.setattr(UserCache, "acquire", lambda self, key: True)
+    monkeypatch.setattr(UserCache, "coalesce", lambda self, key, load: load())
+    user = make_user()
+
+    assert thundering_herd([UserCache() for _ in range(4)], user) > 10
+
+
+def test_early_refresh_probability():
+    user_cache = UserCache()
+    now = time.time()
+
+    assert user_cache.should_refresh(now - 1, delta=0) is True
+    assert user_cache.should_refresh(now + 60, delta=0) is False
+    refreshes = sum(user_cache.should_refresh(now + 0.1, delta=0.1) for _ in range(1000))
+    assert 0 < refreshes < 1000
+
+
+def test_user_cache_loads_without_waiting_when_redis_is_down(
+    make_user: Callable[..., User],
+    monkeypatch,
+    django_assert_num_queries,
+):
+    user = make_user()
+    user_cache = UserCache()
+
+    def unavailable(self, key):
+        raise RedisError("Connection refused.")
+
+    monkeypatch.setattr(UserCache, "acquire", unavailable)
+    monkeypatch.setattr(UserCache, "lock_wait", 60)
+    with django_assert_num_queries(1):
+        assert user_cache.get(pk=user.pk) == user
+
+
+def test_refresh_lock_released_by_its_owner_only():
+    user_cache = UserCache()
+    token = user_cache.acquire("users:pk:1")
+    assert token is not None
+    assert user_cache.acquire("users:pk:1") is None
+
+    # The lock expires while its owner is still loading, and another process takes it.
+    user_cache.shared.delete("users:pk:1:lock")
+    other = user_cache.acquire("users:pk:1")
+    user_cache.release("users:pk:1", token)
+    assert user_cache.acquire("users:pk:1") is None
+
+    user_cache.release("users:pk:1", other)
+    assert user_cache.acquire("users:pk:1") is not None
@@ -0,0 +1,125 @@
+import json
+import uuid
+from datetime import datetime
+from io import StringIO
+from typing import Callable
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from backend.users.bulk import bulk_create_users
+from backend.users.models import Token, User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_purge_expired_tokens(
+    make_user: Callable[..., User],
+):
+    users = [make_user() for _ in range(5)]
+    Token.objects.filter(user__in=users[:3]).update(expires_at=timezone.now())
+
+    out = StringIO()
+    call_command("purge_expired_tokens", batch_size=2, sleep=0, stdout=out)
+
+    assert "Deleted 3 expired tokens." in out.getvalue()
+    assert set(Token.objects.values_list("user", flat=True)) == {user.pk for user in users[3:]}
+
+
+@pytest.fixture
+def users_csv(tmp_path, make_user: Callable[..., User]):
+    make_user(username="taken")
+    path = tmp_path / "users.csv"
+    path.write_text(
+        "username,email,first_name,last_name,password,password_hash,date_joined\n"
+        "alice,alice@example.com,Alice,Smith,p@ssw0rd,,2015-03-01T12:00:00+00:00\n"
+        'bob,bob@example.com,"Bob\tthe\\builder",,,md5$salt$2e9ec9d8b3bdd2b1fcd9fbd1b8b3b3f1,\n'
+        "carol,not-an-email,Carol,,,,\n"
+        "alice,alice2@example.com,Alice,,,,\n"
+        "taken,taken@example.com,,,,,\n"
+        "dave,dave@example.com,,,,bogus$hash,\n"
+        "erin,Erin@EXAMPLE.COM,,,p@ssw0rd,md5$salt$2e9ec9d8b3bdd2b1fcd9fbd1b8b3b3f1,\n"
+        "\uff46rank,Frank@EXAMPLE.COM,,,,,\n"
+    )
+    return path
+
+
+def test_import_users(users_csv):
+    out, err = StringIO(), StringIO()
+    call_command("import_users", str(users_csv), workers=1, chunk_size=2, stdout=out, stderr=err)
+
+    assert "Imported 3 users" in out.getvalue()
+    assert "skipped 5 invalid rows" in out.getvalue()
+    assert err.getvalue().splitlines() == [
+        "Line 4: email: Enter a valid email address.",
+        "Line 5: username: A user with that username already exists.",
+        "Line 6: username: A user with that username already exists.",
+        "Line 7: password_hash: Unknown password hash format.",
+        "Line 8: password: Give either password or password_hash, not both.",
+    ]
+
+    alice = User.objects.get(username="alice")
+    assert alice.check_password("p@ssw0rd")
+    assert alice.date_joined.year == 2015
+    assert Token.objects.filter(user=alice).exists()
+
+    bob = User.objects.get(username="bob")
+    assert bob.first_name == "Bob\tthe\\builder"
+    assert bob.password == "md5$salt$2e9ec9d8b3bdd2b1fcd9fbd1b8b3b3f1"
+
+    # Normalized like create_user() does.
+    assert User.objects.get(username="frank").email == "Frank@example.com"
+
+
+def test_import_users_jsonl_with_worker_processes(tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text(
+        "\n".join(json.dumps({"username": f"user{i}", "password": f"secret{i}"}) for i in range(4)) + "\n{oops\n"
+    )
+    err = StringIO()
+    call_command("import_users", str(path), workers=2, skip_tokens=True, stdout=StringIO(), stderr=err)
+
+    assert err.getvalue().strip().startswith("Line 5: row: Invalid JSON: Expecting property name")
+    users = User.objects.filter(username__startswith="user").order_by("username")
+    assert [user.check_password(f"secret{i}") for i, user in enumerate(users)] == [True] * 4
+    assert not Token.objects.filter(user__in=users).exists()
+
+
+def test_generate_users():
+    def generate() -> list[tuple]:
+        out = StringIO()
+        call_command("generate_users", 5, start=1000, seed=1, chunk_size=2, workers=1, stdout=out)
+        assert "Generated 5 users" in out.getvalue()
+        return list(User.objects.order_by("username").values_list("username", "email", "uuid", "date_joined"))
+
+    users = generate()
+    assert sorted(int(username[-4:]) for username, *_ in users) == list(range(1000, 1005))
+    assert Token.objects.count() == 5
+    assert all(user.check_password("password") for user in User.objects.all())
+    # Shared, rather than hashed for every user.
+    assert User.objects.values("password").distinct().count() == 1
+
+    User.objects.all().delete()
+    # Join dates are relative to now, the rest is the same.
+    assert [user[:3] for user in generate()] == [user[:3] for user in users]
+
+
+def test_bulk_create_users_fallback():
+    date_joined = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    users = [User(username=f"user{i}", uuid=uuid.uuid4(), date_joined=date_joined) for i in range(3)]
+    bulk_create_users(users, tokens=True, using="default", batch_size=2)
+
+    assert all(user.pk for user in users)
+    assert User.objects.filter(date_joined__year=2015).count() == 3
+    assert Token.objects.filter(user__in=users).count() == 3
+
+
+def test_advise_indexes(tmp_path):
+    workload = tmp_path / "workload.sql"
+    workload.write_text('SELECT "users_user"."id" FROM "users_user" WHERE "users_user"."email" = \'a@example.com\';')
+
+    out = StringIO()
+    call_command("advise_indexes", workload=str(workload), stdout=out, stderr=StringIO())
+    assert "users_user (email) is filtered on by 1 statements" in out.getvalue()
+    assert "users.User.uuid declares db_index=True" in out.getvalue()
@@ -0,0 +1,39 @@
+import pytest
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+from backend.users.models import Token, User
+
+# Migrations run DDL, which the transaction of a regular test would leave pending.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+BEFORE_TOKENS = ("users", "0002_remove_user_name_user_first_name_user_last_name_and_more")
+
+
+def migrate(targets: list[tuple[str, str]]) -> MigrationExecutor:
+    executor = MigrationExecutor(connection)
+    executor.migrate(targets)
+    return executor
+
+
+def test_authtoken_tokens_are_carried_over():
+    executor = migrate([BEFORE_TOKENS])
+    try:
+        HistoricalUser = executor.loader.project_state(BEFORE_TOKENS).apps.get_model("users", "User")
+        user = HistoricalUser.objects.create(username="legacy", password="!")
+        with connection.cursor() as cursor:
+            # As rest_framework.authtoken created it.
+            cursor.execute(
+                "CREATE TABLE authtoken_token (key varchar(40) PRIMARY KEY, created timestamp with time zone NOT NULL, "
+                "user_id bigint NOT NULL UNIQUE REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED)"
+            )
+            cursor.execute("INSERT INTO authtoken_token VALUES ('legacy-key', CURRENT_TIMESTAMP, %s)", [user.pk])
+    finally:
+        migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    assert "authtoken_token" not in connection.introspection.table_names()
+    assert Token.objects.get(user_id=user.pk).key == "legacy-key"
+
+    with transaction.atomic():
+        User.objects.get(pk=user.pk).delete()
+    assert not Token.objects.exists()
@@ -1,9 +1,11 @@
+import threading
 from typing import Callable
 
 import pytest
-from rest_framework.authtoken.models import Token
+from django.db import connection, transaction
+from django.utils import timezone
 
-from backend.users.models import User
+from backend.users.models import Token, User, get_or_issue_token
 
 pytestmark = pytest.mark.django_db
 
@@ -16,6 +18,47 @@ def test_model_with_creating_token_on_save(
     assert Token.objects.count() == 1
 
 
+def test_model_with_lazy_tokens(
+    make_user: Callable[..., User],
+    settings,
+):
+    settings.AUTH_TOKEN_LAZY = True
+    user = make_user()
+    assert Token.objects.count() == 0
+
+    token = get_or_issue_token(user)
+    assert get_or_issue_token(user) == token
+    assert Token.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_or_issue_token_with_concurrent_calls(
+    make_user: Callable[..., User],
+    settings,
+):
+    settings.AUTH_TOKEN_LAZY = True
+    user = make_user()
+    barrier = threading.Barrier(4)
+    keys = []
+
+    def issue():
+        try:
+            with transaction.atomic():
+                barrier.wait()
+                keys.append(get_or_issue_token(user).key)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=issue) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(keys) == 4 and len(set(keys)) == 1
+    assert Token.objects.get(user=user).key == keys[0]
+
+
 def test_model_with_creating_user_with_taken_username(
     make_user: Callable[..., User],
 ):
@@ -27,3 +70,52 @@ def test_model_with_creating_user_with_taken_username(
 
     make_user(username=username)
     assert User.objects.count() == 1
+
+
+def test_token_refresh_at_most_once_per_interval(
+    make_user: Callable[..., User],
+    settings,
+):
+    token = make_user().auth_token
+    assert token.refresh() is False
+
+    token.expires_at -= settings.AUTH_TOKEN_REFRESH_INTERVAL
+    assert token.refresh() is True
+    assert Token.objects.get(pk=token.pk).expires_at == token.expires_at
+
+
+def test_token_rotate(
+    make_user: Callable[..., User],
+):
+    token = make_user().auth_token
+    token.expires_at = timezone.now()
+    old_key = token.key
+
+    token.rotate()
+    assert token.key != old_key
+    assert token.is_expired() is False
+    assert Token.objects.filter(pk=old_key).exists() is False
+    assert Token.objects.get(pk=token.key).expires_at == token.expires_at
+
+
+def test_token_rotate_concurrently(
+    make_user: Callable[..., User],
+):
+    token = make_user().auth_token
+    other = Token.objects.get(pk=token.pk)
+
+    other.rotate()
+    token.rotate()
+    assert token.key == other.key
+    assert token.expires_at == other.expires_at
+
+
+def test_token_rotate_purged(
+    make_user: Callable[..., User],
+):
+    user = make_user()
+    token = user.auth_token
+    Token.objects.filter(pk=token.key).delete()
+
+    token.rotate()
+    assert Token.objects.get(user=user).key == token.key
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from backend.users.authentication import ExpiringTokenAuthentication
+from backend.users.backends import UsernameOrEmailBackend
+from backend.users.bulk import create_users
+from backend.users.cache import user_cache
+from backend.users.models import Token, User
+from backend.users.synthetic import build_users
+from backend.utils.query_plans import assert_plans_match
+
+pytestmark = pytest.mark.django_db
+
+SNAPSHOTS = Path(__file__).parent / "plans"
+# Enough rows for the planner to prefer indexes over reading whole tables.
+SEED_USERS = 20000
+
+
+@pytest.fixture(scope="module")
+def seeded(django_db_setup, django_db_blocker) -> list[User]:
+    """
+    Commits SEED_USERS synthetic users and their tokens, with fresh statistics, for the tests of this module.
+    """
+    if connection.vendor != "postgresql":
+        pytest.skip("Query plans are only checked on PostgreSQL.")
+
+    def analyze():
+        with connection.cursor() as cursor:
+            for model in (User, Token):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    with django_db_blocker.unblock():
+        users = build_users(1, SEED_USERS, seed=0, password_hash="!", until=timezone.now(), days=365)
+        try:
+            create_users(users)
+            analyze()
+            yield users[::1000]
+        finally:
+            # Committed, so the other tests would see them, and their statistics too. Only these are
+            # deleted, without signals or cascades, as the database may hold committed rows of its own.
+            user_ids = [user.pk for user in users if user.pk is not None]
+            Token.objects.filter(user_id__in=user_ids)._raw_delete(Token.objects.db)
+            User.objects.filter(pk__in=user_ids)._raw_delete(User.objects.db)
+            analyze()
+
+
+def test_user_by_uuid_plan(seeded: list[User]):
+    # The lookup behind UserViewSet and the async user detail view on a user cache miss.
+    user = seeded[1]
+    assert_plans_match("user_by_uuid", lambda: user_cache.load(None, user.uuid), SNAPSHOTS)
+
+
+def test_user_by_uuid_for_update_plan(seeded: list[User]):
+    # UserViewSet.get_object() for writes.
+    user = seeded[2]
+    assert_plans_match("user_by_uuid_for_update", lambda: User.objects.get(uuid=user.uuid), SNAPSHOTS)
+
+
+def test_token_authentication_plan(seeded: list[User]):
+    key = Token.objects.get(user=seeded[3]).key
+    assert_plans_match(
+        "token_authentication", lambda: ExpiringTokenAuthentication().authenticate_credentials(key), SNAPSHOTS
+    )
+
+
+@pytest.mark.parametrize("login", ["username", "email"])
+def test_login_plan(seeded: list[User], login: str):
+    value = getattr(seeded[4], login).upper()
+    assert_plans_match(
+        "login", lambda: UsernameOrEmailBackend().authenticate(None, username=value, password="password"), SNAPSHOTS
+    )
@@ -2,8 +2,11 @@ from typing import Callable
 
 import pytest
 from django.contrib.auth.hashers import check_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from ..serializers import CreateUserSerializer
+from ..models import User
+from ..serializers import CreateUserSerializer, UserSerializer
 
 pytestmark = pytest.mark.django_db
 
@@ -41,3 +44,31 @@ def test_serializer_hashes_password(
 
     user = serializer.save()
     assert check_password(user_data.get("password"), user.password) is True
+
+
+def test_user_serializer_updates_changed_fields_only(
+    make_user: Callable[..., User],
+):
+    user = make_user(first_name="Old", last_name="Name")
+    serializer = UserSerializer(user, data={"first_name": "New", "last_name": "Name"}, partial=True)
+    assert serializer.is_valid() is True
+
+    with CaptureQueriesContext(connection) as context:
+        serializer.save()
+
+    updates = [query["sql"] for query in context.captured_queries if query["sql"].startswith("UPDATE")]
+    assert len(updates) == 1
+    assert '"first_name"' in updates[0] and '"last_name"' not in updates[0]
+    assert User.objects.get(pk=user.pk).first_name == "New"
+
+
+def test_user_serializer_skips_unchanged_update(
+    make_user: Callable[..., User],
+    django_assert_num_queries,
+):
+    user = make_user(first_name="Same")
+    serializer = UserSerializer(user, data={"first_name": "Same", "email": user.email}, partial=True)
+    assert serializer.is_valid() is True
+
+    with django_assert_num_queries(0):
+        serializer.save()
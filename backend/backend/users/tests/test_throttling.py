@@ -0,0 +1,146 @@
+import collections
+from typing import Callable
+
+import pytest
+from django.test import RequestFactory
+from redis import Redis
+from rest_framework.test import APIClient
+
+from backend.users.models import User
+from backend.users.throttling import SignupRateThrottle, SlidingWindowRateThrottle
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def throttle_rates(monkeypatch) -> Callable[..., None]:
+    def set_rates(**rates) -> None:
+        monkeypatch.setattr(SlidingWindowRateThrottle, "THROTTLE_RATES", rates)
+        monkeypatch.setattr(SlidingWindowRateThrottle, "_leases", collections.OrderedDict())
+
+    return set_rates
+
+
+def test_login_throttled_per_username(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+    throttle_rates: Callable[..., None],
+):
+    throttle_rates(login="100/min", login_username="3/min")
+    user = make_user(password="p@ssw0rd")
+
+    for _ in range(3):
+        response = api_client.post(path="/api-token-auth/", data={"username": user.username, "password": "invalid"})
+        assert response.status_code == 400
+
+    response = api_client.post(path="/api-token-auth/", data={"username": user.username, "password": "p@ssw0rd"})
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) > 0
+
+    response = api_client.post(path="/api-token-auth/", data={"username": "other", "password": "invalid"})
+    assert response.status_code == 400
+
+
+def test_login_throttled_per_ip(
+    api_client: APIClient,
+    throttle_rates: Callable[..., None],
+):
+    throttle_rates(login="2/min", login_username="100/min")
+
+    for username in ("first", "second"):
+        response = api_client.post(path="/api-token-auth/", data={"username": username, "password": "invalid"})
+        assert response.status_code == 400
+
+    response = api_client.post(path="/api-token-auth/", data={"username": "third", "password": "invalid"})
+    assert response.status_code == 429
+
+
+def test_signup_throttled_per_ip(
+    api_client: APIClient,
+    throttle_rates: Callable[..., None],
+):
+    throttle_rates(signup="1/hour")
+
+    response = api_client.post(path="/api/v1/users/", data={"username": "first", "password": "p@$$w0rD"})
+    assert response.status_code == 201
+
+    response = api_client.post(path="/api/v1/users/", data={"username": "second", "password": "p@$$w0rD"})
+    assert response.status_code == 429
+
+
+def test_throttle_leases_requests_locally(
+    rf: RequestFactory,
+    throttle_rates: Callable[..., None],
+    monkeypatch,
+):
+    throttle_rates(signup="100/min")
+    reserve = SlidingWindowRateThrottle.reserve
+    calls = []
+
+    def counting_reserve(self, *args):
+        calls.append(args)
+        return reserve(self, *args)
+
+    monkeypatch.setattr(SlidingWindowRateThrottle, "reserve", counting_reserve)
+
+    request = rf.post("/api/v1/users/")
+    for _ in range(10):
+        assert SignupRateThrottle().allow_request(request, None) is True
+
+    # 5% of the limit is reserved per round trip.
+    assert len(calls) == 2
+
+
+def test_throttle_leases_are_bounded(
+    rf: RequestFactory,
+    throttle_rates: Callable[..., None],
+    monkeypatch,
+):
+    throttle_rates(signup="100/min")
+    monkeypatch.setattr(SlidingWindowRateThrottle, "max_leases", 3)
+
+    for ip in range(10):
+        assert SignupRateThrottle().allow_request(rf.post("/api/v1/users/", REMOTE_ADDR=f"10.0.0.{ip}"), None)
+
+    assert len(SlidingWindowRateThrottle._leases) == 3
+
+
+def test_login_with_non_object_body(api_client: APIClient):
+    response = api_client.post(path="/api-token-auth/", data=["username"], format="json")
+    assert response.status_code == 400
+
+
+def test_sliding_window_script(
+    rf: RequestFactory,
+    redis_cache: Redis,
+    throttle_rates: Callable[..., None],
+):
+    throttle_rates(signup="10/min")
+    throttle = SignupRateThrottle()
+    throttle.key = throttle.get_cache_key(rf.post("/api/v1/users/"), None)
+    redis_cache.set(f"{{{throttle.key}}}:99", 8)
+
+    # Three quarters of the previous window overlap the sliding one: 10 - 8 * 0.75 leaves room for 4.
+    assert throttle.reserve(100, 15, 5) == (4, 4, 8)
+    assert throttle.reserve(100, 15, 5) == (0, 4, 8)
+    # A quarter of it still overlaps, which leaves room for 4 more.
+    assert throttle.reserve(100, 45, 5) == (4, 8, 8)
+    assert int(redis_cache.get(f"{{{throttle.key}}}:100")) == 8
+    assert 0 < redis_cache.pttl(f"{{{throttle.key}}}:100") <= 120_000
+
+
+def test_login_throttled_in_redis(
+    redis_cache: Redis,
+    api_client: APIClient,
+    throttle_rates: Callable[..., None],
+):
+    throttle_rates(login="2/min", login_username="100/min")
+
+    for username in ("first", "second"):
+        response = api_client.post(path="/api-token-auth/", data={"username": username, "password": "invalid"})
+        assert response.status_code == 400
+
+    response = api_client.post(path="/api-token-auth/", data={"username": "third", "password": "invalid"})
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) > 0
+    assert redis_cache.keys("*throttle_login_*")
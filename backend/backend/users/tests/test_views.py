@@ -1,10 +1,18 @@
+import csv
+import gzip
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 import pytest
+from django.db import connection
 from django.urls import reverse
 from rest_framework.test import APIClient
 
-from backend.users.models import User
+from backend.users.models import Token, User
+from backend.users.serializers import UserSerializer
 
 pytestmark = pytest.mark.django_db
 
@@ -60,6 +68,30 @@ def test_update_view_with_valid_uuid(
     assert data.get('email') == new_data.get('email')
 
 
+def test_update_view_with_idempotency_key(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+    django_capture_on_commit_callbacks,
+):
+    user, other = make_user(), make_user()
+    url = reverse("user-detail", kwargs={"uuid": user.uuid})
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {user.auth_token}")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.patch(path=url, data={"first_name": "first"}, HTTP_IDEMPOTENCY_KEY="update-1")
+    assert response.status_code == 200
+
+    User.objects.filter(pk=user.pk).update(first_name="changed")
+    response = api_client.patch(path=url, data={"first_name": "first"}, HTTP_IDEMPOTENCY_KEY="update-1")
+    assert response["Idempotent-Replayed"] == "true"
+    assert User.objects.get(pk=user.pk).first_name == "changed"
+
+    # Keys are scoped to the user.
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {other.auth_token}")
+    response = api_client.patch(path=url, data={"first_name": "first"}, HTTP_IDEMPOTENCY_KEY="update-1")
+    assert response.status_code == 403
+
+
 def test_update_view_with_invalid_data(
     make_user: Callable[..., User],
     api_client: APIClient,
@@ -159,6 +191,77 @@ def test_create_view_with_valid_data(
     assert user.check_password(data.get('password')) is True
 
 
+@pytest.mark.parametrize("issue_auth_token", [False, True])
+def test_create_view_with_lazy_tokens(
+    build_user: Callable[..., dict[str, any]],
+    api_client: APIClient,
+    settings,
+    issue_auth_token: bool,
+):
+    settings.AUTH_TOKEN_LAZY = True
+    data = {**build_user(), "issue_auth_token": issue_auth_token}
+
+    response = api_client.post(path=reverse("user-list"), data=data, format="json")
+    assert response.status_code == 201
+
+    user = User.objects.get()
+    if issue_auth_token:
+        assert response.json()["auth_token"] == user.auth_token.key
+    else:
+        assert response.json()["auth_token"] is None
+        assert not Token.objects.exists()
+
+
+def test_create_view_with_idempotency_key(
+    build_user: Callable[..., dict[str, any]],
+    api_client: APIClient,
+    django_capture_on_commit_callbacks,
+):
+    data = build_user()
+    url = reverse("user-list")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(path=url, data=data, format="json", HTTP_IDEMPOTENCY_KEY="signup-1")
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response
+
+    retry = api_client.post(path=url, data=data, format="json", HTTP_IDEMPOTENCY_KEY="signup-1")
+    assert retry.status_code == 201
+    assert retry["Idempotent-Replayed"] == "true"
+    assert retry.json() == response.json()
+    assert User.objects.count() == 1
+
+    response = api_client.post(
+        path=url, data={**data, "password": "other"}, format="json", HTTP_IDEMPOTENCY_KEY="signup-1"
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_view_with_concurrent_idempotent_requests(
+    build_user: Callable[..., dict[str, any]],
+):
+    data = build_user()
+    barrier = threading.Barrier(4)
+
+    def signup(_) -> tuple[int, bool]:
+        client = APIClient()
+        barrier.wait()
+        try:
+            response = client.post(
+                path=reverse("user-list"), data=data, format="json", HTTP_IDEMPOTENCY_KEY="signup-1"
+            )
+            return response.status_code, response.has_header("Idempotent-Replayed")
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(signup, range(4)))
+
+    assert sorted(results) == [(201, False), (201, True), (201, True), (201, True)]
+    assert User.objects.count() == 1
+
+
 def test_create_view_with_missing_password(
     api_client: APIClient,
 ):
@@ -243,3 +346,56 @@ def test_create_view_with_already_existing_username(
     url = reverse("user-list")
     response = api_client.post(path=url, data=data)
     assert response.status_code == 400
+
+
+def test_export_view_not_accessible_by_normal_user(
+    make_user: Callable[..., User],
+    api_client: APIClient,
+):
+    api_client.force_authenticate(make_user())
+    response = api_client.get(path=reverse("user-export"))
+    assert response.status_code == 403
+
+
+def test_export_view_streams_ndjson(
+    make_user: Callable[..., User],
+    admin_user: User,
+    api_client: APIClient,
+):
+    users = [admin_user] + [make_user() for _ in range(3)]
+    api_client.force_authenticate(admin_user)
+
+    response = api_client.get(path=reverse("user-export"))
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+    assert rows == [UserSerializer(user).data for user in users]
+
+
+def test_export_view_streams_gzipped_csv(
+    make_user: Callable[..., User],
+    admin_user: User,
+    api_client: APIClient,
+):
+    user = make_user(first_name="Jan, \"Janek\"")
+    api_client.force_authenticate(admin_user)
+
+    response = api_client.get(path=reverse("user-export"), data={"output": "csv"}, HTTP_ACCEPT_ENCODING="gzip")
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+
+    content = gzip.decompress(b"".join(response.streaming_content)).decode()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [row["uuid"] for row in rows] == [str(admin_user.uuid), str(user.uuid)]
+    assert rows[1]["first_name"] == user.first_name
+
+
+def test_export_view_with_invalid_output(
+    admin_user: User,
+    api_client: APIClient,
+):
+    api_client.force_authenticate(admin_user)
+    response = api_client.get(path=reverse("user-export"), data={"output": "xml"})
+    assert response.status_code == 400
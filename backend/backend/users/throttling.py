@@ -0,0 +1,199 @@
+import collections
+import hashlib
+import logging
+import math
+import threading
+from collections.abc import Mapping
+
+from django.core.cache import caches
+from redis.exceptions import RedisError
+from rest_framework.throttling import SimpleRateThrottle
+
+from backend.utils.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sliding window counter: the previous fixed window's count is weighted by how much
+# of it still overlaps the sliding window. Grants up to ARGV[4] requests at once.
+#
+# KEYS[1] - counter of the current window, KEYS[2] - counter of the previous window
+# ARGV[1] - limit, ARGV[2] - window in ms, ARGV[3] - ms elapsed in the current window,
+# ARGV[4] - number of requests to reserve
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+local used = previous * (window - elapsed) / window + current
+local granted = math.min(tonumber(ARGV[4]), math.floor(limit - used))
+if granted > 0 then
+    current = redis.call("INCRBY", KEYS[1], granted)
+    redis.call("PEXPIRE", KEYS[1], window * 2)
+else
+    granted = 0
+end
+return {granted, current, previous}
+"""
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Rate throttle counting requests over a sliding window in Redis, atomically.
+
+    To save a Redis round trip per request, a worker reserves a share of the limit
+    (`lease_fraction`) at once and hands it out from memory until it runs out or the
+    window moves on. Reserved requests are counted even if never used, so the error
+    is always on the strict side. Leases are kept for the `max_leases` most recently
+    used keys, as keys come from client IPs and usernames.
+
+    Falls back to the (non atomic) Django cache when it is not backed by Redis.
+    """
+
+    cache_alias = "default"
+    lease_fraction = 0.05
+    max_leases = 10000
+
+    _leases = collections.OrderedDict()
+    _leases_lock = threading.Lock()
+    _scripts = {}
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, elapsed = divmod(self.now, self.duration)
+        if self.take_leased(window):
+            return True
+
+        lease = max(1, int(self.num_requests * self.lease_fraction))
+        granted, current, previous = self.reserve(window, elapsed, lease)
+        if granted:
+            self.store_lease(window, granted - 1)
+            return True
+
+        self.wait_time = self.get_wait_time(elapsed, current, previous)
+        return self.throttle_failure()
+
+    def wait(self) -> float:
+        return self.wait_time
+
+    def get_wait_time(self, elapsed: float, current: int, previous: int) -> float:
+        """
+        Returns the seconds until the sliding window has room for one more request.
+        """
+        remaining = self.duration - elapsed
+        room = self.num_requests - 1
+        if current <= room:
+            if not previous:
+                return 0
+            return max(remaining - self.duration * (room - current) / previous, 0)
+        return remaining + self.duration * (1 - room / current)
+
+    def take_leased(self, window: float) -> bool:
+        with self._leases_lock:
+            lease = self._leases.get(self.key)
+            if lease is None:
+                return False
+            if lease[0] != window or lease[1] <= 0:
+                del self._leases[self.key]
+                return False
+            self._leases[self.key] = (window, lease[1] - 1)
+            self._leases.move_to_end(self.key)
+            return True
+
+    def store_lease(self, window: float, count: int) -> None:
+        with self._leases_lock:
+            if count:
+                self._leases[self.key] = (window, count)
+                self._leases.move_to_end(self.key)
+                while len(self._leases) > self.max_leases:
+                    self._leases.popitem(last=False)
+            else:
+                self._leases.pop(self.key, None)
+
+    def reserve(self, window: float, elapsed: float, count: int) -> tuple[int, int, int]:
+        """
+        Reserves up to `count` requests in the current window.
+
+        Returns the number of requests granted along with the counters of the
+        current and previous windows.
+        """
+        # The hash tag keeps both windows on the same Redis Cluster slot.
+        current_key = f"{{{self.key}}}:{int(window)}"
+        previous_key = f"{{{self.key}}}:{int(window) - 1}"
+
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            return self.reserve_in_cache(current_key, previous_key, elapsed, count)
+
+        try:
+            script = self._scripts.get(id(client))
+            if script is None:
+                script = self._scripts[id(client)] = client.register_script(SLIDING_WINDOW_SCRIPT)
+            granted, current, previous = script(
+                keys=[current_key, previous_key],
+                args=[self.num_requests, int(self.duration * 1000), int(elapsed * 1000), count],
+            )
+        except RedisError:
+            logger.warning("Throttle %s is failing open, Redis is unavailable.", self.scope, exc_info=True)
+            return count, 0, 0
+
+        return int(granted), int(current), int(previous)
+
+    def reserve_in_cache(self, current_key: str, previous_key: str, elapsed: float, count: int) -> tuple[int, int, int]:
+        cache = caches[self.cache_alias]
+        values = cache.get_many([current_key, previous_key])
+        current, previous = values.get(current_key, 0), values.get(previous_key, 0)
+
+        used = previous * (self.duration - elapsed) / self.duration + current
+        granted = min(count, math.floor(self.num_requests - used))
+        if granted <= 0:
+            return 0, current, previous
+
+        cache.add(current_key, 0, self.duration * 2)
+        return granted, cache.incr(current_key, granted), previous
+
+
+class LoginRateThrottle(SlidingWindowRateThrottle):
+    """
+    Limits login attempts per client IP.
+    """
+
+    scope = "login"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(SlidingWindowRateThrottle):
+    """
+    Limits login attempts per username, no matter how many IPs they come from.
+    """
+
+    scope = "login_username"
+
+    def get_cache_key(self, request, view):
+        # The body may be any JSON value, e.g. an array, which the view rejects later on.
+        username = request.data.get("username") if isinstance(request.data, Mapping) else None
+        if not username or not isinstance(username, str):
+            return None
+
+        ident = hashlib.sha256(username.strip().lower().encode()).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class SignupRateThrottle(SlidingWindowRateThrottle):
+    """
+    Limits account creation per client IP.
+    """
+
+    scope = "signup"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
@@ -1,9 +1,24 @@
+import uuid
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework import mixins, viewsets
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import mixins, permissions, viewsets
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from backend.utils.idempotency import idempotent
 
+from .access_tokens import issue_access_token
+from .cache import user_cache
+from .export import stream_export
+from .models import get_or_issue_token
 from .permissions import IsUserOrReadOnly
 from .serializers import CreateUserSerializer, UserSerializer
+from .throttling import LoginRateThrottle, LoginUsernameRateThrottle, SignupRateThrottle
 
 User = get_user_model()
 
@@ -20,6 +35,43 @@ class UserViewSet(
     permission_classes = (IsUserOrReadOnly,)
     lookup_field = 'uuid'
 
+    @idempotent
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    def get_object(self):
+        # Reads are served from the user cache, writes still start from the database row.
+        if self.request.method not in permissions.SAFE_METHODS:
+            return super().get_object()
+
+        try:
+            lookup = uuid.UUID(self.kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+
+        user = user_cache.get(uuid=lookup)
+        if user is None:
+            raise Http404
+
+        self.check_object_permissions(self.request, user)
+        return user
+
+    @action(detail=False, permission_classes=(permissions.IsAdminUser,))
+    def export(self, request):
+        """
+        Streams every user as NDJSON, or as CSV with ?output=csv, compressed by CompressionMiddleware.
+        """
+        output = request.query_params.get("output", "ndjson")
+        if output not in ("ndjson", "csv"):
+            raise ValidationError({"output": "Must be ndjson or csv."})
+
+        content = stream_export(User.objects.order_by("pk"), self.get_serializer(), output)
+        response = StreamingHttpResponse(
+            content, content_type="text/csv" if output == "csv" else "application/x-ndjson"
+        )
+        response["Content-Disposition"] = f'attachment; filename="users.{output}"'
+        return response
+
 
 class UserCreateViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
@@ -29,3 +81,40 @@ class UserCreateViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = CreateUserSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (SignupRateThrottle,)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+
+class ObtainAuthTokenView(ObtainAuthToken):
+    """
+    Returns the auth token of a user, throttled per client IP and per username.
+    Expired tokens are replaced with a new key. Also returns a short-lived signed access token,
+    see backend.users.access_tokens
+    """
+
+    throttle_classes = (LoginRateThrottle, LoginUsernameRateThrottle)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_tokens(serializer.validated_data["user"]))
+
+
+def issue_tokens(user: User) -> dict:
+    """
+    Returns the auth token of a user who just logged in, along with a new access token.
+    """
+    token = get_or_issue_token(user)
+    if token.is_expired():
+        token.rotate()
+    else:
+        token.refresh()
+
+    data = {"token": token.key}
+    if settings.ACCESS_TOKEN_TTL:
+        data["access_token"], data["access_token_expires"] = issue_access_token(user)
+    return data
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class UtilsConfig(AppConfig):
+    name = "backend.utils"
+    verbose_name = "Utilities"
+
+    def ready(self):
+        if settings.SLOW_QUERY_LOG_SIZE:
+            from django.db.backends.signals import connection_created
+
+            from .slow_queries import slow_queries
+
+            connection_created.connect(slow_queries.install, dispatch_uid="slow_queries")
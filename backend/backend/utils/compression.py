@@ -0,0 +1,65 @@
+import zlib
+from typing import Iterator, Optional
+
+import brotli
+from django.conf import settings
+
+# In order of preference.
+ENCODINGS = ("br", "gzip")
+
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Returns the preferred encoding among ENCODINGS the client accepts, per its Accept-Encoding header.
+
+    Encodings with a higher q-value win, then the first in ENCODINGS; "*" stands for any encoding
+    not listed and "q=0" rules one out.
+    """
+    qualities = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip()] = quality
+
+    accepted = {encoding: qualities.get(encoding, qualities.get("*", 0.0)) for encoding in ENCODINGS}
+    encoding = max(ENCODINGS, key=lambda encoding: accepted[encoding])
+    return encoding if accepted[encoding] > 0 else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    compressor = gzip_compressor(settings.COMPRESSION_GZIP_LEVEL)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_compressor(level: int):
+    # wbits=31 writes a gzip header and trailer, like gzip.compress() without its Python file object.
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def compress_stream(chunks: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Compresses `chunks` as they come, flushing after each one so none is held back from the client.
+
+    Uses the COMPRESSION_STREAM_* levels, as streamed responses are large enough for CPU time to dominate.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_STREAM_BROTLI_QUALITY)
+        for chunk in chunks:
+            if chunk:
+                yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = gzip_compressor(settings.COMPRESSION_STREAM_GZIP_LEVEL)
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
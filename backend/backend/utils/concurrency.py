@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Optional
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Per process limit on requests in flight, adapted with AIMD (additive increase, multiplicative decrease).
+
+    A request that waited in the server's queue longer than `queue_target`, or took longer than
+    `latency_target`, is a sign of congestion and shrinks the limit by `backoff`, at most once per
+    `backoff_interval` so the requests of one episode do not all shrink it. Any other request grows
+    it by 1 / limit, about 1 per limit's worth of requests, as long as the limit is actually in use.
+
+    Low priority requests are only admitted below `low_priority_share` of the limit, and not at all
+    once they waited longer than `queue_target`, so they are shed well before the others.
+    """
+
+    backoff = 0.9
+    backoff_interval = 1.0
+    low_priority_share = 0.5
+
+    def __init__(self, min_limit: float, max_limit: float, queue_target: float, latency_target: float):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_target = queue_target
+        self.latency_target = latency_target
+        self.limit = max_limit
+        self.in_flight = 0
+        self.shed = 0
+        self._backed_off_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def acquire(self, low_priority: bool = False, queue_delay: float = 0) -> bool:
+        """
+        Admits a request that waited `queue_delay` seconds before reaching the process, counting it
+        as in flight until release() is called, or returns False if it should be shed.
+        """
+        with self._lock:
+            limit = self.limit
+            if low_priority:
+                if queue_delay > self.queue_target:
+                    self.shed += 1
+                    return False
+                limit *= self.low_priority_share
+            # At least one request at a time is always admitted.
+            if self.in_flight and self.in_flight >= limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, queue_delay: float = 0) -> None:
+        """
+        Counts an admitted request as done, after it took `latency` seconds, and adapts the limit.
+        """
+        with self._lock:
+            if latency > self.latency_target or queue_delay > self.queue_target:
+                now = time.monotonic()
+                if now - self._backed_off_at >= self.backoff_interval:
+                    self._backed_off_at = now
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+            elif self.in_flight >= self.limit / 2:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.in_flight -= 1
+
+
+class BusyPeriod:
+    """
+    Estimates how long requests waited in the server's queue, for a process serving one request
+    at a time (a sync gunicorn worker) behind a proxy that does not set X-Request-Start.
+
+    Such a process only starts a request right after finishing the previous one when it was already
+    waiting. Requests served back to back like that form a busy period, and each of them arrived after
+    the period began, so the time since then bounds how long they queued. A request started more than
+    `idle_gap` seconds after the previous one finished did not queue at all.
+
+    The longer the period, the looser the bound, so a period restarts once it lasted `max_period`
+    seconds. A worker that stays busy then reports a queueing delay of at most `max_period`, and for a
+    little while after every restart none at all, instead of one which only ever grows.
+    """
+
+    idle_gap = 0.002
+    max_period = 2.0
+
+    def __init__(self):
+        self.started_at = 0.0
+        self.finished_at = float("-inf")
+
+    def start(self, now: Optional[float] = None) -> float:
+        """
+        Counts a request as started and returns the longest it may have queued for.
+        """
+        now = time.monotonic() if now is None else now
+        if now - self.finished_at > self.idle_gap or now - self.started_at > self.max_period:
+            self.started_at = now
+        return now - self.started_at
+
+    def finish(self, now: Optional[float] = None) -> None:
+        self.finished_at = time.monotonic() if now is None else now
+
+
+def parse_request_start(value: Optional[str], now: Optional[float] = None) -> float:
+    """
+    Returns how many seconds ago the proxy received a request, from its X-Request-Start header.
+
+    Accepts "t=<timestamp>" and bare timestamps in seconds (nginx's $msec), milliseconds or
+    microseconds (Apache's %t). Missing or malformed headers, and clock skew, count as no delay.
+    """
+    if not value:
+        return 0.0
+    try:
+        start = float(value.strip().removeprefix("t="))
+    except ValueError:
+        return 0.0
+    # Tells the units apart by magnitude, timestamps in seconds will not reach 1e11 for millennia.
+    if start > 1e14:
+        start /= 1_000_000
+    elif start > 1e11:
+        start /= 1000
+    return max(0.0, (time.time() if now is None else now) - start)
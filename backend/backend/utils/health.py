@@ -0,0 +1,159 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+from redis.exceptions import RedisError
+
+from backend.utils.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+LIVE_PATH = "/health/live"
+READY_PATH = "/health/ready"
+
+
+def check_database() -> bool:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except DatabaseError:
+        logger.warning("Health check could not reach the database.", exc_info=True)
+        return False
+    finally:
+        # Outside of requests, nothing else closes broken or expired connections.
+        connection.close_if_unusable_or_obsolete()
+
+
+def check_redis() -> Optional[bool]:
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return client.ping()
+    except RedisError:
+        logger.warning("Health check could not reach Redis.", exc_info=True)
+        return False
+
+
+class HealthChecks:
+    """
+    Runs the readiness checks at most once per settings.HEALTH_CHECK_INTERVAL and caches their result.
+
+    A single thread refreshes an expired result while the others keep answering with the previous
+    one, so probes never queue up behind a slow database. Checks returning None are not configured.
+    Only the `required` checks decide readiness, the others are just reported.
+    """
+
+    def __init__(self, checks: dict[str, Callable[[], Optional[bool]]], required: Iterable[str]):
+        self.checks = checks
+        self.required = frozenset(required)
+        self.result = None
+        self.checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self.result is not None and time.monotonic() - self.checked_at < settings.HEALTH_CHECK_INTERVAL
+
+    def get(self) -> tuple[bool, dict[str, Optional[bool]]]:
+        """
+        Returns whether every required check passed, and the result of each.
+        """
+        if self.is_fresh():
+            return self.result
+
+        if not self._lock.acquire(blocking=self.result is None):
+            return self.result
+        try:
+            if not self.is_fresh():
+                results = {name: check() for name, check in self.checks.items()}
+                ok = all(results[name] is not False for name in self.required)
+                self.result = ok, results
+                self.checked_at = time.monotonic()
+            return self.result
+        finally:
+            self._lock.release()
+
+
+# The cache ignores Redis errors, so the site keeps working without it unless it is required.
+health_checks = HealthChecks(
+    {"database": check_database, "redis": check_redis},
+    required=["database", "redis"] if settings.HEALTH_CHECK_REQUIRE_REDIS else ["database"],
+)
+
+
+def health_response(path: str) -> tuple[int, bytes]:
+    # Returns the status code and JSON body for a probe of `path`.
+    if path == LIVE_PATH:
+        return 200, b'{"status":"ok"}'
+
+    ok, results = health_checks.get()
+    if not ok:
+        status = "unavailable"
+    elif False in results.values():
+        status = "degraded"
+    else:
+        status = "ok"
+    body = json.dumps({"status": status, "checks": results}, separators=(",", ":"))
+    return (200 if ok else 503), body.encode()
+
+
+class HealthCheckWSGIMiddleware:
+    """
+    Answers liveness (LIVE_PATH) and readiness (READY_PATH) probes before they reach Django.
+
+    Probes skip the middleware, URL resolving, ALLOWED_HOSTS, authentication and the request
+    transaction; readiness reports the cached database and Redis checks of HealthChecks, and
+    fails only on the database unless settings.HEALTH_CHECK_REQUIRE_REDIS is set.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO")
+        if path not in (LIVE_PATH, READY_PATH):
+            return self.application(environ, start_response)
+
+        status, body = health_response(path)
+        start_response(
+            "200 OK" if status == 200 else "503 Service Unavailable",
+            [("Content-Type", "application/json"), ("Content-Length", str(len(body))), ("Cache-Control", "no-store")],
+        )
+        return [body]
+
+
+class HealthCheckASGIMiddleware:
+    """
+    HealthCheckWSGIMiddleware for ASGI; checks that are due run in a thread.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] != "http" or path not in (LIVE_PATH, READY_PATH):
+            return await self.application(scope, receive, send)
+
+        if path == LIVE_PATH or health_checks.is_fresh():
+            status, body = health_response(path)
+        else:
+            status, body = await sync_to_async(health_response)(path)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"cache-control", b"no-store"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,143 @@
+import functools
+import hashlib
+import json
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import QueryDict
+from django.utils.crypto import salted_hmac
+from redis.exceptions import RedisError
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from backend.utils.redis import acquire_lock, release_lock
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyKeyReused(exceptions.APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with a different request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotencyKeyInProgress(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still in progress, retry it later."
+    default_code = "idempotency_key_in_progress"
+
+
+class IdempotentRequests:
+    """
+    Runs requests carrying an Idempotency-Key header once, replaying the first successful response for retries.
+
+    Keys are scoped to the user, method and path, and bound to a fingerprint of the request data, so
+    a key reused for a different request is rejected rather than answered with someone else's response.
+    Responses are stored in the shared cache once the request transaction commits, for
+    settings.IDEMPOTENCY_KEY_TTL. Failed requests are not stored and may be retried with the same key.
+
+    While a request runs, a lock (see acquire_lock()) makes concurrent duplicates wait up to `lock_wait`
+    for its response instead of redoing the work, then answer 409. When Redis is unavailable requests
+    run right away without idempotency, as nothing could be stored for their retries anyway.
+    """
+
+    cache_alias = "default"
+    max_key_length = 255
+    # Seconds a lock is held at most, how long duplicates wait for it and how often they check.
+    lock_timeout = 30
+    lock_wait = 10
+    lock_poll_interval = 0.05
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def execute(self, request: Request, handler: Callable[[], Response]) -> Response:
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler()
+        if not key or len(key) > self.max_key_length:
+            raise exceptions.ValidationError({HEADER: f"Must be 1 to {self.max_key_length} characters long."})
+
+        cache_key = self.make_key(request, key)
+        fingerprint = self.fingerprint(request)
+        deadline = time.monotonic() + self.lock_wait
+        while True:
+            response = self.replay(cache_key, fingerprint)
+            if response is not None:
+                return response
+            try:
+                token = acquire_lock(f"{cache_key}:lock", self.lock_timeout, self.cache_alias)
+            except RedisError:
+                return handler()
+            if token is not None:
+                break
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgress
+            time.sleep(self.lock_poll_interval)
+
+        stored = False
+        try:
+            response = handler()
+            if status.is_success(response.status_code):
+                entry = {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                    # Content-Type is set when the response is rendered.
+                    "headers": {name: value for name, value in response.items() if name != "Content-Type"},
+                }
+                # Only replayed once it is committed, the lock keeps duplicates waiting until then.
+                transaction.on_commit(lambda: self.store(cache_key, entry, token))
+                stored = True
+            return response
+        finally:
+            if not stored:
+                release_lock(f"{cache_key}:lock", token, self.cache_alias)
+
+    def replay(self, cache_key: str, fingerprint: str) -> Optional[Response]:
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            return None
+        if entry["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReused
+        return Response(entry["data"], status=entry["status"], headers={**entry["headers"], REPLAYED_HEADER: "true"})
+
+    def store(self, cache_key: str, entry: dict, token: str) -> None:
+        self.cache.set(cache_key, entry, settings.IDEMPOTENCY_KEY_TTL)
+        release_lock(f"{cache_key}:lock", token, self.cache_alias)
+
+    @staticmethod
+    def make_key(request: Request, key: str) -> str:
+        user = request.user.pk if request.user.is_authenticated else ""
+        digest = hashlib.sha256(f"{user}:{request.method}:{request.path}:{key}".encode()).hexdigest()
+        return f"idempotency:{digest}"
+
+    @staticmethod
+    def fingerprint(request: Request) -> str:
+        # Keyed with SECRET_KEY, as request data includes passwords.
+        data = request.data
+        if isinstance(data, QueryDict):
+            data = dict(data.lists())
+        payload = json.dumps(data, sort_keys=True, default=str)
+        return salted_hmac("backend.utils.idempotency", payload).hexdigest()
+
+
+idempotent_requests = IdempotentRequests()
+
+
+def idempotent(method):
+    """
+    Makes a view method (e.g. create() or update()) idempotent for requests with an Idempotency-Key.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        return idempotent_requests.execute(request, lambda: method(self, request, *args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,337 @@
+import re
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.apps import apps
+from django.db import DatabaseError, connections, transaction
+
+# Column references of Django generated WHERE clauses, optionally wrapped in UPPER()/LOWER(),
+# e.g. `UPPER("users_user"."email"::text) = UPPER(%s)` or `"users_user"."uuid" IN (...)`.
+PREDICATE_RE = re.compile(
+    r'(?:\b(UPPER|LOWER)\()?"(\w+)"\."(\w+)"(?:::[\w ]+?)?\)?\s*(?:=|<>|>=|<=|>|<|\bIN\b|\bLIKE\b|\bBETWEEN\b)',
+    re.IGNORECASE,
+)
+WHERE_RE = re.compile(
+    r"\bWHERE\b(.*?)(?:\bORDER BY\b|\bGROUP BY\b|\bLIMIT\b|\bRETURNING\b|$)", re.IGNORECASE | re.DOTALL
+)
+PLAN_INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+# Bytes an index entry takes besides its key, and how full B-tree pages are kept (PostgreSQL defaults).
+INDEX_TUPLE_OVERHEAD = 16
+INDEX_FILL_FACTOR = 0.9
+
+POSTGRES_INDEXES_SQL = """
+SELECT c.relname, i.relname, am.amname, x.indisunique, x.indisprimary, x.indpred IS NOT NULL,
+       ARRAY(SELECT pg_get_indexdef(x.indexrelid, k, true) FROM generate_series(1, x.indnkeyatts) k),
+       (x.indclass::oid[])[0:x.indnkeyatts - 1],
+       pg_relation_size(x.indexrelid),
+       s.idx_scan,
+       t.n_tup_ins + t.n_tup_upd - t.n_tup_hot_upd
+FROM pg_index x
+JOIN pg_class c ON c.oid = x.indrelid
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_am am ON am.oid = i.relam
+LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = x.indexrelid
+LEFT JOIN pg_stat_user_tables t ON t.relid = x.indrelid
+WHERE c.relname = ANY(%s) AND pg_table_is_visible(c.oid)
+ORDER BY c.relname, i.relname
+"""
+
+POSTGRES_STATEMENTS_SQL = """
+SELECT query, calls, total_exec_time FROM pg_stat_statements
+WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+
+def get_tables(using: str) -> list[str]:
+    """
+    Returns the tables of the models of INSTALLED_APPS which exist in the database.
+    """
+    connection = connections[using]
+    existing = set(connection.introspection.table_names())
+    tables = {model._meta.db_table for model in apps.get_models(include_auto_created=True) if model._meta.managed}
+    return sorted(tables & existing)
+
+
+def normalize_key(key: str) -> str:
+    """
+    Returns an index key or predicate in a comparable form, e.g. `upper(email)` for `UPPER(("email")::text)`.
+    """
+    key = re.sub(r"\s+", "", key.lower().replace('"', ""))
+    key = re.sub(r"::\w+", "", key)
+    key = re.sub(r"\b\w+\.", "", key)
+    previous = None
+    while key != previous:
+        # Parentheses which are not a function call's.
+        previous, key = key, re.sub(r"(?<!\w)\(([^()]*)\)", r"\1", key)
+        if key.startswith("(") and key.endswith(")") and is_balanced(key[1:-1]):
+            key = key[1:-1]
+    return key
+
+
+def is_balanced(text: str) -> bool:
+    depth = 0
+    for char in text:
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+def extract_predicates(statement: str) -> set[tuple[str, str]]:
+    """
+    Returns the (table, key) pairs filtered on by the WHERE clause of `statement`.
+    """
+    predicates = set()
+    for where in WHERE_RE.findall(statement):
+        for function, table, column in PREDICATE_RE.findall(where):
+            predicates.add((table, f"{function.lower()}({column})" if function else column))
+    return predicates
+
+
+class IndexAdvisor:
+    """
+    Flags redundant, unused and missing indexes of the tables of the installed models.
+
+    On PostgreSQL usage comes from pg_stat_user_indexes and, if the extension is installed,
+    the workload from pg_stat_statements; both count since statistics were last reset.
+    Elsewhere, or in addition, a workload of SQL statements can be given; on SQLite indexes
+    count as used when the plan (EXPLAIN QUERY PLAN) of a workload statement uses them.
+    Missing indexes are guessed from the columns workload statements filter on.
+    """
+
+    def __init__(self, using: str = "default", workload: Iterable[str] = ()):
+        self.connection = connections[using]
+        self.tables = get_tables(using)
+        self.workload = list(workload)
+        self.notes = []
+        self.indexes = self.get_indexes()
+        self.statements = self.get_statements()
+
+    @property
+    def is_postgresql(self) -> bool:
+        return self.connection.vendor == "postgresql"
+
+    def get_indexes(self) -> list[dict]:
+        if self.is_postgresql:
+            return self.get_postgresql_indexes()
+        return self.get_sqlite_indexes()
+
+    def get_postgresql_indexes(self) -> list[dict]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(POSTGRES_INDEXES_SQL, [self.tables])
+            rows = cursor.fetchall()
+
+        return [
+            {
+                "table": table,
+                "name": name,
+                "method": method,
+                "unique": unique,
+                "primary": primary,
+                "partial": partial,
+                "keys": [normalize_key(key) for key in keys],
+                "opclasses": opclasses,
+                "size": size,
+                "scans": scans,
+                "writes": writes,
+            }
+            for table, name, method, unique, primary, partial, keys, opclasses, size, scans, writes in rows
+        ]
+
+    def get_sqlite_indexes(self) -> list[dict]:
+        scans = self.get_sqlite_plan_scans()
+        indexes = []
+        with self.connection.cursor() as cursor:
+            for table in self.tables:
+                cursor.execute(f"PRAGMA index_list({self.connection.ops.quote_name(table)})")
+                for _, name, unique, origin, partial in cursor.fetchall():
+                    cursor.execute(f"PRAGMA index_xinfo({self.connection.ops.quote_name(name)})")
+                    columns = [column for _, _, column, _, _, key in cursor.fetchall() if key]
+                    if None in columns:
+                        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = %s", [name])
+                        columns = split_keys(cursor.fetchone()[0])
+                    indexes.append(
+                        {
+                            "table": table,
+                            "name": name,
+                            "method": "btree",
+                            "unique": bool(unique),
+                            "primary": origin == "pk",
+                            "partial": bool(partial),
+                            "keys": [normalize_key(column) for column in columns],
+                            "opclasses": [None] * len(columns),
+                            "size": self.get_sqlite_size(name),
+                            "scans": scans.get(name, 0) if self.workload else None,
+                            "writes": None,
+                        }
+                    )
+        return indexes
+
+    def get_sqlite_size(self, name: str) -> Optional[int]:
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [name])
+                return cursor.fetchone()[0]
+        except DatabaseError:
+            # SQLite built without the dbstat virtual table.
+            return None
+
+    def get_sqlite_plan_scans(self) -> dict[str, int]:
+        scans = defaultdict(int)
+        with self.connection.cursor() as cursor:
+            for statement in self.workload:
+                try:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {statement}")
+                except DatabaseError as error:
+                    self.notes.append(f"Could not explain {statement[:60]!r}: {error}")
+                    continue
+                for row in cursor.fetchall():
+                    for name in PLAN_INDEX_RE.findall(row[-1]):
+                        scans[name] += 1
+        return scans
+
+    def get_statements(self) -> list[tuple[str, int, Optional[float]]]:
+        """
+        Returns the workload as (statement, calls, total milliseconds) tuples.
+        """
+        statements = [(statement, 1, None) for statement in self.workload]
+        if not self.is_postgresql:
+            return statements
+
+        try:
+            # In a savepoint, so that the error of a missing extension does not break the transaction.
+            with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+                cursor.execute(POSTGRES_STATEMENTS_SQL)
+                statements += cursor.fetchall()
+        except DatabaseError:
+            self.notes.append(
+                "pg_stat_statements is not installed, missing indexes are only looked for in the workload."
+            )
+        return statements
+
+    def stats_reset(self) -> Optional[str]:
+        if not self.is_postgresql:
+            return None
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()")
+            reset = cursor.fetchone()[0]
+        return reset and reset.isoformat(timespec="seconds")
+
+    def redundant(self) -> list[tuple[dict, dict]]:
+        """
+        Returns (index, covering index) pairs where the first index's keys are a prefix of the second's.
+        """
+        redundant = []
+        for index in self.indexes:
+            if index["primary"] or index["partial"]:
+                continue
+            size = len(index["keys"])
+            for other in self.indexes:
+                if (
+                    other is index
+                    or other["table"] != index["table"]
+                    or other["method"] != index["method"]
+                    or other["partial"]
+                    or other["keys"][:size] != index["keys"]
+                    or other["opclasses"][:size] != index["opclasses"]
+                ):
+                    continue
+                same = len(other["keys"]) == size
+                unique, other_unique = index["unique"] or index["primary"], other["unique"] or other["primary"]
+                # A unique index enforces a constraint, only an identical unique one makes it redundant.
+                if unique and not (other_unique and same):
+                    continue
+                # Of two identical indexes, only the second one by name is reported.
+                if same and unique == other_unique and index["name"] < other["name"]:
+                    continue
+                redundant.append((index, other))
+                break
+        return redundant
+
+    def unused(self) -> list[dict]:
+        return [
+            index
+            for index in self.indexes
+            if index["scans"] == 0 and not index["unique"] and not index["primary"]
+        ]
+
+    def missing(self, min_calls: int = 1) -> list[dict]:
+        """
+        Returns the predicates of the workload no index starts with, most called first.
+        """
+        usage = defaultdict(lambda: {"calls": 0, "time": None, "statements": 0})
+        for statement, calls, total_time in self.statements:
+            for table, key in extract_predicates(statement):
+                if table not in self.tables:
+                    continue
+                entry = usage[table, key]
+                entry["calls"] += calls
+                entry["statements"] += 1
+                if total_time is not None:
+                    entry["time"] = (entry["time"] or 0) + total_time
+
+        leading = {(index["table"], index["keys"][0]) for index in self.indexes if not index["partial"]}
+        missing = [
+            {"table": table, "key": key, **entry, **self.estimate_index(table, key)}
+            for (table, key), entry in usage.items()
+            if (table, key) not in leading and entry["calls"] >= min_calls
+        ]
+        return sorted(missing, key=lambda entry: (-entry["calls"], entry["table"], entry["key"]))
+
+    def estimate_index(self, table: str, key: str) -> dict:
+        """
+        Estimates the size of a B-tree index on `key` and how many entries it would have had to write.
+        """
+        if not self.is_postgresql:
+            return {"size": None, "writes": None}
+
+        column = re.sub(r"^\w+\((\w+)\)$", r"\1", key)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.reltuples, s.avg_width, t.n_tup_ins + t.n_tup_upd - t.n_tup_hot_upd
+                FROM pg_class c
+                LEFT JOIN pg_stats s ON s.tablename = c.relname AND s.attname = %s AND s.schemaname = current_schema()
+                LEFT JOIN pg_stat_user_tables t ON t.relid = c.oid
+                WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+                """,
+                [column, table],
+            )
+            rows, width, writes = cursor.fetchone()
+
+        if rows is None or rows < 0 or width is None:
+            # Never analyzed.
+            return {"size": None, "writes": writes}
+        return {"size": int(rows * (width + INDEX_TUPLE_OVERHEAD) / INDEX_FILL_FACTOR), "writes": writes}
+
+    def redundant_declarations(self) -> list[str]:
+        """
+        Returns the model fields declaring db_index=True next to unique=True, which already gets an index.
+        """
+        return [
+            f"{model._meta.label}.{field.name}"
+            for model in apps.get_models()
+            if model._meta.db_table in self.tables
+            for field in model._meta.local_fields
+            if field.unique and field.db_index and not field.primary_key and not field.is_relation
+        ]
+
+
+def split_keys(sql: str) -> list[str]:
+    """
+    Returns the keys of a CREATE INDEX statement, e.g. `["UPPER(username)", "id"]`.
+    """
+    start = sql.index("(", sql.upper().index(" ON ")) + 1
+    body = sql[start:sql.rindex(")")]
+    keys, depth, start = [], 0, 0
+    for position, char in enumerate(body):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            keys.append(body[start:position].strip())
+            start = position + 1
+    keys.append(body[start:].strip())
+    return [re.sub(r"\s+(ASC|DESC)$", "", key, flags=re.IGNORECASE) for key in keys]
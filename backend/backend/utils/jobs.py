@@ -0,0 +1,83 @@
+import logging
+import threading
+import uuid
+from typing import Callable, Optional
+
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Reports progress as (done, total).
+Report = Callable[[int, Optional[int]], None]
+
+
+class Jobs:
+    """
+    Runs long tasks in background threads of the current process, with their progress kept in the cache.
+
+    Jobs are lost if the process exits, so they should be safe to run again. Progress is kept
+    for `timeout` seconds after the last update. While a job runs its process renews a heartbeat
+    every `heartbeat_interval` seconds; running jobs whose heartbeat expired are reported as failed.
+    """
+
+    cache_alias = "default"
+    timeout = 24 * 60 * 60
+    heartbeat_interval = 10
+    heartbeat_timeout = 60
+
+    def start(self, name: str, func: Callable[[Report], None]) -> str:
+        """
+        Runs `func` in the background and returns the id of the job.
+        """
+        job_id = uuid.uuid4().hex
+        self.update(job_id, name=name, status="running", done=0, total=None)
+        self.beat(job_id)
+        finished = threading.Event()
+
+        def run():
+            try:
+                func(lambda done, total: self.update(job_id, done=done, total=total))
+            except Exception:
+                logger.exception("Job %s (%s) failed.", name, job_id)
+                self.update(job_id, status="failed")
+            else:
+                self.update(job_id, status="done")
+            finally:
+                finished.set()
+                connections.close_all()
+
+        def heartbeat():
+            while not finished.wait(self.heartbeat_interval):
+                self.beat(job_id)
+
+        threading.Thread(target=run, name=f"job-{name}", daemon=True).start()
+        threading.Thread(target=heartbeat, name=f"job-{name}-heartbeat", daemon=True).start()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        cache = caches[self.cache_alias]
+        key = self.make_key(job_id)
+        values = cache.get_many([key, f"{key}:heartbeat"])
+        job = values.get(key)
+        if job is not None and job["status"] == "running" and f"{key}:heartbeat" not in values:
+            # The process running it exited.
+            job = {**job, "status": "failed"}
+        return job
+
+    def beat(self, job_id: str) -> None:
+        # Kept apart from the progress, which only the job's own thread writes to.
+        caches[self.cache_alias].set(f"{self.make_key(job_id)}:heartbeat", 1, self.heartbeat_timeout)
+
+    def update(self, job_id: str, **progress) -> None:
+        # Only the job's own thread writes to it, so read-modify-write is safe.
+        key = self.make_key(job_id)
+        cache = caches[self.cache_alias]
+        cache.set(key, {**cache.get(key, {}), **progress}, self.timeout)
+
+    @staticmethod
+    def make_key(job_id: str) -> str:
+        return f"jobs:{job_id}"
+
+
+jobs = Jobs()
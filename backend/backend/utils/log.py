@@ -0,0 +1,305 @@
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from django.core.mail import mail_admins
+from django.utils.functional import SimpleLazyObject, empty
+
+_STOP = object()
+
+
+def get_fingerprint(record: logging.LogRecord) -> str:
+    """
+    Returns a key identifying "the same error" across log records.
+
+    Exceptions are grouped by type and the innermost frame they were raised from,
+    other records by the logging call site and the unformatted message.
+    """
+    if record.exc_info and record.exc_info[0] is not None:
+        exc_type, _, tb = record.exc_info
+        location = ""
+        if tb is not None:
+            frame = traceback.extract_tb(tb)[-1]
+            location = f"{frame.filename}:{frame.lineno}"
+        return f"{exc_type.__module__}.{exc_type.__qualname__}@{location}"
+
+    return f"{record.pathname}:{record.lineno}:{record.msg}"
+
+
+class DigestAdminEmailHandler(logging.Handler):
+    """
+    Non-blocking replacement for django.utils.log.AdminEmailHandler.
+
+    Records are handed to a background thread, which groups them by fingerprint
+    and mails the site admins a single digest per `interval` seconds.
+    """
+
+    def __init__(self, interval: float = 60, max_fingerprints: int = 50, queue_size: int = 1000):
+        super().__init__()
+        self.interval = interval
+        self.max_fingerprints = max_fingerprints
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        # Not the handler's own lock: logging holds that one around emit(), and
+        # request threads must never wait on a digest being formatted or sent.
+        self._state_lock = threading.Lock()
+        self._dropped = 0
+        self._pending = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._ensure_worker()
+            self._queue.put_nowait((get_fingerprint(record), record))
+        except queue.Full:
+            self._dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        """
+        Sends whatever has been collected so far without waiting for the window to close.
+        """
+        with self._state_lock:
+            self._drain()
+        self._send_digest()
+
+    def close(self) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout=5)
+        self._thread = None
+        self.flush()
+        super().close()
+
+    def _ensure_worker(self) -> None:
+        # Threads do not survive fork(), so a gunicorn worker forked from a
+        # preloaded master has to start its own.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pending = {}
+                self._thread = threading.Thread(target=self._run, name="digest-admin-email", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                return
+
+            if item is not None:
+                with self._state_lock:
+                    self._collect(*item)
+                    self._drain()
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self._send_digest()
+                deadline = None
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if item is _STOP:
+                # Put it back for the worker loop to see.
+                self._queue.put_nowait(item)
+                return
+
+            self._collect(*item)
+
+    def _collect(self, fingerprint: str, record: logging.LogRecord) -> None:
+        entry = self._pending.get(fingerprint)
+        if entry is not None:
+            entry["count"] += 1
+            return
+
+        if len(self._pending) >= self.max_fingerprints:
+            self._dropped += 1
+            return
+
+        # Only the first occurrence of every fingerprint is ever formatted.
+        self._pending[fingerprint] = {
+            "count": 1,
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "text": self.format(record),
+        }
+
+    def _send_digest(self) -> None:
+        with self._state_lock:
+            pending, dropped = self._pending, self._dropped
+            self._pending, self._dropped = {}, 0
+
+        if not pending and not dropped:
+            return
+
+        total = sum(entry["count"] for entry in pending.values()) + dropped
+        subject = f"{total} error(s), {len(pending)} distinct in the last {self.interval:g}s"
+
+        parts = []
+        for fingerprint, entry in sorted(pending.items(), key=lambda item: -item[1]["count"]):
+            parts.append(
+                f"[{entry['level']}] x{entry['count']}: {entry['message']}\n"
+                f"Fingerprint: {fingerprint}\n\n{entry['text']}"
+            )
+        if dropped:
+            parts.append(f"{dropped} record(s) dropped because the digest was full.")
+
+        try:
+            mail_admins(subject, f"\n\n{'-' * 70}\n\n".join(parts), fail_silently=True)
+        except Exception:
+            # Error reporting must never take the worker down with it.
+            pass
+
+
+# Attributes every LogRecord has; anything else was passed through `extra`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request"}
+
+request_var = contextvars.ContextVar("request", default=None)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+
+def get_user_uuid(request) -> Optional[str]:
+    """
+    Returns the uuid of the user authenticated on `request`, without ever triggering a query for it.
+    """
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject):
+        # Not evaluated yet, DRF replaces it with the real user once it authenticates.
+        user = user._wrapped
+        if user is empty:
+            return None
+
+    user_uuid = getattr(user, "uuid", None)
+    return str(user_uuid) if user_uuid is not None else None
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Adds `request_id` and `user_uuid` of the request being handled to every record.
+
+    Has to run on the thread that logged the record, so it belongs on the
+    QueueListenerHandler rather than on the handlers behind it.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        if not hasattr(record, "user_uuid"):
+            record.user_uuid = get_user_uuid(request_var.get())
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as single line JSON objects.
+
+    Fields passed through `extra` (e.g. `duration_ms`) end up as top level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": "%s.%03dZ" % (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)), record.msecs),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "process": record.process,
+            "thread": record.thread,
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and value is not None:
+                data[key] = value
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+
+        return json.dumps(data, default=str, separators=(",", ":"))
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Puts records on a queue drained by a listener thread which passes them on to `handlers`.
+
+    In a LOGGING config `handlers` are references to other handlers of the same config, e.g.
+    "cfg://handlers.console", which dictConfig() resolves to the handlers themselves. Formatting
+    and I/O happen on the listener thread; when the queue is full records are dropped rather
+    than blocking the caller.
+    """
+
+    def __init__(self, handlers: list[logging.Handler], queue_size: int = 10000, respect_handler_level: bool = True):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        # dictConfig() resolves cfg:// references on item access, not when iterating. They are held here,
+        # as logging only keeps weak references to handlers no logger uses directly.
+        self.target_handlers = [handlers[index] for index in range(len(handlers))]
+        if not all(isinstance(handler, logging.Handler) for handler in self.target_handlers):
+            # Not configured yet, dictConfig() configures handlers in the order of their names.
+            raise ValueError("Handlers passed on to must be configured before this one.")
+        self.respect_handler_level = respect_handler_level
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare() this leaves formatting to the listener.
+        # Only the arguments are merged here, as they may change once we return.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+        super().close()
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None and self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._listener is None or self._pid != os.getpid():
+                self._listener = QueueListener(
+                    self.queue, *self.target_handlers, respect_handler_level=self.respect_handler_level
+                )
+                self._listener.start()
+                self._pid = os.getpid()
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from backend.utils.compression import compress, compress_stream, select_encoding
+from backend.utils.concurrency import (
+    AdaptiveConcurrencyLimit,
+    BusyPeriod,
+    parse_request_start,
+)
+from backend.utils.log import get_user_uuid, request_id_var, request_var
+
+access_logger = logging.getLogger("backend.access")
+
+
+class RequestContextMiddleware:
+    """
+    Tags the request with an id, exposes it to logging and writes an access log line with its timing.
+
+    An incoming X-Request-ID header (e.g. set by the proxy) is reused, so log lines can be correlated.
+    Runs natively under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+    header = "HTTP_X_REQUEST_ID"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django to await the middleware, like django.utils.deprecation.MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        start, tokens = self.enter(request)
+        try:
+            return self.log(request, self.get_response(request), start)
+        finally:
+            self.exit(tokens)
+
+    async def __acall__(self, request):
+        start, tokens = self.enter(request)
+        try:
+            return self.log(request, await self.get_response(request), start)
+        finally:
+            self.exit(tokens)
+
+    def enter(self, request) -> tuple:
+        request.id = request.META.get(self.header) or uuid.uuid4().hex
+        return time.perf_counter(), (request_var.set(request), request_id_var.set(request.id))
+
+    @staticmethod
+    def exit(tokens: tuple) -> None:
+        request_token, request_id_token = tokens
+        request_var.reset(request_token)
+        request_id_var.reset(request_id_token)
+
+    @staticmethod
+    def log(request, response, start: float):
+        response["X-Request-ID"] = request.id
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "user_uuid": get_user_uuid(request),
+            },
+        )
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Answers requests beyond the adaptive concurrency limit of the process with a fast 503 and a
+    Retry-After header, rather than letting them queue until they time out.
+
+    Paths matching settings.LOAD_SHEDDING_LOW_PRIORITY_URLS_REGEX (signup, schema and docs) are shed
+    first, so the login and user retrieval paths keep their capacity. The time a request spent queued
+    before reaching the process comes from the X-Request-Start header set by the proxy. Traefik does not
+    set it, so processes serving one request at a time (sync gunicorn workers) estimate it, see BusyPeriod;
+    others only go by the latency and the number of requests in flight. See AdaptiveConcurrencyLimit.
+
+    The limit on requests in flight only takes effect under ASGI or with threaded workers. A sync worker
+    never has more than one request in flight, so there only low priority requests that queued for longer
+    than settings.LOAD_SHEDDING_QUEUE_TARGET are shed.
+    """
+
+    sync_capable = True
+    async_capable = True
+    header = "HTTP_X_REQUEST_START"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+        self.low_priority_re = re.compile(settings.LOAD_SHEDDING_LOW_PRIORITY_URLS_REGEX)
+        self.limit = AdaptiveConcurrencyLimit(
+            min_limit=settings.LOAD_SHEDDING_MIN_CONCURRENCY,
+            max_limit=settings.LOAD_SHEDDING_MAX_CONCURRENCY,
+            queue_target=settings.LOAD_SHEDDING_QUEUE_TARGET,
+            latency_target=settings.LOAD_SHEDDING_LATENCY_TARGET,
+        )
+        self.busy_period = BusyPeriod()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        try:
+            queue_delay = self.admit(request)
+            if queue_delay is None:
+                return self.shed_response()
+
+            start = time.perf_counter()
+            try:
+                return self.get_response(request)
+            finally:
+                self.limit.release(time.perf_counter() - start, queue_delay)
+        finally:
+            self.busy_period.finish()
+
+    async def __acall__(self, request):
+        queue_delay = self.admit(request)
+        if queue_delay is None:
+            return self.shed_response()
+
+        start = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            self.limit.release(time.perf_counter() - start, queue_delay)
+
+    def admit(self, request) -> Optional[float]:
+        # Returns how long the request was queued for, or None if it is shed.
+        if self.header in request.META:
+            queue_delay = parse_request_start(request.META[self.header])
+        elif request.META.get("wsgi.multithread") is False:
+            queue_delay = self.busy_period.start()
+        else:
+            queue_delay = 0.0
+        low_priority = self.low_priority_re.match(request.path_info) is not None
+        return queue_delay if self.limit.acquire(low_priority, queue_delay) else None
+
+    @staticmethod
+    def shed_response() -> JsonResponse:
+        response = JsonResponse({"detail": "Service temporarily overloaded, try again later."}, status=503)
+        response["Retry-After"] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with Brotli or gzip, whichever the client prefers (Brotli on a tie).
+
+    Like django.middleware.gzip.GZipMiddleware, but responses smaller than settings.COMPRESSION_MIN_SIZE
+    are left alone, as are those not made of text. Streaming responses are compressed chunk by chunk.
+    """
+
+    sync_capable = True
+    async_capable = True
+    compressible_re = re.compile(r"^(text/|application/(json|x-ndjson|javascript|xml|.+\+json|vnd\.oai\.openapi))")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not self.compressible_re.match(response.get("Content-Type", "")):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = select_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # Like GZipMiddleware, as the compressed bytes differ from those the ETag was computed on.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+
+class PathMiddlewareDispatcher:
+    """
+    Runs settings.API_MIDDLEWARE for paths matching settings.API_URLS_REGEX and settings.FULL_MIDDLEWARE
+    for any other path, so API calls skip the middleware only the admin and other HTML pages need.
+
+    Both lists are loaded like settings.MIDDLEWARE, including their process_view(), process_exception()
+    and process_template_response() hooks, and end in whatever follows the dispatcher in settings.MIDDLEWARE.
+    Under ASGI, the chains and hooks are adapted to async the way Django adapts settings.MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+        self.api_re = re.compile(settings.API_URLS_REGEX)
+        self.api = self.load(settings.API_MIDDLEWARE, get_response)
+        self.full = self.load(settings.FULL_MIDDLEWARE, get_response)
+
+    def load(self, middleware: list[str], get_response) -> dict:
+        # Mirrors django.core.handlers.base.BaseHandler.load_middleware().
+        adapt = BaseHandler().adapt_method_mode
+        chain = {"view": [], "template_response": [], "exception": []}
+        handler, handler_is_async = get_response, self.is_async
+        for middleware_path in reversed(middleware):
+            middleware_class = import_string(middleware_path)
+            can_sync = getattr(middleware_class, "sync_capable", True)
+            can_async = getattr(middleware_class, "async_capable", False)
+            middleware_is_async = can_async if handler_is_async or not can_sync else False
+            try:
+                instance = middleware_class(adapt(middleware_is_async, handler, handler_is_async))
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(instance, "process_view"):
+                chain["view"].insert(0, adapt(self.is_async, instance.process_view))
+            if hasattr(instance, "process_template_response"):
+                chain["template_response"].append(adapt(self.is_async, instance.process_template_response))
+            if hasattr(instance, "process_exception"):
+                # Django runs exception hooks synchronously under ASGI too.
+                chain["exception"].append(adapt(False, instance.process_exception))
+            handler, handler_is_async = convert_exception_to_response(instance), middleware_is_async
+        chain["handler"] = adapt(self.is_async, handler, handler_is_async)
+        return chain
+
+    def get_chain(self, request) -> dict:
+        return self.api if self.api_re.match(request.path_info) else self.full
+
+    def __call__(self, request):
+        # A coroutine under ASGI, as the chains are adapted to it.
+        return self.get_chain(request)["handler"](request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.get_chain(request)["view"]:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for process_template_response in self.get_chain(request)["template_response"]:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in self.get_chain(request)["exception"]:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.get_chain(request)["view"]:
+            response = await process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def aprocess_template_response(self, request, response):
+        for process_template_response in self.get_chain(request)["template_response"]:
+            response = await process_template_response(request, response)
+        return response
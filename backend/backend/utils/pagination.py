@@ -0,0 +1,34 @@
+import json
+from typing import Optional
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator taking the count of large result sets from the PostgreSQL planner's estimate.
+
+    An exact COUNT(*) has to visit every matching row, which takes seconds on millions of
+    them. Below `exact_count_limit` estimated rows the count is exact; above, page numbers
+    near the end may be off, as the estimate only is as good as the table's statistics.
+    """
+
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self) -> int:
+        estimate = self.estimate_count()
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
+
+    def estimate_count(self) -> Optional[int]:
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or connections[queryset.db].vendor != "postgresql":
+            return None
+
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,76 @@
+import os
+import re
+from pathlib import Path
+from typing import Callable
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+# Set to rewrite the snapshots of plans that changed instead of failing.
+UPDATE_ENV = "UPDATE_PLAN_SNAPSHOTS"
+EXPLAINED = ("SELECT", "UPDATE", "DELETE")
+# The hash in the names Django generates for indexes, e.g. users_token_key_820deccd_like.
+INDEX_NAME_HASH_RE = re.compile(r"_[0-9a-f]{8}(?=_|$)")
+
+
+def capture_statements(func: Callable[[], object], using: str = "default") -> list[str]:
+    """
+    Returns the SELECT, UPDATE and DELETE statements `func` runs, with their parameters inlined.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        func()
+    return [query["sql"] for query in context.captured_queries if query["sql"].lstrip().upper().startswith(EXPLAINED)]
+
+
+def explain(statement: str, using: str = "default") -> dict:
+    """
+    Returns the plan PostgreSQL picks for `statement`, without running it.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}")
+        # psycopg2 parses the json result.
+        return cursor.fetchone()[0][0]["Plan"]
+
+
+def plan_shape(plan: dict, depth: int = 0) -> list[str]:
+    """
+    Returns the shape of a JSON plan: one line per node with its type, relation and index, indented by depth.
+
+    Costs and row estimates are left out, as they vary with the data; scans which filter the rows
+    they read, rather than only reading matching ones, are marked as such. The hashes in the names
+    of indexes Django generated are replaced with *, as they change with unrelated renames.
+    """
+    line = plan["Node Type"]
+    if "Relation Name" in plan:
+        line += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        line += f" using {INDEX_NAME_HASH_RE.sub('_*', plan['Index Name'])}"
+    if "Filter" in plan and "Scan" in plan["Node Type"]:
+        line += " (filtered)"
+
+    lines = ["  " * depth + line]
+    for child in plan.get("Plans", []):
+        lines.extend(plan_shape(child, depth + 1))
+    return lines
+
+
+def assert_plans_match(name: str, func: Callable[[], object], directory: Path, using: str = "default") -> None:
+    """
+    Asserts that the plans of the statements `func` runs have the shapes saved in `directory`/`name`.txt.
+
+    With UPDATE_PLAN_SNAPSHOTS set, the snapshot is written instead, so missing ones fail until it is
+    set and the new snapshot reviewed, rather than silently passing on CI.
+    """
+    shapes = "\n\n".join("\n".join(plan_shape(explain(sql, using))) for sql in capture_statements(func, using))
+    path = directory / f"{name}.txt"
+    if os.environ.get(UPDATE_ENV):
+        path.write_text(shapes + "\n")
+        return
+
+    assert path.exists(), f"No query plan snapshot for {name}, set {UPDATE_ENV}=1 to write {path}.\nGot:\n{shapes}"
+
+    expected = path.read_text().rstrip("\n")
+    assert shapes == expected, (
+        f"The query plans of {name} changed, set {UPDATE_ENV}=1 to update {path} if that is intended.\n"
+        f"Expected:\n{expected}\n\nGot:\n{shapes}"
+    )
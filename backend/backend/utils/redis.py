@@ -0,0 +1,61 @@
+import secrets
+from typing import Optional
+
+from django.core.cache import caches
+from django_redis import get_redis_connection
+from redis import Redis
+from redis.exceptions import RedisError
+
+# Deletes KEYS[1] only if it still holds the token ARGV[1], i.e. the lock was not taken over since.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def get_redis_client(alias: str = "default") -> Optional[Redis]:
+    """
+    Returns the raw Redis client behind a cache, or None when that cache is not backed by Redis.
+    """
+    try:
+        return get_redis_connection(alias)
+    except NotImplementedError:
+        return None
+
+
+def acquire_lock(key: str, timeout: float, alias: str = "default") -> Optional[str]:
+    """
+    Takes the lock `key` in a cache for at most `timeout` seconds. Returns the token to release
+    it with, or None when it is held by someone else.
+
+    Goes to Redis directly (SET NX), bypassing IGNORE_EXCEPTIONS, so that an unavailable Redis
+    raises RedisError rather than looking like a lock held by someone else.
+    """
+    token = secrets.token_hex(16)
+    client = get_redis_client(alias)
+    if client is None:
+        acquired = caches[alias].add(key, token, timeout)
+    else:
+        acquired = client.set(str(caches[alias].make_key(key)), token, nx=True, px=int(timeout * 1000))
+    return token if acquired else None
+
+
+def release_lock(key: str, token: str, alias: str = "default") -> None:
+    """
+    Releases a lock taken with acquire_lock(), unless it expired and was taken by someone else since.
+    """
+    client = get_redis_client(alias)
+    if client is None:
+        # Not atomic, but only Redis is shared between processes.
+        cache = caches[alias]
+        if cache.get(key) == token:
+            cache.delete(key)
+        return
+
+    try:
+        client.eval(RELEASE_LOCK_SCRIPT, 1, str(caches[alias].make_key(key)), token)
+    except RedisError:
+        # It expires on its own.
+        pass
@@ -0,0 +1,174 @@
+import collections
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import render
+from django.utils import timezone
+
+from backend.utils.log import request_id_var, request_var
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Returns `sql` with its literals and placeholders replaced by ?, so that the same statement looks the same
+    whatever its parameters, e.g. `SELECT ... WHERE "id" IN (...) LIMIT ?`.
+    """
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql.replace("%s", "?"))
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    return WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def get_view(request) -> Optional[str]:
+    """
+    Returns the method and the view handling `request`, e.g. `GET backend.users.views.UserViewSet`,
+    or its path when it was not resolved yet.
+    """
+    if request is None:
+        return None
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return f"{request.method} {request.path}"
+    # Class-based views, DRF's viewsets included, are named after their class.
+    view = getattr(match.func, "view_class", None) or getattr(match.func, "cls", None) or match.func
+    return f"{request.method} {view.__module__}.{view.__qualname__}"
+
+
+class SlowQueryLog:
+    """
+    Database execute wrapper keeping the last `size` queries slower than settings.SLOW_QUERY_THRESHOLD.
+
+    Every entry has the normalized SQL, the view and request it ran for and the innermost frames of the
+    project's own code which ran it, so slow queries can be traced to a code path. Entries are per
+    process, see slow_query_view() and install_signal_handler() for reading them. Queries that fail,
+    e.g. on a statement timeout, are recorded as well.
+
+    Timing a query costs two perf_counter() calls; the rest only happens for slow ones.
+    """
+
+    # Frames of the innermost calls kept per query, and characters of SQL.
+    stack_depth = 10
+    max_sql_length = 2000
+
+    def __init__(self, size: int):
+        self.entries = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.source_dir = str(settings.APPS_DIR) + os.sep
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= settings.SLOW_QUERY_THRESHOLD:
+                self.record(sql, duration, context["connection"].alias)
+
+    def install(self, sender, connection, **kwargs) -> None:
+        """
+        Receiver of connection_created wrapping every connection of the process.
+        """
+        # Wrappers live on the connection handler of a thread, which outlives reconnects.
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def record(self, sql: str, duration: float, alias: str) -> None:
+        request = request_var.get()
+        entry = {
+            "started": timezone.now() - timedelta(seconds=duration),
+            "duration_ms": round(duration * 1000, 1),
+            "database": alias,
+            "sql": normalize_sql(sql)[: self.max_sql_length],
+            "view": get_view(request),
+            "request_id": request_id_var.get(),
+            "stack": self.get_stack(),
+        }
+        with self.lock:
+            self.entries.append(entry)
+
+    def get_stack(self) -> list[str]:
+        """
+        Returns the innermost frames of the project's code on the current stack, innermost last.
+        """
+        stack = []
+        frame = sys._getframe(2)
+        while frame is not None and len(stack) < self.stack_depth:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self.source_dir) and filename != __file__:
+                stack.append(f"{filename[len(self.source_dir):]}:{frame.f_lineno} in {frame.f_code.co_name}")
+            frame = frame.f_back
+        return stack[::-1]
+
+    def get_entries(self) -> list[dict]:
+        """
+        Returns the recorded queries, the most recent first.
+        """
+        with self.lock:
+            return list(reversed(self.entries))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def dump(self) -> None:
+        """
+        Logs the recorded queries, one record each with the entry as extra fields.
+        """
+        entries = self.get_entries()
+        logger.warning("%d slow queries recorded by process %d.", len(entries), os.getpid())
+        for entry in entries:
+            logger.warning("Slow query (%.1f ms): %s", entry["duration_ms"], entry["sql"], extra=entry)
+
+    def install_signal_handler(self, signum: int = signal.SIGUSR2) -> bool:
+        """
+        Dumps the recorded queries whenever the process receives `signum`, e.g. `kill -USR2 <worker pid>`.
+
+        Only possible from the main thread, returns whether the handler was installed.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return False
+
+        def handler(signum, frame):
+            # Logging takes locks the interrupted code may be holding, so not from the handler itself.
+            threading.Thread(target=self.dump, name="slow-query-dump", daemon=True).start()
+
+        signal.signal(signum, handler)
+        return True
+
+
+slow_queries = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
+
+
+def slow_query_view(request):
+    """
+    Admin page listing the slow queries recorded by the process serving it, for superusers only.
+    """
+    if not request.user.is_superuser:
+        raise PermissionDenied
+
+    context = {
+        **admin.site.each_context(request),
+        "title": "Slow queries",
+        "entries": slow_queries.get_entries(),
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD * 1000,
+        "size": slow_queries.entries.maxlen,
+        "pid": os.getpid(),
+    }
+    return render(request, "admin/slow_queries.html", context)
@@ -0,0 +1,40 @@
+import gzip
+
+import brotli
+import pytest
+
+from backend.utils.compression import compress, compress_stream, select_encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, *", "gzip"),
+        ("*;q=0.1", "br"),
+        ("GZIP;Q=1", "gzip"),
+        ("gzip;q=invalid", None),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_select_encoding(accept_encoding: str, expected: str):
+    assert select_encoding(accept_encoding) == expected
+
+
+def test_compress():
+    data = b'{"username":"user"}' * 100
+    assert brotli.decompress(compress(data, "br")) == data
+    assert gzip.decompress(compress(data, "gzip")) == data
+
+
+@pytest.mark.parametrize("encoding, decompress", [("br", brotli.decompress), ("gzip", gzip.decompress)])
+def test_compress_stream(encoding: str, decompress):
+    chunks = [b"first line\n" * 100, b"", b"second line\n" * 100]
+    compressed = list(compress_stream(iter(chunks), encoding))
+
+    # Every chunk is flushed as it comes.
+    assert len(compressed) == 3
+    assert decompress(b"".join(compressed)) == b"".join(chunks)
@@ -0,0 +1,107 @@
+import pytest
+
+from backend.utils.concurrency import (
+    AdaptiveConcurrencyLimit,
+    BusyPeriod,
+    parse_request_start,
+)
+
+
+@pytest.fixture
+def limit() -> AdaptiveConcurrencyLimit:
+    return AdaptiveConcurrencyLimit(min_limit=1, max_limit=4, queue_target=0.1, latency_target=1.0)
+
+
+def test_limit_admits_up_to_limit(limit: AdaptiveConcurrencyLimit):
+    assert all(limit.acquire() for _ in range(4))
+    assert not limit.acquire()
+    assert limit.in_flight == 4
+    assert limit.shed == 1
+
+    limit.release(0.01)
+    assert limit.acquire()
+
+
+def test_limit_sheds_low_priority_first(limit: AdaptiveConcurrencyLimit):
+    assert limit.acquire(low_priority=True)
+    assert limit.acquire(low_priority=True)
+    assert not limit.acquire(low_priority=True)
+    assert limit.acquire()
+
+    limit.release(0.01)
+    assert not limit.acquire(low_priority=True, queue_delay=0.5)
+    assert limit.acquire(queue_delay=0.5)
+
+
+def test_limit_always_admits_one_request(limit: AdaptiveConcurrencyLimit):
+    limit.limit = 1
+    assert limit.acquire(low_priority=True)
+    assert not limit.acquire()
+
+
+def test_limit_backs_off_on_congestion(limit: AdaptiveConcurrencyLimit):
+    for _ in range(3):
+        limit.acquire()
+    limit.release(2.0)
+    assert limit.limit == pytest.approx(3.6)
+    # Once per interval only.
+    limit.release(0.01, queue_delay=0.5)
+    assert limit.limit == pytest.approx(3.6)
+
+    limit.limit = 1
+    limit._backed_off_at = float("-inf")
+    limit.release(2.0)
+    assert limit.limit == 1
+
+
+def test_limit_grows_while_in_use(limit: AdaptiveConcurrencyLimit):
+    limit.limit = 2
+    limit.acquire()
+    limit.acquire()
+    limit.release(0.01)
+    assert limit.limit == pytest.approx(2.5)
+    # Half the limit is no longer in use.
+    limit.release(0.01)
+    assert limit.limit == pytest.approx(2.5)
+
+
+def test_busy_period():
+    busy_period = BusyPeriod()
+    assert busy_period.start(now=10.0) == 0
+    busy_period.finish(now=10.5)
+    # Started right away, so it was waiting since some time after 10.0.
+    assert busy_period.start(now=10.501) == pytest.approx(0.501)
+    busy_period.finish(now=11.0)
+    assert busy_period.start(now=11.001) == pytest.approx(1.001)
+    busy_period.finish(now=11.2)
+
+    # After an idle gap, nothing was waiting.
+    assert busy_period.start(now=11.3) == 0
+
+
+def test_busy_period_is_bounded():
+    busy_period = BusyPeriod()
+    delays = []
+    for step in range(500):
+        delays.append(busy_period.start(now=step * 0.01))
+        busy_period.finish(now=step * 0.01 + 0.009)
+
+    # Busy for 5 seconds straight, in periods of at most max_period.
+    assert max(delays) <= busy_period.max_period
+    assert delays.count(0) == 3
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("t=1650000000.5", 0.5),
+        ("1650000000500", 0.5),
+        ("1650000000500000", 0.5),
+        ("t=1650000002", 0),
+        ("", 0),
+        (None, 0),
+        ("invalid", 0),
+    ],
+)
+def test_parse_request_start(value, expected):
+    assert parse_request_start(value, now=1650000001) == pytest.approx(expected)
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from backend.utils import health
+from backend.utils.health import (
+    HealthCheckASGIMiddleware,
+    HealthChecks,
+    HealthCheckWSGIMiddleware,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def django_application(*args):
+    raise AssertionError("Health probes must not reach Django.")
+
+
+@pytest.fixture
+def checks(monkeypatch) -> dict:
+    calls = {"database": 0, "redis": 0}
+    results = {"database": True, "redis": None}
+
+    def make_check(name):
+        def check():
+            calls[name] += 1
+            return results[name]
+
+        return check
+
+    monkeypatch.setattr(
+        health, "health_checks", HealthChecks({name: make_check(name) for name in calls}, required=["database"])
+    )
+    return {"calls": calls, "results": results}
+
+
+def probe(path: str) -> tuple[str, dict, dict]:
+    response = {}
+
+    def start_response(status, headers):
+        response["status"], response["headers"] = status, dict(headers)
+
+    body = b"".join(HealthCheckWSGIMiddleware(django_application)({"PATH_INFO": path}, start_response))
+    return response["status"], response["headers"], json.loads(body)
+
+
+def test_liveness_runs_no_checks(checks: dict):
+    assert probe("/health/live") == (
+        "200 OK",
+        {"Content-Type": "application/json", "Content-Length": "15", "Cache-Control": "no-store"},
+        {"status": "ok"},
+    )
+    assert checks["calls"] == {"database": 0, "redis": 0}
+
+
+def test_readiness_checks_are_cached(
+    checks: dict,
+    settings,
+):
+    settings.HEALTH_CHECK_INTERVAL = 60
+
+    status, _, body = probe("/health/ready")
+    assert status == "200 OK"
+    assert body == {"status": "ok", "checks": {"database": True, "redis": None}}
+
+    checks["results"]["database"] = False
+    assert probe("/health/ready")[0] == "200 OK"
+    assert checks["calls"] == {"database": 1, "redis": 1}
+
+    settings.HEALTH_CHECK_INTERVAL = 0
+    status, _, body = probe("/health/ready")
+    assert status == "503 Service Unavailable"
+    assert body == {"status": "unavailable", "checks": {"database": False, "redis": None}}
+
+
+def test_readiness_does_not_require_redis(
+    checks: dict,
+    settings,
+):
+    settings.HEALTH_CHECK_INTERVAL = 0
+    checks["results"]["redis"] = False
+
+    status, _, body = probe("/health/ready")
+    assert status == "200 OK"
+    assert body == {"status": "degraded", "checks": {"database": True, "redis": False}}
+
+    health.health_checks.required = frozenset(["database", "redis"])
+    assert probe("/health/ready")[0] == "503 Service Unavailable"
+
+
+def test_other_requests_reach_django():
+    application = HealthCheckWSGIMiddleware(lambda environ, start_response: [b"django"])
+    assert application({"PATH_INFO": "/api/v1/"}, None) == [b"django"]
+
+
+def test_readiness_under_asgi(checks: dict):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(HealthCheckASGIMiddleware(django_application))({"type": "http", "path": "/health/ready"}, None, send)
+    assert messages[0]["status"] == 200
+    assert json.loads(messages[1]["body"])["checks"]["database"] is True
+
+
+def test_check_database():
+    assert health.check_database() is True
@@ -0,0 +1,81 @@
+from typing import Optional
+
+import pytest
+from redis.exceptions import RedisError
+from rest_framework import exceptions
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from backend.utils import idempotency
+from backend.utils.idempotency import IdempotencyKeyInProgress, IdempotentRequests
+
+# Responses are stored on commit, which is immediate outside of test transactions.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def make_request(key: Optional[str] = "key", data: Optional[dict] = None) -> Request:
+    headers = {"HTTP_IDEMPOTENCY_KEY": key} if key is not None else {}
+    request = APIRequestFactory().post("/api/v1/users/", data or {"username": "user"}, format="json", **headers)
+    return Request(request, parsers=[JSONParser()])
+
+
+@pytest.fixture
+def requests() -> IdempotentRequests:
+    requests = IdempotentRequests()
+    requests.lock_wait = 0
+    return requests
+
+
+def test_requests_without_key_always_run(requests: IdempotentRequests):
+    calls = []
+    for _ in range(2):
+        requests.execute(make_request(key=None), lambda: calls.append(1) or Response(status=201))
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("key", ["", "k" * 256])
+def test_invalid_key(requests: IdempotentRequests, key: str):
+    with pytest.raises(exceptions.ValidationError):
+        requests.execute(make_request(key=key), lambda: Response())
+
+
+def test_failed_requests_are_not_stored(requests: IdempotentRequests):
+    def fail():
+        raise exceptions.ValidationError("invalid")
+
+    with pytest.raises(exceptions.ValidationError):
+        requests.execute(make_request(), fail)
+    assert requests.execute(make_request(), lambda: Response(status=400)).status_code == 400
+
+    response = requests.execute(make_request(), lambda: Response({"id": 1}, status=201))
+    assert not response.has_header("Idempotent-Replayed")
+    assert requests.execute(make_request(), lambda: Response(status=500)).data == {"id": 1}
+
+
+def test_duplicates_wait_for_requests_in_progress(requests: IdempotentRequests):
+    def duplicate():
+        with pytest.raises(IdempotencyKeyInProgress):
+            requests.execute(make_request(), lambda: Response())
+        return Response({"id": 1}, status=201, headers={"Location": "/api/v1/users/1/"})
+
+    requests.execute(make_request(), duplicate)
+
+    response = requests.execute(make_request(), lambda: Response())
+    assert response.status_code == 201
+    assert response["Location"] == "/api/v1/users/1/"
+    assert response["Idempotent-Replayed"] == "true"
+
+
+def test_requests_run_without_waiting_when_redis_is_down(requests: IdempotentRequests, monkeypatch):
+    def unavailable(key, timeout, alias):
+        raise RedisError("Connection refused.")
+
+    monkeypatch.setattr(idempotency, "acquire_lock", unavailable)
+    requests.lock_wait = 60
+    calls = []
+    for _ in range(2):
+        response = requests.execute(make_request(), lambda: calls.append(1) or Response({"id": 1}, status=201))
+        assert not response.has_header("Idempotent-Replayed")
+    assert len(calls) == 2
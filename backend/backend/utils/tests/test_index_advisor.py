@@ -0,0 +1,54 @@
+import pytest
+
+from backend.utils.index_advisor import (
+    IndexAdvisor,
+    extract_predicates,
+    normalize_key,
+    split_keys,
+)
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        ("date_joined", "date_joined"),
+        ('"users_user"."email"', "email"),
+        ("upper(username::text)", "upper(username)"),
+        ("upper((username)::text)", "upper(username)"),
+        ('(UPPER("email"))', "upper(email)"),
+        ('lower(("email")::character varying)', "lower(email)"),
+    ],
+)
+def test_normalize_key(key: str, expected: str):
+    assert normalize_key(key) == expected
+
+
+def test_extract_predicates():
+    statement = (
+        'SELECT "users_user"."id" FROM "users_user" WHERE (UPPER("users_user"."email"::text) = UPPER($1) '
+        'OR "users_user"."uuid" IN ($2, $3)) AND "users_user"."is_active" ORDER BY "users_user"."date_joined" LIMIT 1'
+    )
+    assert extract_predicates(statement) == {("users_user", "upper(email)"), ("users_user", "uuid")}
+
+
+def test_split_keys():
+    sql = 'CREATE INDEX "x" ON "users_user" ((UPPER("username")), "id" DESC)'
+    assert split_keys(sql) == ['(UPPER("username"))', '"id"']
+
+
+@pytest.mark.django_db
+def test_index_advisor():
+    workload = [
+        'SELECT "users_user"."id" FROM "users_user" WHERE "users_user"."email" = \'a@example.com\'',
+        'SELECT "users_user"."id" FROM "users_user" WHERE LOWER("users_user"."email"::text) = \'a\'',
+        'SELECT "users_user"."id" FROM "users_user" WHERE "users_user"."uuid" = \'x\'',
+    ]
+    advisor = IndexAdvisor(workload=workload)
+
+    assert "users_user" in advisor.tables
+    assert [(entry["table"], entry["key"]) for entry in advisor.missing()] == [("users_user", "email")]
+    assert "users.User.uuid" in advisor.redundant_declarations()
+
+    redundant = {(index["name"], other["name"]) for index, other in advisor.redundant()}
+    assert not any(name.startswith("users_user_") and "lower" in name for name, _ in redundant)
+    assert all(not index["unique"] for index in advisor.unused())
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from django.core.cache import caches
+
+from backend.utils.jobs import Jobs
+
+
+def wait(jobs: Jobs, job_id: str) -> dict:
+    deadline = time.monotonic() + 5
+    while jobs.get(job_id)["status"] == "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return jobs.get(job_id)
+
+
+def test_job_progress():
+    jobs = Jobs()
+
+    def func(report):
+        for done in range(1, 4):
+            report(done, 3)
+
+    job_id = jobs.start("count", func)
+    assert wait(jobs, job_id) == {"name": "count", "status": "done", "done": 3, "total": 3}
+
+
+def test_failed_job():
+    jobs = Jobs()
+
+    def func(report):
+        report(1, 2)
+        raise RuntimeError
+
+    job_id = jobs.start("fail", func)
+    assert wait(jobs, job_id) == {"name": "fail", "status": "failed", "done": 1, "total": 2}
+
+
+def test_job_of_exited_process():
+    jobs = Jobs()
+    release = threading.Event()
+    job_id = jobs.start("stuck", lambda report: release.wait(5))
+    assert jobs.get(job_id)["status"] == "running"
+
+    # As if the process running it was killed.
+    caches[jobs.cache_alias].delete(f"{jobs.make_key(job_id)}:heartbeat")
+    assert jobs.get(job_id) == {"name": "stuck", "status": "failed", "done": 0, "total": None}
+    release.set()
@@ -0,0 +1,158 @@
+import gc
+import io
+import json
+import logging
+import logging.config
+import logging.handlers
+import sys
+import time
+
+import pytest
+from django.core import mail
+from django.test import RequestFactory
+
+from backend.users.tests.factories import UserFactory
+from backend.utils.log import (
+    DigestAdminEmailHandler,
+    JSONFormatter,
+    QueueListenerHandler,
+    RequestContextFilter,
+    get_fingerprint,
+    request_id_var,
+    request_var,
+)
+
+
+def make_record(msg: str = "Internal Server Error: %s", args=("/api/v1/",), exc: Exception = None) -> logging.LogRecord:
+    exc_info = None
+    if exc is not None:
+        try:
+            raise exc
+        except Exception:
+            exc_info = sys.exc_info()
+
+    return logging.LogRecord("django.request", logging.ERROR, __file__, 10, msg, args, exc_info)
+
+
+@pytest.fixture
+def handler():
+    handler = DigestAdminEmailHandler(interval=3600)
+    yield handler
+    handler.close()
+
+
+def test_fingerprint_groups_same_exception():
+    assert get_fingerprint(make_record(exc=ValueError("a"))) == get_fingerprint(make_record(exc=ValueError("b")))
+    assert get_fingerprint(make_record(exc=ValueError())) != get_fingerprint(make_record(exc=KeyError()))
+
+
+def test_fingerprint_without_exception_uses_message_template():
+    assert get_fingerprint(make_record(args=("/a/",))) == get_fingerprint(make_record(args=("/b/",)))
+    assert get_fingerprint(make_record(msg="%s")) != get_fingerprint(make_record())
+
+
+def test_handler_sends_single_digest(
+    settings,
+    handler: DigestAdminEmailHandler,
+):
+    settings.ADMINS = [("Admin", "admin@example.com")]
+
+    for _ in range(10):
+        handler.handle(make_record(exc=ValueError("boom")))
+    handler.handle(make_record(exc=KeyError("missing")))
+    assert len(mail.outbox) == 0
+
+    handler.flush()
+    assert len(mail.outbox) == 1
+    assert "11 error(s), 2 distinct" in mail.outbox[0].subject
+    assert "x10: Internal Server Error" in mail.outbox[0].body
+
+    handler.flush()
+    assert len(mail.outbox) == 1
+
+
+def test_handler_limits_distinct_fingerprints(settings):
+    settings.ADMINS = [("Admin", "admin@example.com")]
+    handler = DigestAdminEmailHandler(interval=3600, max_fingerprints=1)
+
+    handler.handle(make_record(exc=ValueError()))
+    handler.handle(make_record(exc=KeyError()))
+    handler.close()
+
+    assert len(mail.outbox) == 1
+    assert "1 record(s) dropped" in mail.outbox[0].body
+
+
+def test_handler_sends_digest_when_window_closes(settings):
+    settings.ADMINS = [("Admin", "admin@example.com")]
+    handler = DigestAdminEmailHandler(interval=0.01)
+
+    handler.handle(make_record(exc=ValueError()))
+    deadline = time.monotonic() + 2
+    while not mail.outbox and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(mail.outbox) == 1
+    handler.close()
+    assert len(mail.outbox) == 1
+
+
+def test_json_formatter_includes_extra_fields():
+    record = make_record(exc=ValueError("boom"))
+    record.request_id = "abc"
+    record.duration_ms = 1.5
+
+    data = json.loads(JSONFormatter().format(record))
+    assert data["message"] == "Internal Server Error: /api/v1/"
+    assert data["level"] == "ERROR"
+    assert data["request_id"] == "abc"
+    assert data["duration_ms"] == 1.5
+    assert "ValueError: boom" in data["exc_info"]
+
+
+@pytest.mark.django_db
+def test_request_context_filter_uses_current_request(
+    rf: RequestFactory,
+):
+    request = rf.get("/")
+    request.user = UserFactory()
+    request_token, request_id_token = request_var.set(request), request_id_var.set("abc")
+    try:
+        record = make_record()
+        RequestContextFilter().filter(record)
+    finally:
+        request_var.reset(request_token)
+        request_id_var.reset(request_id_token)
+
+    assert record.request_id == "abc"
+    assert record.user_uuid == str(request.user.uuid)
+
+
+def test_queue_listener_handler_passes_records_on():
+    target = logging.handlers.BufferingHandler(capacity=100)
+    handler = QueueListenerHandler([target])
+
+    handler.handle(make_record(args=("/a/",)))
+    handler.close()
+
+    assert [record.getMessage() for record in target.buffer] == ["Internal Server Error: /a/"]
+    target.close()
+
+
+def test_queue_listener_handler_from_logging_setting(settings):
+    try:
+        logging.config.dictConfig(settings.LOGGING)
+        [handler] = logging.getLogger().handlers
+        [console] = handler.target_handlers
+        stream = io.StringIO()
+        console.setStream(stream)
+        # Only the queue handler references the console handler.
+        del console
+        gc.collect()
+
+        logging.getLogger("backend.tests").info("Passed on")
+        handler.close()
+    finally:
+        logging.config.dictConfig(settings.LOGGING)
+
+    assert "Passed on" in stream.getvalue()
@@ -0,0 +1,212 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import brotli
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory
+
+from backend.utils.concurrency import BusyPeriod
+from backend.utils.middleware import (
+    CompressionMiddleware,
+    LoadSheddingMiddleware,
+    PathMiddlewareDispatcher,
+    RequestContextMiddleware,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_request_context_middleware_sets_request_id(
+    client: Client,
+):
+    response = client.get("/api/v1/")
+    assert len(response["X-Request-ID"]) == 32
+
+
+def test_request_context_middleware_reuses_incoming_request_id(
+    client: Client,
+):
+    response = client.get("/api/v1/", HTTP_X_REQUEST_ID="from-proxy")
+    assert response["X-Request-ID"] == "from-proxy"
+
+
+def test_api_requests_skip_full_middleware(
+    client: Client,
+):
+    response = client.get("/api/v1/")
+    assert "X-Frame-Options" not in response
+    assert "Content-Language" not in response
+
+
+def test_other_requests_run_full_middleware(
+    client: Client,
+):
+    response = client.get("/api-auth/login/")
+    assert response["X-Frame-Options"] == "DENY"
+    assert "csrftoken" in response.cookies
+
+
+def test_full_middleware_view_hooks_run(
+    admin_client: Client,
+):
+    admin_client.handler.enforce_csrf_checks = True
+    response = admin_client.post("/api-auth/logout/")
+    assert response.status_code == 403
+
+
+def test_middleware_runs_natively_under_asgi():
+    async def get_response(request):
+        return HttpResponse()
+
+    middleware = RequestContextMiddleware(PathMiddlewareDispatcher(get_response))
+    assert asyncio.iscoroutinefunction(middleware)
+
+    response = async_to_sync(middleware)(AsyncRequestFactory().get("/api/v1/"))
+    assert len(response["X-Request-ID"]) == 32
+    assert "X-Frame-Options" not in response
+
+    response = async_to_sync(middleware)(AsyncRequestFactory().get("/admin/"))
+    assert response["X-Frame-Options"] == "DENY"
+
+
+def test_load_shedding_middleware_sheds_low_priority_requests(
+    client: Client,
+    settings,
+):
+    settings.LOAD_SHEDDING_QUEUE_TARGET = 0.1
+    queued_since = f"t={time.time() - 1:.3f}"
+
+    response = client.get("/api/schema/", HTTP_X_REQUEST_START=queued_since)
+    assert response.status_code == 503
+    assert response["Retry-After"] == str(settings.LOAD_SHEDDING_RETRY_AFTER)
+    assert len(response["X-Request-ID"]) == 32
+
+    response = client.post("/api/v1/users/", {}, HTTP_X_REQUEST_START=queued_since)
+    assert response.status_code == 503
+
+    assert client.get("/api/v1/", HTTP_X_REQUEST_START=queued_since).status_code != 503
+
+
+def test_load_shedding_middleware_in_sync_worker(
+    settings,
+):
+    settings.LOAD_SHEDDING_QUEUE_TARGET = 0.1
+
+    def get_response(request):
+        if request.path == "/api/v1/slow/":
+            time.sleep(0.2)
+        return HttpResponse()
+
+    middleware = LoadSheddingMiddleware(get_response)
+    factory = RequestFactory()
+    assert factory.get("/").META["wsgi.multithread"] is False
+
+    # A sync worker picking requests up back to back after a slow one: they were queued behind it.
+    assert middleware(factory.get("/api/v1/slow/")).status_code == 200
+    assert middleware(factory.get("/api/schema/")).status_code == 503
+    assert middleware(factory.get("/api/v1/")).status_code == 200
+
+    time.sleep(0.01)
+    assert middleware(factory.get("/api/schema/")).status_code == 200
+
+    # Threaded servers and the proxy's X-Request-Start header are not second-guessed.
+    assert middleware(factory.get("/api/v1/slow/")).status_code == 200
+    assert middleware(factory.get("/api/schema/", **{"wsgi.multithread": True})).status_code == 200
+    assert middleware(factory.get("/api/v1/slow/")).status_code == 200
+    assert middleware(factory.get("/api/schema/", HTTP_X_REQUEST_START=f"t={time.time():.3f}")).status_code == 200
+
+
+def test_load_shedding_in_sync_worker_stops_after_idle_period(
+    settings,
+    monkeypatch,
+):
+    settings.LOAD_SHEDDING_QUEUE_TARGET = 0.1
+    now = 0.0
+    monkeypatch.setattr("backend.utils.concurrency.time", SimpleNamespace(monotonic=lambda: now))
+
+    def get_response(request):
+        nonlocal now
+        now += 0.01
+        return HttpResponse()
+
+    middleware = LoadSheddingMiddleware(get_response)
+    factory = RequestFactory()
+
+    # A worker saturated for 20 seconds, picking low priority requests up back to back.
+    admitted = 0
+    while now < 20:
+        if middleware(factory.get("/api/schema/")).status_code == 200:
+            admitted += 1
+        else:
+            now += 0.001
+    # The first queue target's worth of every busy period.
+    assert admitted == pytest.approx(20 / BusyPeriod.max_period * 10, abs=10)
+
+    now += 0.01
+    assert all(middleware(factory.get("/api/schema/")).status_code == 200 for _ in range(5))
+
+
+def test_load_shedding_middleware_under_asgi(
+    settings,
+):
+    settings.LOAD_SHEDDING_MAX_CONCURRENCY = 1
+
+    async def get_response(request):
+        # Another request arrives while this one is in flight.
+        return await middleware(AsyncRequestFactory().get("/api/v1/"))
+
+    middleware = LoadSheddingMiddleware(get_response)
+    assert asyncio.iscoroutinefunction(middleware)
+
+    response = async_to_sync(middleware)(AsyncRequestFactory().get("/api/v1/"))
+    assert response.status_code == 503
+    assert middleware.limit.in_flight == 0
+
+
+def test_compression_middleware(
+    settings,
+):
+    settings.COMPRESSION_MIN_SIZE = 100
+    content = b'{"username":"user"}' * 10
+
+    def get_response(request):
+        response = HttpResponse(content, content_type="application/json")
+        response["ETag"] = '"etag"'
+        return response
+
+    middleware = CompressionMiddleware(get_response)
+    factory = RequestFactory()
+
+    response = middleware(factory.get("/api/v1/", HTTP_ACCEPT_ENCODING="gzip, br"))
+    assert response["Content-Encoding"] == "br"
+    assert response["Content-Length"] == str(len(response.content))
+    assert response["Vary"] == "Accept-Encoding"
+    assert response["ETag"] == 'W/"etag"'
+    assert brotli.decompress(response.content) == content
+
+    response = middleware(factory.get("/api/v1/"))
+    assert "Content-Encoding" not in response
+    assert response["Vary"] == "Accept-Encoding"
+
+    settings.COMPRESSION_MIN_SIZE = 1000
+    response = middleware(factory.get("/api/v1/", HTTP_ACCEPT_ENCODING="gzip"))
+    assert "Content-Encoding" not in response
+    assert "Vary" not in response
+
+
+def test_compression_middleware_skips_binary_content():
+    middleware = CompressionMiddleware(lambda request: HttpResponse(b"\0" * 2000, content_type="image/png"))
+    response = middleware(RequestFactory().get("/api/v1/", HTTP_ACCEPT_ENCODING="gzip"))
+    assert "Content-Encoding" not in response
+
+
+def test_compression_middleware_streams_api_responses(
+    admin_client: Client,
+):
+    response = admin_client.get("/api/v1/users/export/", HTTP_ACCEPT_ENCODING="br")
+    assert response["Content-Encoding"] == "br"
+    assert not response.has_header("Content-Length")
+    assert brotli.decompress(b"".join(response.streaming_content)).startswith(b'{"id":')
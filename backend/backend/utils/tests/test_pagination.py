@@ -0,0 +1,30 @@
+import pytest
+
+from backend.users.models import User
+from backend.users.tests.factories import UserFactory
+from backend.utils.pagination import EstimatedCountPaginator
+
+pytestmark = pytest.mark.django_db
+
+
+def test_small_result_sets_counted_exactly():
+    UserFactory.create_batch(3)
+    paginator = EstimatedCountPaginator(User.objects.order_by("pk"), per_page=2)
+    assert paginator.count == 3
+    assert paginator.num_pages == 2
+
+
+def test_large_result_sets_estimated(monkeypatch):
+    UserFactory.create_batch(3)
+    monkeypatch.setattr(EstimatedCountPaginator, "exact_count_limit", 0)
+    paginator = EstimatedCountPaginator(User.objects.order_by("pk"), per_page=2)
+
+    estimate = paginator.estimate_count()
+    assert estimate is not None
+    assert paginator.count == estimate
+
+
+def test_lists_counted_exactly():
+    paginator = EstimatedCountPaginator([1, 2, 3], per_page=2)
+    assert paginator.estimate_count() is None
+    assert paginator.count == 3
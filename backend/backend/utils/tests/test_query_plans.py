@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+from django.db import connection
+
+from backend.users.models import User
+from backend.utils.query_plans import UPDATE_ENV, assert_plans_match, plan_shape
+
+
+def test_plan_shape():
+    plan = {
+        "Node Type": "Limit",
+        "Total Cost": 8.3,
+        "Plans": [
+            {
+                "Node Type": "Index Scan",
+                "Relation Name": "users_user",
+                "Index Name": "users_user_pkey",
+                "Filter": "(is_active)",
+                "Total Cost": 8.29,
+            },
+            {"Node Type": "Seq Scan", "Relation Name": "users_token", "Plan Rows": 1000},
+            {"Node Type": "Index Scan", "Relation Name": "users_token", "Index Name": "users_token_key_820deccd_like"},
+        ],
+    }
+    assert plan_shape(plan) == [
+        "Limit",
+        "  Index Scan on users_user using users_user_pkey (filtered)",
+        "  Seq Scan on users_token",
+        "  Index Scan on users_token using users_token_key_*_like",
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Query plans are only checked on PostgreSQL.")
+def test_missing_snapshots_fail(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv(UPDATE_ENV, raising=False)
+    with pytest.raises(AssertionError, match=UPDATE_ENV):
+        assert_plans_match("count", User.objects.count, tmp_path)
+    assert not (tmp_path / "count.txt").exists()
+
+    monkeypatch.setenv(UPDATE_ENV, "1")
+    assert_plans_match("count", User.objects.count, tmp_path)
+    monkeypatch.delenv(UPDATE_ENV)
+    assert_plans_match("count", User.objects.count, tmp_path)
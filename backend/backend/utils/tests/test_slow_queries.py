@@ -0,0 +1,115 @@
+import os
+import signal
+import time
+
+import pytest
+from django.db import DatabaseError, connection, transaction
+from django.test import Client
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from backend.users.models import User
+from backend.utils.slow_queries import SlowQueryLog, normalize_sql, slow_queries
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def log(settings) -> SlowQueryLog:
+    settings.SLOW_QUERY_THRESHOLD = 0
+    return SlowQueryLog(2)
+
+
+@pytest.fixture
+def recorded(settings):
+    # The log every connection is wrapped with, recording every query.
+    settings.SLOW_QUERY_THRESHOLD = 0
+    slow_queries.clear()
+    yield slow_queries
+    slow_queries.clear()
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ('SELECT id FROM users_user\n  WHERE uuid = %s LIMIT 21', 'SELECT id FROM users_user WHERE uuid = ? LIMIT ?'),
+        ("SELECT * FROM t1 WHERE name = 'O''Brien' AND score > 1.5", "SELECT * FROM t1 WHERE name = ? AND score > ?"),
+        ('DELETE FROM "users_token" WHERE "id" IN (%s, %s, 3)', 'DELETE FROM "users_token" WHERE "id" IN (...)'),
+    ],
+)
+def test_normalize_sql(sql: str, expected: str):
+    assert normalize_sql(sql) == expected
+
+
+def test_records_slow_queries(log: SlowQueryLog, settings):
+    with connection.execute_wrapper(log):
+        User.objects.filter(username="alice").exists()
+        settings.SLOW_QUERY_THRESHOLD = 60
+        User.objects.count()
+
+    [entry] = log.get_entries()
+    assert entry["sql"].endswith('WHERE "users_user"."username" = ? LIMIT ?')
+    assert entry["database"] == "default"
+    assert entry["view"] is None
+    assert entry["stack"][-1].startswith("utils/tests/test_slow_queries.py:")
+    assert entry["stack"][-1].endswith("in test_records_slow_queries")
+
+
+def test_keeps_the_most_recent_queries(log: SlowQueryLog):
+    with connection.execute_wrapper(log):
+        for username in ("alice", "bob", "carol"):
+            User.objects.filter(username=username).exists()
+
+    assert len(log.get_entries()) == 2
+
+
+def test_records_failed_queries(log: SlowQueryLog):
+    with pytest.raises(DatabaseError), transaction.atomic(), connection.execute_wrapper(log):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT * FROM missing_table WHERE id = 1")
+
+    assert [entry["sql"] for entry in log.get_entries()] == ["SELECT * FROM missing_table WHERE id = ?"]
+
+
+def test_records_the_view(recorded: SlowQueryLog, api_client: APIClient):
+    user = User.objects.create_user(username="alice", password="password")
+    api_client.force_authenticate(user)
+    assert slow_queries in connection.execute_wrappers
+    recorded.clear()
+
+    assert api_client.get(f"/api/v1/users/{user.uuid}/").status_code == 200
+
+    entries = recorded.get_entries()
+    assert entries
+    assert {entry["view"] for entry in entries} == {"GET backend.users.views.UserViewSet"}
+    assert all(entry["request_id"] for entry in entries)
+
+
+def test_admin_view(recorded: SlowQueryLog, admin_client: Client):
+    User.objects.filter(username="alice").exists()
+
+    response = admin_client.get(reverse("admin-slow-queries"))
+    assert response.status_code == 200
+    assert "users_user" in response.content.decode()
+
+
+def test_admin_view_is_for_superusers_only(client: Client):
+    client.force_login(User.objects.create_user(username="staff", password="password", is_staff=True))
+    assert client.get(reverse("admin-slow-queries")).status_code == 403
+
+
+def test_dump_on_signal(recorded: SlowQueryLog, caplog):
+    User.objects.filter(username="alice").exists()
+    previous = signal.getsignal(signal.SIGUSR2)
+    try:
+        assert recorded.install_signal_handler()
+        os.kill(os.getpid(), signal.SIGUSR2)
+        deadline = time.monotonic() + 5
+        while not any(record.getMessage().startswith("Slow query") for record in caplog.records):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+
+    record = next(record for record in caplog.records if record.getMessage().startswith("Slow query"))
+    assert record.stack[-1].endswith("in test_dump_on_signal")
@@ -0,0 +1,101 @@
+"""
+Measures the time a logging call costs the calling thread.
+
+Compares the plain StreamHandler setup against QueueListenerHandler with the JSON
+formatter, both writing to a real file. `--write-latency` makes every write block for
+the given number of microseconds, like a stdout pipe whose reader is falling behind.
+Run from the project root:
+
+    python benchmarks/bench_logging.py --records 100000 --write-latency 50
+"""
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from backend.utils.log import (  # noqa: E402
+    JSONFormatter,
+    QueueListenerHandler,
+    RequestContextFilter,
+)
+
+VERBOSE_FORMAT = "%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s"
+
+
+class SlowStream:
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def run(logger: logging.Logger, records: int) -> list[float]:
+    timings = []
+    for i in range(records):
+        start = time.perf_counter_ns()
+        logger.info("GET %s %s", "/api/v1/users/", 200, extra={"duration_ms": 1.5, "record": i})
+        timings.append(time.perf_counter_ns() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    print(
+        f"{name:<12} mean {statistics.fmean(timings) / 1000:7.2f}us"
+        f"  p50 {timings[len(timings) // 2] / 1000:7.2f}us"
+        f"  p99 {timings[int(len(timings) * 0.99)] / 1000:7.2f}us"
+        f"  max {timings[-1] / 1000:9.2f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--write-latency", type=float, default=0, help="microseconds")
+    args = parser.parse_args()
+    latency = args.write_latency / 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp, open(Path(tmp) / "sync.log", "w") as sync_file, open(
+        Path(tmp) / "queue.log", "w"
+    ) as queue_file:
+        sync_handler = logging.StreamHandler(SlowStream(sync_file, latency))
+        sync_handler.setFormatter(logging.Formatter(VERBOSE_FORMAT))
+        sync_logger = logging.getLogger("bench.sync")
+        sync_logger.addHandler(sync_handler)
+        sync_logger.setLevel(logging.INFO)
+        sync_logger.propagate = False
+
+        target = logging.StreamHandler(SlowStream(queue_file, latency))
+        target.setFormatter(JSONFormatter())
+        queue_handler = QueueListenerHandler([target], queue_size=args.records + 1)
+        queue_handler.addFilter(RequestContextFilter())
+        queue_logger = logging.getLogger("bench.queue")
+        queue_logger.addHandler(queue_handler)
+        queue_logger.setLevel(logging.INFO)
+        queue_logger.propagate = False
+
+        report("sync", run(sync_logger, args.records))
+        start = time.perf_counter()
+        report("queue+json", run(queue_logger, args.records))
+        queue_handler.close()
+        print(f"listener drained the queue {time.perf_counter() - start:.2f}s after the first record")
+
+        sync_handler.close()
+        target.close()
+
+
+if __name__ == "__main__":
+    main()
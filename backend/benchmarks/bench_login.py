@@ -0,0 +1,104 @@
+"""
+Measures the user lookup of a login against a large users table.
+
+Loads `--users` synthetic users into the database of DJANGO_SETTINGS_MODULE, then times
+the lookup of ModelBackend (exact username), a naive `username__iexact` one and the one
+of backend.users.backends.UsernameOrEmailBackend (LOWER() of username or email, backed by
+functional indexes), printing the plan of each. Passwords are not checked, as hashing
+them would dwarf the lookups. The users are deleted afterwards. Run from the project root
+against a scratch database:
+
+    DJANGO_SETTINGS_MODULE=config.settings.test DATABASE_URL=postgres:///scratch \\
+        python benchmarks/bench_login.py --users 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import django
+
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from backend.users.backends import filter_by_login  # noqa: E402
+from backend.users.bulk import create_users  # noqa: E402
+from backend.users.models import User  # noqa: E402
+
+PREFIX = "bench-login-"
+
+
+def load(count: int, chunk_size: int = 50000) -> None:
+    now = timezone.now()
+    for start in range(0, count, chunk_size):
+        create_users(
+            [
+                User(
+                    username=f"{PREFIX}{i}",
+                    email=f"{PREFIX}{i}@example.com",
+                    password="!",
+                    date_joined=now,
+                )
+                for i in range(start, min(start + chunk_size, count))
+            ],
+            tokens=False,
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(User._meta.db_table)}")
+
+
+def run(lookup, logins: list[str]) -> list[float]:
+    timings = []
+    for login in logins:
+        start = time.perf_counter_ns()
+        list(lookup(login)[:5])
+        timings.append(time.perf_counter_ns() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    print(
+        f"{name:<16} mean {statistics.fmean(timings) / 1_000_000:8.3f}ms"
+        f"  p50 {timings[len(timings) // 2] / 1_000_000:8.3f}ms"
+        f"  p99 {timings[int(len(timings) * 0.99)] / 1_000_000:8.3f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    logins = [f"{PREFIX}{rng.randrange(args.users)}" for _ in range(args.lookups)]
+    lookups = {
+        "exact username": lambda login: User.objects.filter(username=login),
+        "iexact username": lambda login: User.objects.filter(username__iexact=login.upper()),
+        "lower username": lambda login: filter_by_login(User.objects.all(), login.upper()),
+        "lower email": lambda login: filter_by_login(User.objects.all(), f"{login}@EXAMPLE.com"),
+    }
+
+    start = time.perf_counter()
+    load(args.users)
+    print(f"loaded {args.users} users in {time.perf_counter() - start:.1f}s")
+    try:
+        for name, lookup in lookups.items():
+            print(lookup(logins[0])[:5].explain())
+            report(name, run(lookup, logins))
+    finally:
+        User.objects.filter(username__startswith=PREFIX)._raw_delete(User.objects.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+ASGI config for backend project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+served by uvicorn workers in production (see compose/production/django/start),
+so that a worker keeps serving other requests while one waits on I/O.
+
+Unless DJANGO_ASYNC_VIEWS says otherwise, the hot user endpoints are served by
+the async views of backend.users.async_views.
+
+"""
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# backend directory.
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR / "backend"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "True")
+
+application = get_asgi_application()
+# Health probes are answered here, before they reach Django.
+from backend.utils.health import HealthCheckASGIMiddleware  # noqa: E402
+
+application = HealthCheckASGIMiddleware(application)
+# `kill -USR2 <worker pid>` logs the slow queries recorded by the worker.
+from backend.utils.slow_queries import slow_queries  # noqa: E402
+
+slow_queries.install_signal_handler()
@@ -1,9 +1,11 @@
 """
 Base settings to build other settings files upon.
 """
+from datetime import timedelta
 from pathlib import Path
 
 import environ
+from corsheaders.defaults import default_headers
 
 ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent.parent
 # backend/
@@ -51,6 +53,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# Serve the user detail and token login endpoints with the async views of backend.users.async_views,
+# on by default under ASGI (see config/asgi.py). Under WSGI every async request would need its own event loop.
+ASYNC_VIEWS = env.bool("DJANGO_ASYNC_VIEWS", default=False)
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -62,16 +67,17 @@ DJANGO_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.admin",
+    "django.forms",
 ]
 THIRD_PARTY_APPS = [
     "rest_framework",
-    "rest_framework.authtoken",
     "corsheaders",
     "drf_spectacular",
 ]
 
 LOCAL_APPS = [
     "backend.users",
+    "backend.utils",
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -84,9 +90,32 @@ MIGRATION_MODULES = {"sites": "backend.contrib.sites.migrations"}
 # AUTHENTICATION
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#authentication-backends
-AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"]
+# Logins by username or email, ignoring case.
+AUTHENTICATION_BACKENDS = ["backend.users.backends.UsernameOrEmailBackend"]
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-user-model
 AUTH_USER_MODEL = "users.User"
+# Auth tokens expire when unused for AUTH_TOKEN_TTL, see backend.users.models.Token.
+AUTH_TOKEN_TTL = timedelta(days=env.int("DJANGO_AUTH_TOKEN_TTL_DAYS", default=30))
+# Issue auth tokens on the first login through /api-token-auth/ rather than when users are created,
+# see backend.users.models.get_or_issue_token.
+AUTH_TOKEN_LAZY = env.bool("DJANGO_AUTH_TOKEN_LAZY", default=False)
+# Using a token pushes its expiry back at most once per interval, so it is not written to on every request.
+AUTH_TOKEN_REFRESH_INTERVAL = timedelta(minutes=env.int("DJANGO_AUTH_TOKEN_REFRESH_INTERVAL_MINUTES", default=60))
+# Lifetime of the signed access tokens issued next to auth tokens, see backend.users.access_tokens.
+# Set to 0 to stop issuing them.
+ACCESS_TOKEN_TTL = timedelta(minutes=env.int("DJANGO_ACCESS_TOKEN_TTL_MINUTES", default=15))
+# Users are cached per process and in CACHES["default"], see backend.users.cache.
+USER_CACHE_TTL = env.int("DJANGO_USER_CACHE_TTL", default=300)
+# Expired users are served for this long while a single process reloads them.
+USER_CACHE_STALE_TTL = env.int("DJANGO_USER_CACHE_STALE_TTL", default=60)
+# Lookups of users that do not exist are cached for this long.
+USER_CACHE_NEGATIVE_TTL = env.int("DJANGO_USER_CACHE_NEGATIVE_TTL", default=30)
+# Bloom filter of user uuids, rebuilt with `manage.py rebuild_user_bloom_filter`, see backend.users.bloom.
+# At the defaults it takes 12 MB in Redis; rebuild it with a higher capacity before outgrowing it.
+USER_BLOOM_FILTER_CAPACITY = env.int("DJANGO_USER_BLOOM_FILTER_CAPACITY", default=10_000_000)
+USER_BLOOM_FILTER_ERROR_RATE = env.float("DJANGO_USER_BLOOM_FILTER_ERROR_RATE", default=0.01)
+USER_CACHE_LOCAL_TTL = env.int("DJANGO_USER_CACHE_LOCAL_TTL", default=60)
+USER_CACHE_LOCAL_SIZE = env.int("DJANGO_USER_CACHE_LOCAL_SIZE", default=10000)
 
 # PASSWORDS
 # ------------------------------------------------------------------------------
@@ -110,8 +139,34 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "backend.utils.middleware.RequestContextMiddleware",
+    "backend.utils.middleware.LoadSheddingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "backend.utils.middleware.PathMiddlewareDispatcher",
+]
+# The rest of the middleware depends on the path, see backend.utils.middleware.PathMiddlewareDispatcher.
+API_URLS_REGEX = r"^/api/.*$"
+# API calls only keep compression, sessions and authentication, the latter for the session-authenticated
+# docs and browsable API.
+# DRF views are exempt from CSRF checks and render no templates or messages.
+API_MIDDLEWARE = [
+    "backend.utils.middleware.CompressionMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+]
+# API responses of at least this many bytes are compressed, with Brotli at this quality (0-11)
+# or gzip at this level (1-9), see backend.utils.middleware.CompressionMiddleware.
+COMPRESSION_MIN_SIZE = env.int("DJANGO_COMPRESSION_MIN_SIZE", default=1024)
+COMPRESSION_BROTLI_QUALITY = env.int("DJANGO_COMPRESSION_BROTLI_QUALITY", default=4)
+COMPRESSION_GZIP_LEVEL = env.int("DJANGO_COMPRESSION_GZIP_LEVEL", default=6)
+# Streamed responses (exports) are megabytes of repetitive rows, which the fastest levels compress about as
+# well at a fraction of the CPU time, see benchmarks/bench_compression.py.
+COMPRESSION_STREAM_BROTLI_QUALITY = env.int("DJANGO_COMPRESSION_STREAM_BROTLI_QUALITY", default=1)
+COMPRESSION_STREAM_GZIP_LEVEL = env.int("DJANGO_COMPRESSION_STREAM_GZIP_LEVEL", default=1)
+# Static files are never under the API, and WhiteNoise is synchronous only.
+FULL_MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -122,6 +177,29 @@ MIDDLEWARE = [
     "django.middleware.common.BrokenLinkEmailsMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# Requests beyond an adaptive per process concurrency limit are answered with 503, low priority ones
+# (signup, schema and docs) first, see backend.utils.middleware.LoadSheddingMiddleware.
+LOAD_SHEDDING_LOW_PRIORITY_URLS_REGEX = r"^/api/(v1/users|schema|docs)/$"
+LOAD_SHEDDING_MIN_CONCURRENCY = env.int("DJANGO_LOAD_SHEDDING_MIN_CONCURRENCY", default=1)
+LOAD_SHEDDING_MAX_CONCURRENCY = env.int("DJANGO_LOAD_SHEDDING_MAX_CONCURRENCY", default=100)
+# Seconds a request may wait in the server's queue (per the proxy's X-Request-Start header, or as
+# estimated by sync workers) or take before the limit shrinks. Low priority requests that waited longer
+# are shed. Under sync workers, that is the only shedding there is.
+LOAD_SHEDDING_QUEUE_TARGET = env.float("DJANGO_LOAD_SHEDDING_QUEUE_TARGET", default=0.1)
+LOAD_SHEDDING_LATENCY_TARGET = env.float("DJANGO_LOAD_SHEDDING_LATENCY_TARGET", default=1.0)
+LOAD_SHEDDING_RETRY_AFTER = env.int("DJANGO_LOAD_SHEDDING_RETRY_AFTER", default=5)
+# Health probes (/health/live and /health/ready) are answered by config/wsgi.py and config/asgi.py,
+# which check the database and Redis at most once per this many seconds, see backend.utils.health.
+HEALTH_CHECK_INTERVAL = env.float("DJANGO_HEALTH_CHECK_INTERVAL", default=5.0)
+# Redis is reported by the readiness probe, but only fails it with this set, as the cache ignores Redis errors.
+HEALTH_CHECK_REQUIRE_REDIS = env.bool("DJANGO_HEALTH_CHECK_REQUIRE_REDIS", default=False)
+# Queries taking at least this many seconds are kept, with the view and code which ran them, in a ring buffer
+# of the last SLOW_QUERY_LOG_SIZE per process, see backend.utils.slow_queries. Shown in the admin, under
+# ADMIN_URL + "slow-queries/", and logged on SIGUSR2. A size of 0 turns it off.
+SLOW_QUERY_THRESHOLD = env.float("DJANGO_SLOW_QUERY_THRESHOLD", default=0.2)
+SLOW_QUERY_LOG_SIZE = env.int("DJANGO_SLOW_QUERY_LOG_SIZE", default=200)
+# The admin looks for its session, auth and messages middleware in MIDDLEWARE only, they are in FULL_MIDDLEWARE.
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 # STATIC
 # ------------------------------------------------------------------------------
@@ -211,23 +289,32 @@ MANAGERS = ADMINS
 # https://docs.djangoproject.com/en/dev/ref/settings/#logging
 # See https://docs.djangoproject.com/en/dev/topics/logging for
 # more details on how to customize your logging configuration.
+# Records are put on a queue by the "queue" handler and written out
+# by a listener thread, so no logging I/O happens on request threads.
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {"request_context": {"()": "backend.utils.log.RequestContextFilter"}},
     "formatters": {
         "verbose": {
             "format": "%(levelname)s %(asctime)s %(module)s "
                       "%(process)d %(thread)d %(message)s"
-        }
+        },
+        "json": {"()": "backend.utils.log.JSONFormatter"},
     },
     "handlers": {
         "console": {
             "level": "DEBUG",
             "class": "logging.StreamHandler",
             "formatter": "verbose",
-        }
+        },
+        "queue": {
+            "()": "backend.utils.log.QueueListenerHandler",
+            "handlers": ["cfg://handlers.console"],
+            "filters": ["request_context"],
+        },
     },
-    "root": {"level": "INFO", "handlers": ["console"]},
+    "root": {"level": "INFO", "handlers": ["queue"]},
 }
 
 # django-rest-framework
@@ -236,14 +323,27 @@ LOGGING = {
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "backend.users.authentication.ExpiringTokenAuthentication",
+        "backend.users.authentication.SignedAccessTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Used by backend.users.throttling, see https://www.django-rest-framework.org/api-guide/throttling/
+    "DEFAULT_THROTTLE_RATES": {
+        "login": env("DJANGO_THROTTLE_RATE_LOGIN", default="60/min"),
+        "login_username": env("DJANGO_THROTTLE_RATE_LOGIN_USERNAME", default="10/min"),
+        "signup": env("DJANGO_THROTTLE_RATE_SIGNUP", default="20/hour"),
+    },
 }
 
+# Creating and updating users is idempotent for requests with an Idempotency-Key header, whose first
+# successful response is replayed for this long, see backend.utils.idempotency.
+IDEMPOTENCY_KEY_TTL = env.int("DJANGO_IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60)
+
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
-CORS_URLS_REGEX = r"^/api/.*$"
+CORS_URLS_REGEX = API_URLS_REGEX
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed"]
 
 # By Default swagger ui is available only to admin user(s). You can change permission classes to change that
 # See more configuration options at https://drf-spectacular.readthedocs.io/en/latest/settings.html#settings
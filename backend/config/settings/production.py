@@ -125,31 +125,45 @@ ANYMAIL = {
 # See https://docs.djangoproject.com/en/dev/topics/logging for
 # more details on how to customize your logging configuration.
 # A sample logging configuration. The only tangible logging
-# performed by this configuration is to send an email to
-# the site admins on every HTTP 500 error when DEBUG=False.
+# performed by this configuration is to send the site admins
+# a digest of HTTP 500 errors when DEBUG=False. Errors are
+# grouped by fingerprint and mailed at most once per interval
+# from a background thread, see backend.utils.log. Everything
+# else is written to the console as JSON lines by the listener
+# thread behind the "queue" handler.
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "filters": {"require_debug_false": {"()": "django.utils.log.RequireDebugFalse"}},
+    "filters": {
+        "require_debug_false": {"()": "django.utils.log.RequireDebugFalse"},
+        "request_context": {"()": "backend.utils.log.RequestContextFilter"},
+    },
     "formatters": {
         "verbose": {
             "format": "%(levelname)s %(asctime)s %(module)s "
                       "%(process)d %(thread)d %(message)s"
-        }
+        },
+        "json": {"()": "backend.utils.log.JSONFormatter"},
     },
     "handlers": {
         "mail_admins": {
             "level": "ERROR",
             "filters": ["require_debug_false"],
-            "class": "django.utils.log.AdminEmailHandler",
+            "class": "backend.utils.log.DigestAdminEmailHandler",
+            "interval": env.int("DJANGO_ERROR_DIGEST_INTERVAL", default=60),
         },
         "console": {
             "level": "DEBUG",
             "class": "logging.StreamHandler",
-            "formatter": "verbose",
+            "formatter": "json",
+        },
+        "queue": {
+            "()": "backend.utils.log.QueueListenerHandler",
+            "handlers": ["cfg://handlers.console"],
+            "filters": ["request_context"],
         },
     },
-    "root": {"level": "INFO", "handlers": ["console"]},
+    "root": {"level": "INFO", "handlers": ["queue"]},
     "loggers": {
         "django.request": {
             "handlers": ["mail_admins"],
@@ -158,7 +172,7 @@ LOGGING = {
         },
         "django.security.DisallowedHost": {
             "level": "ERROR",
-            "handlers": ["console", "mail_admins"],
+            "handlers": ["queue", "mail_admins"],
             "propagate": True,
         },
     },
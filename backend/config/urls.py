@@ -4,14 +4,17 @@ from django.contrib import admin
 from django.urls import include, path, re_path, reverse_lazy
 from django.views.generic.base import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from rest_framework.authtoken.views import obtain_auth_token
 
+from backend.users.async_views import obtain_auth_token, user_detail
 from backend.users.urls import urlpatterns as users_urlpatterns
+from backend.users.views import ObtainAuthTokenView
+from backend.utils.slow_queries import slow_query_view
 
 urlpatterns = [
+    path(f"{settings.ADMIN_URL}slow-queries/", admin.site.admin_view(slow_query_view), name="admin-slow-queries"),
     path(settings.ADMIN_URL, admin.site.urls),
     path("api/v1/", include(users_urlpatterns)),
-    path("api-token-auth/", obtain_auth_token),
+    path("api-token-auth/", ObtainAuthTokenView.as_view()),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
     path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
     path(
@@ -26,6 +29,14 @@ urlpatterns = [
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
+if settings.ASYNC_VIEWS:
+    # Shadow the DRF views they replace, which stay in the API schema.
+    urlpatterns = [
+        # Only uuids, the other routes under users/, e.g. export/, are left to DRF.
+        path("api/v1/users/<uuid:uuid>/", user_detail, name="user-detail"),
+        path("api-token-auth/", obtain_auth_token),
+    ] + urlpatterns
+
 if settings.DEBUG:
     if "debug_toolbar" in settings.INSTALLED_APPS:
         import debug_toolbar
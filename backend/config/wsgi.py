@@ -34,5 +34,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # setting points here.
 application = get_wsgi_application()
 # Apply WSGI middleware here.
-# from helloworld.wsgi import HelloWorldApplication
-# application = HelloWorldApplication(application)
+# Health probes are answered here, before they reach Django.
+from backend.utils.health import HealthCheckWSGIMiddleware  # noqa: E402
+
+application = HealthCheckWSGIMiddleware(application)
+# `kill -USR2 <worker pid>` logs the slow queries recorded by the worker.
+from backend.utils.slow_queries import slow_queries  # noqa: E402
+
+slow_queries.install_signal_handler()
@@ -1,14 +1,49 @@
+import fakeredis
 import pytest
+from django.core.cache import cache
+from redis import Redis
 from rest_framework.test import APIClient
 
+from backend.utils.redis import get_redis_client
+
 pytest_plugins = ('backend.users',)
 
+redis_server = fakeredis.FakeServer()
+
 
 @pytest.fixture(autouse=True)
 def media_storage(settings, tmpdir) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    # Throttle counters and cached objects must not leak between tests.
+    from backend.users.cache import user_cache
+
+    cache.clear()
+    user_cache.local.clear()
+
+
 @pytest.fixture
 def api_client() -> APIClient:
     return APIClient()
+
+
+@pytest.fixture
+def redis_cache(settings) -> Redis:
+    # Backs the default cache by an in-memory Redis, so the code talking to Redis directly runs too.
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://redis:6379/0",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {"connection_class": fakeredis.FakeRedisConnection, "server": redis_server},
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+    client = get_redis_client()
+    client.flushall()
+    return client